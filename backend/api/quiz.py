@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Dict, Optional
 from pydantic import BaseModel
-from app.simple_database import SimpleDatabase
+from app.simple_database import SimpleDatabase, make_next_cursor
 
 router = APIRouter()
 
@@ -206,13 +206,16 @@ async def complete_quiz_session(session_id: int):
     return completed_session
 
 @router.get("/quiz/history")
-async def get_quiz_history(limit: int = 50):
-    """Get quiz session history"""
+async def get_quiz_history(limit: int = 50, cursor: Optional[str] = None):
+    """Get quiz session history (pass next_cursor back as cursor for the next page)"""
     if limit < 1 or limit > 100:
         limit = 50
     
-    history = SimpleDatabase.get_quiz_history(limit)
-    return {"history": history}
+    try:
+        history = SimpleDatabase.get_quiz_history(limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"history": history, "next_cursor": make_next_cursor(history, limit, 'completed_at')}
 
 @router.get("/quiz/stats")
 async def get_quiz_statistics():
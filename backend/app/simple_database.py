@@ -1,21 +1,242 @@
 import sqlite3
 import hashlib
 import json
+import base64
+import re
 from datetime import datetime
 from typing import List, Dict, Optional, Any
 from contextlib import contextmanager
 
+from app.db_pool import SQLiteConnectionPool
+
 DATABASE_PATH = "./data/naval_units.db"
 
+# Set by init_database when the SQLite build supports FTS5
+FTS_ENABLED = False
+
+# Search type -> FTS5 column filter, and bm25 weights for
+# name, unit_class, nation, notes, characteristics
+FTS_SEARCH_COLUMNS = {
+    'name': 'name',
+    'class': 'unit_class',
+    'nation': 'nation',
+    'notes': 'notes',
+    'characteristics': 'characteristics',
+}
+FTS_RANK_WEIGHTS = (10.0, 5.0, 3.0, 1.0, 1.0)
+
+# Warm, pre-tuned connections shared by every SimpleDatabase call
+db_pool = SQLiteConnectionPool(DATABASE_PATH)
+
 @contextmanager
 def get_db_connection():
     """Context manager for database connections"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row  # Enable dict-like access
-    try:
+    with db_pool.connection() as conn:
         yield conn
-    finally:
-        conn.close()
+
+def get_db_pool_stats() -> Dict[str, Any]:
+    """Get connection pool metrics"""
+    return db_pool.stats()
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Encode a (sort value, id) keyset position as an opaque cursor"""
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    return sort_value, row_id
+
+def make_next_cursor(rows: List[Dict], limit: int, sort_field: str = 'created_at') -> Optional[str]:
+    """Cursor for the page after rows, or None when this was the last page"""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last[sort_field], last['id'])
+
+def _page_clause(cursor: Optional[str], sort_field: str = 'created_at') -> tuple:
+    """WHERE fragment and params for keyset pagination in descending (sort_field, id) order"""
+    if not cursor:
+        return '', []
+    sort_value, row_id = decode_cursor(cursor)
+    return f'({sort_field}, id) < (?, ?)', [sort_value, row_id]
+
+# Columns a unit list may project with fields=...; "summary" is the default for lists
+UNIT_FIELDS = (
+    'id', 'name', 'unit_class', 'nation', 'logo_path', 'silhouette_path', 'flag_path',
+    'background_color', 'layout_config', 'current_template_id', 'silhouette_zoom',
+    'silhouette_position_x', 'silhouette_position_y', 'notes', 'created_by',
+    'created_at', 'updated_at',
+)
+UNIT_SUMMARY_FIELDS = (
+    'id', 'name', 'unit_class', 'nation', 'logo_path', 'silhouette_path', 'flag_path',
+    'background_color', 'current_template_id', 'created_at', 'updated_at',
+)
+
+# (table, column) pairs holding upload paths, either directly or inside JSON
+IMAGE_REFERENCE_COLUMNS = (
+    ('naval_units', 'logo_path'),
+    ('naval_units', 'silhouette_path'),
+    ('naval_units', 'flag_path'),
+    ('naval_units', 'layout_config'),
+    ('unit_template_states', 'element_states'),
+    ('unit_template_states', 'canvas_config'),
+    ('unit_gallery', 'image_path'),
+    ('groups', 'logo_path'),
+    ('groups', 'flag_path'),
+    ('templates', 'elements'),
+)
+
+def unit_columns(fields: Optional[str] = 'summary', table: str = '') -> str:
+    """SQL column list for a unit projection ('summary', 'full' or comma-separated names)"""
+    if not fields or fields == 'summary':
+        columns = UNIT_SUMMARY_FIELDS
+    elif fields in ('full', '*'):
+        columns = UNIT_FIELDS
+    else:
+        requested = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in requested if f not in UNIT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        # id and created_at are always returned, they drive cursors and React keys
+        columns = tuple(dict.fromkeys(['id', 'created_at'] + requested))
+    prefix = f'{table}.' if table else ''
+    return ', '.join(prefix + column for column in columns)
+
+def _unit_from_list_row(row: sqlite3.Row) -> Dict:
+    """Convert a projected unit row, parsing layout_config only when it was selected"""
+    unit = dict(row)
+    if 'layout_config' in unit and unit['layout_config']:
+        try:
+            unit['layout_config'] = json.loads(unit['layout_config'])
+        except:
+            unit['layout_config'] = {}
+    return unit
+
+# Unit row plus its ordered characteristics and gallery as JSON arrays, in one statement
+UNIT_DETAIL_SELECT = '''
+    SELECT nu.*,
+        (SELECT json_group_array(json_object(
+                    'id', c.id,
+                    'naval_unit_id', c.naval_unit_id,
+                    'characteristic_name', c.characteristic_name,
+                    'characteristic_value', c.characteristic_value,
+                    'order_index', c.order_index))
+         FROM (SELECT * FROM unit_characteristics
+               WHERE naval_unit_id = nu.id
+               ORDER BY order_index, id) c) AS characteristics_json,
+        (SELECT json_group_array(json_object(
+                    'id', g.id,
+                    'naval_unit_id', g.naval_unit_id,
+                    'image_path', g.image_path,
+                    'caption', g.caption,
+                    'order_index', g.order_index,
+                    'created_at', g.created_at))
+         FROM (SELECT * FROM unit_gallery
+               WHERE naval_unit_id = nu.id
+               ORDER BY order_index, id) g) AS gallery_json
+    FROM naval_units nu
+'''
+
+def _unit_from_detail_row(row: sqlite3.Row) -> Dict:
+    """Build a unit dict from a UNIT_DETAIL_SELECT row"""
+    unit = dict(row)
+    
+    # Aggregate order is not guaranteed by SQLite, so sort explicitly
+    order_key = lambda item: (item['order_index'] or 0, item['id'])
+    unit['characteristics'] = sorted(json.loads(unit.pop('characteristics_json') or '[]'), key=order_key)
+    unit['gallery'] = sorted(json.loads(unit.pop('gallery_json') or '[]'), key=order_key)
+    
+    # Parse JSON fields
+    if unit['layout_config']:
+        try:
+            unit['layout_config'] = json.loads(unit['layout_config'])
+        except:
+            unit['layout_config'] = {}
+    return unit
+
+# Characteristic values of one unit, flattened into a single searchable string
+FTS_CHARACTERISTICS_SQL = '''
+    (SELECT group_concat(characteristic_value, ' ')
+     FROM unit_characteristics WHERE naval_unit_id = {unit_id})
+'''
+
+def init_search_index(cursor: sqlite3.Cursor) -> bool:
+    """Create the FTS5 search index and its sync triggers; False if FTS5 is unavailable"""
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS naval_units_fts USING fts5(
+                name, unit_class, nation, notes, characteristics,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 not available, search falls back to LIKE: {e}")
+        return False
+    
+    new_chars = FTS_CHARACTERISTICS_SQL.format(unit_id='new.id')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS naval_units_fts_insert AFTER INSERT ON naval_units BEGIN
+            INSERT INTO naval_units_fts (rowid, name, unit_class, nation, notes, characteristics)
+            VALUES (new.id, new.name, new.unit_class, new.nation, new.notes, {new_chars});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS naval_units_fts_update
+        AFTER UPDATE OF name, unit_class, nation, notes ON naval_units BEGIN
+            DELETE FROM naval_units_fts WHERE rowid = old.id;
+            INSERT INTO naval_units_fts (rowid, name, unit_class, nation, notes, characteristics)
+            VALUES (new.id, new.name, new.unit_class, new.nation, new.notes, {new_chars});
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS naval_units_fts_delete AFTER DELETE ON naval_units BEGIN
+            DELETE FROM naval_units_fts WHERE rowid = old.id;
+        END
+    ''')
+    
+    # Characteristic changes refresh the owning unit's characteristics column
+    for event, row in (('INSERT', 'new'), ('UPDATE', 'new'), ('DELETE', 'old')):
+        chars = FTS_CHARACTERISTICS_SQL.format(unit_id=f'{row}.naval_unit_id')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS unit_characteristics_fts_{event.lower()}
+            AFTER {event} ON unit_characteristics BEGIN
+                UPDATE naval_units_fts SET characteristics = {chars}
+                WHERE rowid = {row}.naval_unit_id;
+            END
+        ''')
+    
+    # Build (or rebuild) the index for databases created before it existed
+    cursor.execute('SELECT COUNT(*) FROM naval_units_fts')
+    indexed = cursor.fetchone()[0]
+    cursor.execute('SELECT COUNT(*) FROM naval_units')
+    if indexed != cursor.fetchone()[0]:
+        cursor.execute('DELETE FROM naval_units_fts')
+        cursor.execute(f'''
+            INSERT INTO naval_units_fts (rowid, name, unit_class, nation, notes, characteristics)
+            SELECT nu.id, nu.name, nu.unit_class, nu.nation, nu.notes,
+                   {FTS_CHARACTERISTICS_SQL.format(unit_id='nu.id')}
+            FROM naval_units nu
+        ''')
+        print("Rebuilt naval units search index")
+    return True
+
+def build_fts_query(query: str, search_type: str = "all") -> Optional[str]:
+    """Turn user input into an FTS5 prefix query, e.g. 'san gio' -> '"san"* "gio"*'"""
+    terms = re.findall(r'\w+', query, re.UNICODE)
+    if not terms:
+        return None
+    column = FTS_SEARCH_COLUMNS.get(search_type)
+    prefix = f'{column} : ' if column else ''
+    return ' '.join(f'{prefix}"{term}"*' for term in terms)
 
 def init_database():
     """Initialize the database with all required tables"""
@@ -61,6 +282,10 @@ def init_database():
             )
         ''')
         
+        # Keyset pagination indexes (newest first, id as tie-breaker)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_naval_units_created_at ON naval_units (created_at, id)')
+        
         # Template states for each unit - stores element states per template
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS unit_template_states (
@@ -101,6 +326,16 @@ def init_database():
             )
         ''')
 
+        # Per-unit lookups for the detail loader
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_unit_characteristics_unit_order
+            ON unit_characteristics (naval_unit_id, order_index)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_unit_gallery_unit_order
+            ON unit_gallery (naval_unit_id, order_index)
+        ''')
+
         # Groups table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS groups (
@@ -116,6 +351,8 @@ def init_database():
             )
         ''')
         
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_groups_created_at ON groups (created_at, id)')
+        
         # Group memberships table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS group_memberships (
@@ -137,6 +374,12 @@ def init_database():
             # Column already exists
             pass
         
+        # Ordered membership lookups for group listings
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_group_memberships_group_order
+            ON group_memberships (group_id, order_index)
+        ''')
+        
         # Templates table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS templates (
@@ -192,6 +435,11 @@ def init_database():
             )
         ''')
         
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_quiz_sessions_status_completed
+            ON quiz_sessions (status, completed_at, id)
+        ''')
+        
         # Quiz questions table (stores individual questions for each session)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS quiz_questions (
@@ -232,8 +480,39 @@ def init_database():
             )
         ''')
 
+        # Background export jobs (group/unit PowerPoint and PNG exports)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS export_jobs (
+                id TEXT PRIMARY KEY,  -- uuid hex
+                kind TEXT NOT NULL,  -- 'group_powerpoint', 'unit_powerpoint', 'unit_png'
+                target_id INTEGER NOT NULL,  -- group or unit id
+                params TEXT,  -- JSON
+                status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, completed, failed, cancelled
+                progress INTEGER NOT NULL DEFAULT 0,  -- percent
+                message TEXT,
+                result_path TEXT,
+                result_filename TEXT,
+                error TEXT,
+                created_by INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_export_jobs_status_created
+            ON export_jobs (status, created_at)
+        ''')
+
+        # Full-text search index over units
+        global FTS_ENABLED
+        FTS_ENABLED = init_search_index(cursor)
+
         conn.commit()
 
+    migrate_database()
+    create_default_admin()
+
 class SimpleDatabase:
     """Simple database wrapper without SQLAlchemy"""
     
@@ -322,6 +601,9 @@ class SimpleDatabase:
     @staticmethod
     def create_naval_unit(name: str, unit_class: str, created_by: int, **kwargs) -> Optional[int]:
         """Create a new naval unit"""
+        from utils.inline_images import extract_inline_images
+        if kwargs.get('layout_config'):
+            kwargs['layout_config'], _ = extract_inline_images(kwargs['layout_config'])
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
@@ -355,67 +637,27 @@ class SimpleDatabase:
             return cursor.lastrowid
     
     @staticmethod
-    def get_naval_units(skip: int = 0, limit: int = 100) -> List[Dict]:
-        """Get list of naval units"""
+    def get_naval_units(skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                        fields: Optional[str] = 'summary') -> List[Dict]:
+        """Get list of naval units (cursor takes precedence over skip)"""
+        columns = unit_columns(fields)
+        where, params = _page_clause(cursor)
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM naval_units ORDER BY created_at DESC LIMIT ? OFFSET ?
-            ''', (limit, skip))
-            
-            units = []
-            for row in cursor.fetchall():
-                unit = dict(row)
-                
-                # Parse JSON fields (same as get_naval_unit_by_id)
-                if unit['layout_config']:
-                    try:
-                        unit['layout_config'] = json.loads(unit['layout_config'])
-                    except:
-                        unit['layout_config'] = {}
-                
-                units.append(unit)
-            
-            return units
+            db_cursor = conn.cursor()
+            db_cursor.execute(f'''
+                SELECT {columns} FROM naval_units {'WHERE ' + where if where else ''}
+                ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?
+            ''', params + [limit, 0 if cursor else skip])
+            return [_unit_from_list_row(row) for row in db_cursor.fetchall()]
     
     @staticmethod
     def get_naval_unit_by_id(unit_id: int) -> Optional[Dict]:
-        """Get naval unit by ID with characteristics"""
+        """Get naval unit by ID with characteristics and gallery (single query)"""
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            
-            # Get unit
-            cursor.execute('SELECT * FROM naval_units WHERE id = ?', (unit_id,))
-            unit_row = cursor.fetchone()
-            if not unit_row:
-                return None
-            
-            unit = dict(unit_row)
-            
-            # Get characteristics
-            cursor.execute('''
-                SELECT * FROM unit_characteristics
-                WHERE naval_unit_id = ?
-                ORDER BY order_index
-            ''', (unit_id,))
-            unit['characteristics'] = [dict(row) for row in cursor.fetchall()]
-
-            # Get gallery images
-            cursor.execute('''
-                SELECT * FROM unit_gallery
-                WHERE naval_unit_id = ?
-                ORDER BY order_index
-            ''', (unit_id,))
-            unit['gallery'] = [dict(row) for row in cursor.fetchall()]
-
-            # Parse JSON fields
-            if unit['layout_config']:
-                try:
-                    unit['layout_config'] = json.loads(unit['layout_config'])
-                except:
-                    unit['layout_config'] = {}
-
-            return unit
+            cursor.execute(f'{UNIT_DETAIL_SELECT} WHERE nu.id = ?', (unit_id,))
+            row = cursor.fetchone()
+            return _unit_from_detail_row(row) if row else None
     
     @staticmethod
     def add_characteristic(unit_id: int, name: str, value: str, order_index: int = 0) -> int:
@@ -539,29 +781,54 @@ class SimpleDatabase:
             return None
 
     @staticmethod
-    def search_naval_units(query: str, search_type: str = "all") -> List[Dict]:
-        """Search naval units"""
+    def search_naval_units(query: str, search_type: str = "all", limit: int = 50,
+                           fields: Optional[str] = 'summary') -> List[Dict]:
+        """Search naval units, best matches first (prefix matching on every word)"""
+        if not FTS_ENABLED:
+            return SimpleDatabase._search_naval_units_like(query, search_type, limit, fields)
+        
+        columns = unit_columns(fields, 'nu')
+        fts_query = build_fts_query(query, search_type)
+        if not fts_query:
+            return []
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {columns} FROM naval_units_fts
+                JOIN naval_units nu ON nu.id = naval_units_fts.rowid
+                WHERE naval_units_fts MATCH ?
+                ORDER BY bm25(naval_units_fts, {', '.join(str(w) for w in FTS_RANK_WEIGHTS)})
+                LIMIT ?
+            ''', (fts_query, limit))
+            return [_unit_from_list_row(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _search_naval_units_like(query: str, search_type: str = "all", limit: int = 50,
+                                 fields: Optional[str] = 'summary') -> List[Dict]:
+        """Search naval units with LIKE (used when FTS5 is not available)"""
+        columns = unit_columns(fields)
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
             if search_type == "name":
-                sql = "SELECT * FROM naval_units WHERE name LIKE ?"
+                sql = f"SELECT {columns} FROM naval_units WHERE name LIKE ?"
                 params = (f"%{query}%",)
             elif search_type == "class":
-                sql = "SELECT * FROM naval_units WHERE unit_class LIKE ?"
+                sql = f"SELECT {columns} FROM naval_units WHERE unit_class LIKE ?"
                 params = (f"%{query}%",)
             elif search_type == "nation":
-                sql = "SELECT * FROM naval_units WHERE nation LIKE ?"
+                sql = f"SELECT {columns} FROM naval_units WHERE nation LIKE ?"
                 params = (f"%{query}%",)
             else:  # all
-                sql = """
-                    SELECT * FROM naval_units 
+                sql = f"""
+                    SELECT {columns} FROM naval_units 
                     WHERE name LIKE ? OR unit_class LIKE ? OR nation LIKE ?
                 """
                 params = (f"%{query}%", f"%{query}%", f"%{query}%")
             
-            cursor.execute(sql, params)
-            return [dict(row) for row in cursor.fetchall()]
+            cursor.execute(f"{sql} LIMIT ?", params + (limit,))
+            return [_unit_from_list_row(row) for row in cursor.fetchall()]
     
     # Group operations
 
@@ -588,6 +855,8 @@ class SimpleDatabase:
                 except Exception as e:
                     if "UNIQUE constraint failed" in str(e):
                         continue  # Skip duplicates
+                    elif "FOREIGN KEY constraint failed" in str(e):
+                        continue  # Skip units that no longer exist
                     else:
                         raise e
             
@@ -595,31 +864,50 @@ class SimpleDatabase:
             return group_id
     
     @staticmethod
-    def get_groups(skip: int = 0, limit: int = 100) -> List[Dict]:
-        """Get list of groups with naval units"""
+    def get_groups(skip: int = 0, limit: int = 100, summary: bool = False, cursor: Optional[str] = None) -> List[Dict]:
+        """Get list of groups with naval units (summary=True returns only id, name, class and nation per unit)"""
+        where, params = _page_clause(cursor)
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM groups ORDER BY created_at DESC LIMIT ? OFFSET ?
-            ''', (limit, skip))
-            
-            groups = []
-            for group_row in cursor.fetchall():
-                group = dict(group_row)
-                
-                # Get naval units for this group in order
-                cursor.execute('''
-                    SELECT nu.* FROM naval_units nu
-                    JOIN group_memberships gm ON nu.id = gm.naval_unit_id
-                    WHERE gm.group_id = ?
-                    ORDER BY gm.order_index ASC
-                ''', (group['id'],))
-                group['naval_units'] = [dict(row) for row in cursor.fetchall()]
-                
-                groups.append(group)
+            db_cursor = conn.cursor()
+            db_cursor.execute(f'''
+                SELECT * FROM groups {'WHERE ' + where if where else ''}
+                ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?
+            ''', params + [limit, 0 if cursor else skip])
+            groups = [dict(row) for row in db_cursor.fetchall()]
             
+            SimpleDatabase._attach_group_units(db_cursor, groups, summary)
             return groups
     
+    @staticmethod
+    def _attach_group_units(cursor: sqlite3.Cursor, groups: List[Dict], summary: bool = False) -> None:
+        """Load the naval units of all given groups with a single query"""
+        groups_by_id = {}
+        for group in groups:
+            group['naval_units'] = []
+            groups_by_id[group['id']] = group
+        if not groups_by_id:
+            return
+        
+        columns = 'nu.id, nu.name, nu.unit_class, nu.nation' if summary else 'nu.*'
+        placeholders = ','.join('?' * len(groups_by_id))
+        cursor.execute(f'''
+            SELECT gm.group_id AS membership_group_id, {columns}
+            FROM group_memberships gm
+            JOIN naval_units nu ON nu.id = gm.naval_unit_id
+            WHERE gm.group_id IN ({placeholders})
+            ORDER BY gm.group_id, gm.order_index ASC, gm.id ASC
+        ''', list(groups_by_id))
+        
+        for row in cursor.fetchall():
+            unit = dict(row)
+            group_id = unit.pop('membership_group_id')
+            if not summary and unit['layout_config']:
+                try:
+                    unit['layout_config'] = json.loads(unit['layout_config'])
+                except:
+                    unit['layout_config'] = {}
+            groups_by_id[group_id]['naval_units'].append(unit)
+    
     @staticmethod
     def get_group_by_id(group_id: int) -> Optional[Dict]:
         """Get group by ID with naval units"""
@@ -655,7 +943,35 @@ class SimpleDatabase:
             
             group['naval_units'] = naval_units
             return group
-    
+
+    @staticmethod
+    def get_group_unit(group_id: int, unit_id: int) -> Optional[Dict]:
+        """Get one naval unit of a group (as get_group_by_id returns it), or None if it is not a member"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT nu.* FROM group_memberships gm
+                JOIN naval_units nu ON nu.id = gm.naval_unit_id
+                WHERE gm.group_id = ? AND gm.naval_unit_id = ?
+            ''', (group_id, unit_id))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            unit = dict(row)
+            if unit['layout_config']:
+                try:
+                    unit['layout_config'] = json.loads(unit['layout_config'])
+                except:
+                    unit['layout_config'] = {}
+            return unit
+
+    @staticmethod
+    def group_exists(group_id: int) -> bool:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1 FROM groups WHERE id = ?', (group_id,))
+            return cursor.fetchone() is not None
+
     @staticmethod
     def update_group(group_id: int, name: str = None, description: str = None, naval_unit_ids: List[int] = None) -> bool:
         """Update a group"""
@@ -685,10 +1001,15 @@ class SimpleDatabase:
                 
                 # Add new memberships with order
                 for order_index, unit_id in enumerate(naval_unit_ids):
-                    cursor.execute('''
-                        INSERT INTO group_memberships (group_id, naval_unit_id, order_index)
-                        VALUES (?, ?, ?)
-                    ''', (group_id, unit_id, order_index))
+                    try:
+                        cursor.execute('''
+                            INSERT INTO group_memberships (group_id, naval_unit_id, order_index)
+                            VALUES (?, ?, ?)
+                        ''', (group_id, unit_id, order_index))
+                    except sqlite3.IntegrityError as e:
+                        if "FOREIGN KEY constraint failed" in str(e):
+                            continue  # Skip units that no longer exist
+                        raise e
             
             conn.commit()
             return cursor.rowcount > 0 or naval_unit_ids is not None
@@ -740,6 +1061,12 @@ class SimpleDatabase:
     @staticmethod
     def update_naval_unit(unit_id: int, **kwargs) -> bool:
         """Update naval unit fields"""
+        from utils.inline_images import extract_inline_images
+        if kwargs.get('layout_config'):
+            # Embedded data: URIs become blob paths, so the row (and the path columns below) stay small
+            kwargs['layout_config'], extracted = extract_inline_images(kwargs['layout_config'])
+            if extracted:
+                print(f"Moved {extracted} inline images of unit {unit_id} to the blob store")
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
@@ -784,6 +1111,9 @@ class SimpleDatabase:
         """Delete a naval unit"""
         with get_db_connection() as conn:
             cursor = conn.cursor()
+            # quiz_questions has no ON DELETE CASCADE; with foreign keys enforced
+            # its rows would block the delete (they were unreachable afterwards anyway)
+            cursor.execute('DELETE FROM quiz_questions WHERE naval_unit_id = ?', (unit_id,))
             cursor.execute('DELETE FROM naval_units WHERE id = ?', (unit_id,))
             conn.commit()
             return cursor.rowcount > 0
@@ -809,12 +1139,16 @@ class SimpleDatabase:
     
     # Admin operations
     @staticmethod
-    def get_all_users(skip: int = 0, limit: int = 100) -> List[Dict]:
-        """Get all users"""
+    def get_all_users(skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Dict]:
+        """Get all users (cursor takes precedence over skip)"""
+        where, params = _page_clause(cursor)
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM users ORDER BY created_at DESC LIMIT ? OFFSET ?', (limit, skip))
-            return [dict(row) for row in cursor.fetchall()]
+            db_cursor = conn.cursor()
+            db_cursor.execute(f'''
+                SELECT * FROM users {'WHERE ' + where if where else ''}
+                ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?
+            ''', params + [limit, 0 if cursor else skip])
+            return [dict(row) for row in db_cursor.fetchall()]
     
     @staticmethod
     def get_pending_users() -> List[Dict]:
@@ -846,7 +1180,10 @@ class SimpleDatabase:
     @staticmethod
     def save_unit_template_state(unit_id: int, template_id: str, element_states: dict, canvas_config: dict) -> bool:
         """Save the state of elements for a specific template"""
+        from utils.inline_images import extract_inline_images
         try:
+            element_states, _ = extract_inline_images(element_states)
+            canvas_config, _ = extract_inline_images(canvas_config)
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
@@ -1523,18 +1860,19 @@ class SimpleDatabase:
             return False
 
     @staticmethod
-    def get_quiz_history(limit: int = 50) -> List[Dict]:
-        """Get quiz session history"""
+    def get_quiz_history(limit: int = 50, cursor: Optional[str] = None) -> List[Dict]:
+        """Get quiz session history (cursor pages by completed_at)"""
+        where, params = _page_clause(cursor, 'completed_at')
         try:
             with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
+                db_cursor = conn.cursor()
+                db_cursor.execute(f'''
                     SELECT * FROM quiz_sessions 
-                    WHERE status = 'completed'
-                    ORDER BY completed_at DESC 
+                    WHERE status = 'completed' {'AND ' + where if where else ''}
+                    ORDER BY completed_at DESC, id DESC 
                     LIMIT ?
-                ''', (limit,))
-                return [dict(row) for row in cursor.fetchall()]
+                ''', params + [limit])
+                return [dict(row) for row in db_cursor.fetchall()]
         except Exception as e:
             print(f"Error getting quiz history: {e}")
             return []
@@ -1555,8 +1893,147 @@ class SimpleDatabase:
             print(f"Error getting nations with units: {e}")
             return []
 
-# Initialize database on import
-init_database()
+    # Export job methods
+    @staticmethod
+    def create_export_job(job_id: str, kind: str, target_id: int, params: Dict = None,
+                          created_by: Optional[int] = None) -> Dict:
+        """Queue an export job"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO export_jobs (id, kind, target_id, params, created_by)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (job_id, kind, target_id, json.dumps(params or {}), created_by))
+            conn.commit()
+        return SimpleDatabase.get_export_job(job_id)
+
+    @staticmethod
+    def get_export_job(job_id: str) -> Optional[Dict]:
+        """Get an export job by ID"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM export_jobs WHERE id = ?', (job_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            job = dict(row)
+            job['params'] = json.loads(job['params']) if job['params'] else {}
+            return job
+
+    @staticmethod
+    def claim_next_export_job() -> Optional[Dict]:
+        """Mark the oldest queued job as running and return it (None when the queue is empty)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            # BEGIN IMMEDIATE takes the write lock first, so two workers never claim the same job
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT id FROM export_jobs WHERE status = 'queued'
+                ORDER BY created_at, rowid LIMIT 1
+            ''')
+            row = cursor.fetchone()
+            if not row:
+                conn.rollback()
+                return None
+            cursor.execute('''
+                UPDATE export_jobs SET status = 'running', started_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (row['id'],))
+            conn.commit()
+        return SimpleDatabase.get_export_job(row['id'])
+
+    @staticmethod
+    def update_export_job_progress(job_id: str, progress: int, message: str = None) -> bool:
+        """Record progress of a running job; False when the job is no longer running (cancelled)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE export_jobs SET progress = ?, message = COALESCE(?, message)
+                WHERE id = ? AND status = 'running'
+            ''', (max(0, min(100, int(progress))), message, job_id))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def finish_export_job(job_id: str, status: str, result_path: str = None, result_filename: str = None,
+                          error: str = None) -> bool:
+        """Move a running job to completed/failed; a cancelled job stays cancelled"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE export_jobs
+                SET status = ?, progress = CASE WHEN ? = 'completed' THEN 100 ELSE progress END,
+                    result_path = ?, result_filename = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'running'
+            ''', (status, status, result_path, result_filename, error, job_id))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def cancel_export_job(job_id: str) -> bool:
+        """Cancel a queued or running job (running jobs stop at their next progress update)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE export_jobs SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status IN ('queued', 'running')
+            ''', (job_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def requeue_interrupted_export_jobs() -> int:
+        """Put jobs left 'running' by a previous server process back in the queue"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE export_jobs SET status = 'queued', progress = 0, started_at = NULL
+                WHERE status = 'running'
+            ''')
+            conn.commit()
+            return cursor.rowcount
+
+    @staticmethod
+    def delete_expired_export_jobs(max_age_hours: int = 24) -> List[Dict]:
+        """Delete finished jobs older than max_age_hours and return them (for result file cleanup)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, result_path FROM export_jobs
+                WHERE status IN ('completed', 'failed', 'cancelled')
+                AND finished_at < datetime('now', ?)
+            ''', (f'-{int(max_age_hours)} hours',))
+            expired = [dict(row) for row in cursor.fetchall()]
+            cursor.executemany('DELETE FROM export_jobs WHERE id = ?', [(job['id'],) for job in expired])
+            conn.commit()
+            return expired
+
+    @staticmethod
+    def iter_image_reference_texts():
+        """Yield every stored value that may reference an uploaded image (paths and JSON documents)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            for table, column in IMAGE_REFERENCE_COLUMNS:
+                cursor.execute(f'SELECT {column} FROM {table} WHERE {column} IS NOT NULL')
+                for row in cursor:
+                    yield row[0]
+
+    @staticmethod
+    def extract_stored_inline_images() -> int:
+        """Move base64 images embedded in stored rows to the blob store; returns the number moved"""
+        from utils.inline_images import extract_inline_images_from_text
+        moved = 0
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            for table, column in IMAGE_REFERENCE_COLUMNS:
+                cursor.execute(f"SELECT rowid, {column} FROM {table} WHERE {column} LIKE '%data:image/%'")
+                for row in cursor.fetchall():
+                    text, count = extract_inline_images_from_text(row[1])
+                    if count:
+                        cursor.execute(f'UPDATE {table} SET {column} = ? WHERE rowid = ?', (text, row[0]))
+                        moved += count
+            conn.commit()
+        return moved
 
 # Create default admin user if not exists
 def create_default_admin():
@@ -1604,9 +2081,10 @@ def migrate_database():
             ''')
             conn.commit()
             print("Created unit_template_states table")
+        
+        # Move inline base64 images out of layouts and template states (a no-op once done)
+        moved = SimpleDatabase.extract_stored_inline_images()
+        if moved:
+            print(f"Moved {moved} inline images to the blob store")
     except Exception as e:
         print(f"Migration error: {e}")
-
-# Run migrations and create default admin
-migrate_database()
-create_default_admin()
\ No newline at end of file
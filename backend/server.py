@@ -0,0 +1,10 @@
+"""Backend entry point: python server.py
+
+Render worker processes are spawned, and spawn re-imports the entry module in every
+worker. Keeping it this small means workers load only the renderers, not the API app,
+its database initialization and migrations.
+"""
+
+if __name__ == "__main__":
+    from simple_main import serve
+    serve()
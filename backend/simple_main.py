@@ -1,10 +1,10 @@
 from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Awaitable, Callable
 import os
 import shutil
 from uuid import uuid4
@@ -15,9 +15,26 @@ import hashlib
 import tempfile
 import io
 import json
-
-from app.simple_database import SimpleDatabase, init_database, get_db_connection
-from utils.powerpoint_export import create_group_powerpoint, create_unit_powerpoint, create_unit_powerpoint_to_buffer
+import asyncio
+
+from app.simple_database import SimpleDatabase, init_database, get_db_connection, db_pool, get_db_pool_stats, make_next_cursor
+from utils.render_executor import (render_executor, RenderQueueFull, RenderTimeout, render_unit_png_job,
+                                   render_unit_powerpoint_job, render_group_powerpoint_job, render_contact_sheet_job)
+from utils.render_cache import render_cache, render_key
+from utils.fonts import scan_fonts
+from utils.export_jobs import export_job_queue, EXPORT_JOB_TIMEOUT
+from utils.export_job_tasks import run_group_powerpoint_export
+from utils.export_buffer import ExportArtifact
+from utils.artifact_store import artifact_store, group_export_key
+from utils.single_flight import export_flights
+from utils.uploads import (store_upload, UploadRejected, IMAGE_TYPES, MAX_FILE_SIZE, MAX_RESTORE_SIZE)
+from utils.blob_store import blob_store, GC_GRACE_HOURS
+from utils.derivatives import best_variant, derivative_generator, DERIVATIVE_SIZES
+from utils.remote_assets import remote_assets
+from utils.presentation_warmup import presentation_warmup, slide_etag, etag_matches
+from utils.group_png_export import (open_card_zip, add_card, GROUP_PNG_CONCURRENCY, MAX_SHEET_COLUMNS,
+                                    MIN_TILE_WIDTH, MAX_TILE_WIDTH)
+from starlette.concurrency import run_in_threadpool
 from api.quiz import router as quiz_router
 import threading
 import time
@@ -34,8 +51,6 @@ app.add_middleware(
 )
 
 import uvicorn.config
-# Imposta limite file upload a 50MB
-MAX_FILE_SIZE = 50 * 1024 * 1024
 
 # Include quiz router
 app.include_router(quiz_router, prefix="/api", tags=["quiz"])
@@ -59,6 +74,7 @@ app.add_middleware(
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
+from starlette.background import BackgroundTask
 
 class StaticFilesCORSMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
@@ -75,6 +91,83 @@ class StaticFilesCORSMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(StaticFilesCORSMiddleware)
 
+# Room for multipart boundaries, part headers and small form fields around the file itself
+MULTIPART_OVERHEAD = 1024 * 1024
+# Upload routes allowed more than MAX_FILE_SIZE
+UPLOAD_SIZE_LIMITS = {"/api/admin/database/upload": MAX_RESTORE_SIZE}
+
+class UploadSizeLimitMiddleware:
+    """Reject multipart bodies over the upload limit before Starlette spools the form.
+
+    A declared Content-Length over the limit gets 413 without reading the body; a body sent
+    without one gets 413 as soon as the limit is crossed, and the route sees a client
+    disconnect. store_upload still enforces the exact per-file limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            return await self.app(scope, receive, send)
+
+        limit = UPLOAD_SIZE_LIMITS.get(scope["path"], MAX_FILE_SIZE) + MULTIPART_OVERHEAD
+        too_large = JSONResponse(status_code=413, content={"detail": f"Upload too large (limit {limit / (1024 * 1024):.4g} MB)"})
+        content_length = headers.get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            return await too_large(scope, receive, send)
+
+        received = 0
+        rejected = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit and not response_started:
+                    rejected = True
+                    await too_large(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if rejected:
+                return  # the 413 has been sent; drop the route's error response
+            response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Render executor backpressure: tell clients to retry instead of queueing without bound
+@app.exception_handler(RenderQueueFull)
+async def render_queue_full_handler(request: Request, exc: RenderQueueFull):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+@app.exception_handler(RenderTimeout)
+async def render_timeout_handler(request: Request, exc: RenderTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.on_event("startup")
+def start_export_job_workers():
+    # Tables, migrations and the default admin; done here, not on import, so render workers never run them
+    init_database()
+    export_job_queue.start()
+
+@app.on_event("shutdown")
+def stop_render_executor():
+    export_job_queue.stop()
+    render_executor.shutdown()
+
 # Create data and uploads directories if they don't exist
 os.makedirs("./data", exist_ok=True)
 UPLOAD_DIR = "./data/uploads"
@@ -183,66 +276,43 @@ def get_admin_user(user: dict = Depends(get_current_user)):
 # File upload helper
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".svg"}
 
-def save_uploaded_file(file: UploadFile, subfolder: str) -> str:
-    print(f"🔍 save_uploaded_file called - filename: {file.filename}, subfolder: {subfolder}")
-    
+async def save_uploaded_file(file: UploadFile, subfolder: str) -> str:
+    """Stream an uploaded image into the blob store and return its relative path.
+
+    Identical content is stored once whatever the subfolder; the subfolder only labels the log line.
+    """
     if not file.filename:
-        print("❌ No filename provided")
         raise HTTPException(status_code=400, detail="No file selected")
     
     file_extension = os.path.splitext(file.filename)[1].lower()
-    print(f"🔍 File extension: {file_extension}")
-    
     if file_extension not in ALLOWED_EXTENSIONS:
-        print(f"❌ Invalid file extension. Allowed: {ALLOWED_EXTENSIONS}")
         raise HTTPException(status_code=400, detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
-    
-    unique_filename = f"{uuid4()}{file_extension}"
-    full_file_path = os.path.join(UPLOAD_DIR, subfolder, unique_filename)
-    
-    print(f"🔍 Full file path: {full_file_path}")
-    print(f"🔍 UPLOAD_DIR: {UPLOAD_DIR}")
-    print(f"🔍 Directory exists: {os.path.exists(os.path.dirname(full_file_path))}")
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail=f"File too large (limit {MAX_FILE_SIZE / (1024 * 1024):.3g} MB)")
     
     try:
-        os.makedirs(os.path.dirname(full_file_path), exist_ok=True)
-        print(f"✅ Directory created/exists: {os.path.dirname(full_file_path)}")
-        
-        # Check directory permissions
-        dir_path = os.path.dirname(full_file_path)
-        print(f"🔍 Directory writable: {os.access(dir_path, os.W_OK)}")
-        print(f"🔍 Directory readable: {os.access(dir_path, os.R_OK)}")
-        
-        with open(full_file_path, "wb") as buffer:
-            file.file.seek(0)  # Reset file pointer
-            content = file.file.read()
-            print(f"🔍 File content length: {len(content)} bytes")
-            buffer.write(content)
-        
-        print(f"✅ File written successfully: {full_file_path}")
-        print(f"🔍 File exists after write: {os.path.exists(full_file_path)}")
-        
-        if os.path.exists(full_file_path):
-            file_size = os.path.getsize(full_file_path)
-            print(f"🔍 Final file size: {file_size} bytes")
-    
-    except PermissionError as e:
-        print(f"❌ Permission error: {e}")
-        raise HTTPException(status_code=500, detail=f"Permission denied: {str(e)}")
+        # The content decides the stored name and extension, not the name the client sent
+        await file.seek(0)
+        relative_path, stored, existed = await run_in_threadpool(blob_store.save, file.file, IMAGE_TYPES)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except OSError as e:
-        print(f"❌ OS error: {e}")
+        print(f"❌ Failed to store upload {file.filename}: {e}")
         raise HTTPException(status_code=500, detail=f"File system error: {str(e)}")
-    except Exception as e:
-        print(f"❌ Unexpected error: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
     
-    # Return relative path for database storage (subfolder/filename) with forward slashes
-    relative_path = f"{subfolder}/{unique_filename}"
-    print(f"✅ Returning relative path: {relative_path}")
+    print(f"✅ {subfolder} upload {'matched existing' if existed else 'stored as'} {relative_path} ({stored.size} bytes)")
+    # Thumbnail and display sizes are written in the background; existing ones are kept
+    derivative_generator.schedule(stored.path)
+    # Return relative path for database storage with forward slashes
     return relative_path
 
+# Pagination helper
+def set_next_cursor_header(response: Response, rows: List[Dict], limit: int):
+    """Expose the keyset cursor of the next page for list responses"""
+    next_cursor = make_next_cursor(rows, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
 # Routes
 @app.get("/")
 async def root():
@@ -275,32 +345,49 @@ async def debug_upload_dirs():
 @app.post("/api/upload-image")
 async def upload_image(image: UploadFile = File(...), subfolder: str = Form("general")):
     """Upload an image file and return the file path"""
-    try:
-        print(f"🔍 Upload request - File: {image.filename}, Content-Type: {image.content_type}, Subfolder: {subfolder}")
-        
-        # Validate file type
-        if not image.content_type or not image.content_type.startswith("image/"):
-            print(f"❌ Invalid content type: {image.content_type}")
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Check if upload directory exists and is writable
-        upload_path = os.path.join(UPLOAD_DIR, subfolder)
-        print(f"🔍 Upload path: {upload_path}")
-        print(f"🔍 Upload dir exists: {os.path.exists(upload_path)}")
-        print(f"🔍 Upload dir writable: {os.access(upload_path, os.W_OK) if os.path.exists(upload_path) else 'N/A'}")
-        
-        # Use the same save function to maintain consistency
-        file_path = save_uploaded_file(image, subfolder)
-        print(f"✅ File saved successfully: {file_path}")
-        
-        # Return relative path for database storage
-        return {"file_path": file_path}
-        
-    except Exception as e:
-        print(f"❌ Upload error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error uploading image: {str(e)}")
+    # Validate file type
+    if not image.content_type or not image.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    file_path = await save_uploaded_file(image, subfolder)
+    
+    # Return relative path for database storage
+    return {"file_path": file_path}
+
+@app.get("/api/images/variant")
+async def get_image_variant(request: Request, path: str, width: int = 0, format: str = "auto"):
+    """Serve the smallest stored size of an uploaded image that is at least width pixels wide"""
+    if format not in ("auto", "webp", "png"):
+        raise HTTPException(status_code=400, detail="format must be auto, webp or png")
+    if format == "auto":
+        format = "webp" if "image/webp" in request.headers.get("accept", "") else "png"
+    
+    # Accept the forms stored in the database: "/uploads/...", "uploads/..." or relative to the uploads dir
+    relative_path = path.split("?")[0].lstrip("/")
+    if relative_path.startswith("uploads/"):
+        relative_path = relative_path[len("uploads/"):]
+    upload_root = os.path.realpath(UPLOAD_DIR)
+    original = os.path.realpath(os.path.join(UPLOAD_DIR, relative_path))
+    if os.path.commonpath([upload_root, original]) != upload_root or not os.path.isfile(original):
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    variant = await run_in_threadpool(best_variant, os.path.join(UPLOAD_DIR, relative_path),
+                                      max(width, 1), format)
+    # Blob names are content hashes, so their variants never change
+    immutable = relative_path.startswith("blobs/")
+    media_types = {".webp": "image/webp", ".png": "image/png", ".jpg": "image/jpeg",
+                   ".jpeg": "image/jpeg", ".svg": "image/svg+xml"}
+    return FileResponse(variant, media_type=media_types.get(os.path.splitext(variant)[1].lower()), headers={
+        "Cache-Control": "public, max-age=31536000, immutable" if immutable else "public, max-age=3600",
+        "Vary": "Accept",
+    })
+
+@app.get("/api/admin/derivatives/stats")
+async def derivative_stats(admin: dict = Depends(get_admin_user)):
+    """Get background image derivative generation counters (admin only)"""
+    stats = derivative_generator.stats()
+    stats['sizes'] = list(DERIVATIVE_SIZES)
+    return stats
 
 # Auth routes
 @app.post("/api/auth/register")
@@ -356,8 +443,15 @@ async def get_me(user: dict = Depends(get_current_user)):
 
 # Naval units routes
 @app.get("/api/units")
-async def get_naval_units(skip: int = 0, limit: int = 100, user: dict = Depends(get_current_user)):
-    units = SimpleDatabase.get_naval_units(skip, limit)
+async def get_naval_units(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                          fields: str = "summary", user: dict = Depends(get_current_user)):
+    """List naval units; pass the X-Next-Cursor header back as cursor to get the next page.
+    fields is "summary" (default), "full" or a comma-separated column list."""
+    try:
+        units = SimpleDatabase.get_naval_units(skip, limit, cursor, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor_header(response, units, limit)
     return units
 
 @app.get("/api/units/{unit_id}")
@@ -406,8 +500,14 @@ async def create_naval_unit(unit: NavalUnitCreate, user: dict = Depends(get_curr
     return {"message": "Naval unit created", "id": unit_id}
 
 @app.get("/api/units/search/")
-async def search_units(q: str, search_type: str = "all", user: dict = Depends(get_current_user)):
-    units = SimpleDatabase.search_naval_units(q, search_type)
+async def search_units(q: str, search_type: str = "all", limit: int = 50, fields: str = "summary",
+                       user: dict = Depends(get_current_user)):
+    """Ranked full-text search; each word matches as a prefix (type-ahead)"""
+    limit = max(1, min(limit, 200))
+    try:
+        units = SimpleDatabase.search_naval_units(q, search_type, limit, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"naval_units": units, "total_count": len(units)}
 
 # File upload routes
@@ -418,11 +518,15 @@ async def update_naval_unit(unit_id: int, unit: dict, user: dict = Depends(get_c
     print(f"🔍 Update success: {success}")
     if not success:
         raise HTTPException(status_code=404, detail="Naval unit not found")
+    render_cache.invalidate_unit(unit_id)
+    refresh_presentations([unit_id])
     return {"message": "Naval unit updated successfully"}
 
 @app.delete("/api/units/{unit_id}")
 async def delete_naval_unit(unit_id: int, user: dict = Depends(get_current_user)):
     if SimpleDatabase.delete_naval_unit(unit_id):
+        render_cache.invalidate_unit(unit_id)
+        refresh_presentations([unit_id])
         return {"message": "Naval unit deleted successfully"}
     raise HTTPException(status_code=404, detail="Naval unit not found")
 
@@ -432,8 +536,10 @@ async def upload_logo(unit_id: int, file: UploadFile = File(...), user: dict = D
     if not unit:
         raise HTTPException(status_code=404, detail="Naval unit not found")
     
-    file_path = save_uploaded_file(file, "logos")
+    file_path = await save_uploaded_file(file, "logos")
     SimpleDatabase.update_naval_unit_logo(unit_id, file_path)
+    render_cache.invalidate_unit(unit_id)
+    refresh_presentations([unit_id])
     return {"message": "Logo uploaded successfully", "file_path": file_path}
 
 @app.post("/api/units/{unit_id}/upload-silhouette")
@@ -442,8 +548,10 @@ async def upload_silhouette(unit_id: int, file: UploadFile = File(...), user: di
     if not unit:
         raise HTTPException(status_code=404, detail="Naval unit not found")
     
-    file_path = save_uploaded_file(file, "silhouettes")
+    file_path = await save_uploaded_file(file, "silhouettes")
     SimpleDatabase.update_naval_unit_silhouette(unit_id, file_path)
+    render_cache.invalidate_unit(unit_id)
+    refresh_presentations([unit_id])
     return {"message": "Silhouette uploaded successfully", "file_path": file_path}
 
 @app.post("/api/units/{unit_id}/upload-flag")
@@ -452,8 +560,10 @@ async def upload_flag(unit_id: int, file: UploadFile = File(...), user: dict = D
     if not unit:
         raise HTTPException(status_code=404, detail="Naval unit not found")
 
-    file_path = save_uploaded_file(file, "flags")
+    file_path = await save_uploaded_file(file, "flags")
     SimpleDatabase.update_naval_unit_flag(unit_id, file_path)
+    render_cache.invalidate_unit(unit_id)
+    refresh_presentations([unit_id])
     return {"message": "Flag uploaded successfully", "file_path": file_path}
 
 @app.post("/api/units/{unit_id}/gallery/upload")
@@ -467,7 +577,7 @@ async def upload_gallery_image(
     if not unit:
         raise HTTPException(status_code=404, detail="Naval unit not found")
 
-    file_path = save_uploaded_file(file, "gallery")
+    file_path = await save_uploaded_file(file, "gallery")
 
     # Get current gallery count for order_index
     gallery = SimpleDatabase.get_unit_gallery(unit_id)
@@ -554,6 +664,17 @@ async def export_unit_powerpoint_public(unit_id: int, template_config: dict = No
     """Export a single naval unit to PowerPoint presentation (public, no auth required)"""
     return await _export_unit_powerpoint_internal(unit_id, template_config)
 
+def artifact_response(artifact: ExportArtifact, media_type: str, headers: Dict[str, str],
+                      discard: bool = True) -> Response:
+    """Send a rendered export: bytes directly, spool files streamed in chunks and deleted afterwards.
+
+    Spool files shared by coalesced requests (discard=False) are left to the temp file cleanup.
+    """
+    if artifact.path:
+        return FileResponse(artifact.path, media_type=media_type, headers=headers,
+                            background=BackgroundTask(artifact.discard) if discard else None)
+    return Response(content=artifact.data, media_type=media_type, headers=headers)
+
 async def _export_unit_powerpoint_internal(unit_id: int, template_config: dict = None):
     """Export a single naval unit to PowerPoint presentation"""
     
@@ -568,16 +689,14 @@ async def _export_unit_powerpoint_internal(unit_id: int, template_config: dict =
         
         print(f"Unit found: {unit['name']}")
         
-        # Create PowerPoint in memory
-        from io import BytesIO
-        output_buffer = BytesIO()
-        
-        print(f"Creating PowerPoint in memory")
         print(f"Template config: {template_config}")
         
-        # Generate PowerPoint presentation using single unit function
-        create_unit_powerpoint_to_buffer(unit, output_buffer, template_config)
-        print(f"PowerPoint created successfully in memory")
+        # Generate PowerPoint presentation in a render worker; identical concurrent requests share it
+        flight_key = f"unit-pptx:{unit_id}:{render_key(unit, 'pptx', template_config)}"
+        artifact, callers = await export_flights.run(
+            flight_key, lambda: render_executor.run(render_unit_powerpoint_job, unit, template_config)
+        )
+        print(f"PowerPoint created successfully ({artifact.size} bytes)")
         
         # Create final filename
         safe_name = "".join(c for c in unit['name'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
@@ -585,16 +704,15 @@ async def _export_unit_powerpoint_internal(unit_id: int, template_config: dict =
             safe_name = f"unit_{unit_id}"
         final_filename = f"{safe_name}_scheda.pptx"
         
-        # Return in-memory file as response
-        output_buffer.seek(0)
-        from fastapi.responses import StreamingResponse
-        
-        return StreamingResponse(
-            io.BytesIO(output_buffer.read()),
+        return artifact_response(
+            artifact,
             media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-            headers={"Content-Disposition": f"attachment; filename={final_filename}"}
+            headers={"Content-Disposition": f"attachment; filename={final_filename}"},
+            discard=callers == 1
         )
         
+    except (HTTPException, RenderQueueFull, RenderTimeout):
+        raise
     except Exception as e:
         print(f"Single unit PowerPoint export error: {str(e)}")
         import traceback
@@ -621,6 +739,20 @@ async def export_unit_png_public(unit_id: int):
     """Export a single naval unit to PNG image (public, no auth required)"""
     return await _export_unit_png_internal(unit_id)
 
+async def render_unit_png(unit: dict, key: Optional[str] = None) -> bytes:
+    """Render a unit card to PNG bytes, reusing the cached render while its content is unchanged"""
+    key = key or render_key(unit, 'png')
+    png_bytes = render_cache.get(unit['id'], key)
+    if png_bytes is None:
+        # Identical concurrent requests share one render
+        png_bytes, _ = await export_flights.run(f"png:{unit['id']}:{key}", lambda: _render_unit_png_into_cache(unit, key))
+    return png_bytes
+
+async def _render_unit_png_into_cache(unit: dict, key: str) -> bytes:
+    png_bytes = await render_executor.run(render_unit_png_job, unit)
+    render_cache.put(unit['id'], key, png_bytes)
+    return png_bytes
+
 async def _export_unit_png_internal(unit_id: int):
     """Export a single naval unit to PNG image"""
     
@@ -635,17 +767,8 @@ async def _export_unit_png_internal(unit_id: int):
         
         print(f"Unit found: {unit['name']}")
         
-        # Create PNG using server-side rendering in memory
-        from utils.png_export import create_unit_png_to_buffer
-        
-        # Create PNG in memory
-        output_buffer = io.BytesIO()
-        
-        print(f"Creating PNG in memory")
-        
-        # Generate PNG image
-        create_unit_png_to_buffer(unit, output_buffer)
-        print(f"PNG created successfully in memory")
+        # Render the card (or reuse a cached render of the same content)
+        png_bytes = await render_unit_png(unit)
         
         # Create final filename
         safe_name = "".join(c for c in unit['name'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
@@ -653,16 +776,15 @@ async def _export_unit_png_internal(unit_id: int):
             safe_name = f"unit_{unit_id}"
         final_filename = f"{safe_name}_scheda.png"
         
-        # Return in-memory file as response
-        output_buffer.seek(0)
-        from fastapi.responses import StreamingResponse
-        
-        return StreamingResponse(
-            io.BytesIO(output_buffer.read()),
+        # Return the rendered bytes as they are (Content-Length set, no extra buffer copy)
+        return Response(
+            content=png_bytes,
             media_type="image/png",
             headers={"Content-Disposition": f"attachment; filename={final_filename}"}
         )
         
+    except (HTTPException, RenderQueueFull, RenderTimeout):
+        raise
     except Exception as e:
         print(f"PNG export error: {str(e)}")
         import traceback
@@ -674,51 +796,74 @@ async def _export_unit_png_internal(unit_id: int):
             detail=f"Error creating PNG image: {str(e)}"
         )
 
+# Slides are revalidated on every view: unchanged ones cost a 304, edited ones show up on the next loop
+SLIDE_CACHE_CONTROL = "public, no-cache"
+
+def warm_presentation(group: dict) -> dict:
+    """Slide manifest of a group, rendering slides not yet in the render cache in the background"""
+    return presentation_warmup.warm(group, render_unit_png)
+
+def refresh_presentations(unit_ids: List[int]):
+    """Re-warm the kept presentations that show any of these units"""
+    for group_id in presentation_warmup.groups_showing(unit_ids):
+        group = SimpleDatabase.get_group_by_id(group_id)
+        if group:
+            warm_presentation(group)
+        else:
+            presentation_warmup.discard(group_id)
+
+def manifest_response(manifest: dict, request: Request, status_code: int = 200) -> Response:
+    headers = {"ETag": manifest['etag'], "Cache-Control": SLIDE_CACHE_CONTROL}
+    if status_code == 200 and etag_matches(request.headers.get('if-none-match'), manifest['etag']):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=manifest, status_code=status_code, headers=headers)
+
+@app.post("/api/groups/{group_id}/presentation/warmup", status_code=202)
+async def warmup_presentation(group_id: int, request: Request, user: dict = Depends(get_current_user)):
+    """Start rendering every slide of a group in the background and return the slide manifest"""
+    group = SimpleDatabase.get_group_by_id(group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return manifest_response(warm_presentation(group), request, status_code=202)
+
+@app.get("/api/groups/{group_id}/presentation/manifest")
+async def get_presentation_manifest(group_id: int, request: Request, user: dict = Depends(get_current_user)):
+    """Slide manifest of a group (ETag per slide and overall), warming it up if it is not yet"""
+    group = SimpleDatabase.get_group_by_id(group_id)
+    if not group:
+        presentation_warmup.discard(group_id)
+        raise HTTPException(status_code=404, detail="Group not found")
+    return manifest_response(warm_presentation(group), request)
+
 @app.get("/api/groups/{group_id}/presentation/slide/{unit_id}")
-async def get_presentation_slide(group_id: int, unit_id: int):
+async def get_presentation_slide(group_id: int, unit_id: int, request: Request):
     """Get a presentation slide as PNG image"""
     
     try:
-        print(f"Presentation slide requested for group {group_id}, unit {unit_id}")
-        
-        # Get the group and unit
-        group = SimpleDatabase.get_group_by_id(group_id)
-        if not group:
-            raise HTTPException(status_code=404, detail="Group not found")
-        
-        # Find the unit in the group
-        unit = None
-        for naval_unit in group.get('naval_units', []):
-            if naval_unit['id'] == unit_id:
-                unit = naval_unit
-                break
-        
+        # Only this unit is loaded; its render key is the slide's ETag
+        unit = SimpleDatabase.get_group_unit(group_id, unit_id)
         if not unit:
+            if not SimpleDatabase.group_exists(group_id):
+                raise HTTPException(status_code=404, detail="Group not found")
             raise HTTPException(status_code=404, detail="Unit not found in group")
         
-        print(f"Found unit: {unit['name']}")
-        
-        # Create PNG in memory using the same logic as PNG export
-        from utils.png_export import create_unit_png_to_buffer
-        
-        output_buffer = io.BytesIO()
+        key = render_key(unit, 'png')
+        headers = {"ETag": slide_etag(key), "Cache-Control": SLIDE_CACHE_CONTROL}
+        if etag_matches(request.headers.get('if-none-match'), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
         
-        print(f"Creating presentation slide in memory")
-        
-        # Generate PNG image
-        create_unit_png_to_buffer(unit, output_buffer)
-        print(f"Presentation slide created successfully")
+        # Same renderer (and render cache) as PNG export; warm presentations are already cached
+        png_bytes = await render_unit_png(unit, key)
         
         # Return as image response
-        output_buffer.seek(0)
-        from fastapi.responses import StreamingResponse
-        
-        return StreamingResponse(
-            io.BytesIO(output_buffer.read()),
+        return Response(
+            content=png_bytes,
             media_type="image/png",
-            headers={"Cache-Control": "public, max-age=300"}  # Cache for 5 minutes
+            headers=headers
         )
         
+    except (HTTPException, RenderQueueFull, RenderTimeout):
+        raise
     except Exception as e:
         print(f"Presentation slide error: {str(e)}")
         import traceback
@@ -731,8 +876,14 @@ async def get_presentation_slide(group_id: int, unit_id: int):
 
 # Admin routes
 @app.get("/api/admin/users")
-async def get_all_users(skip: int = 0, limit: int = 100, admin: dict = Depends(get_admin_user)):
-    users = SimpleDatabase.get_all_users(skip, limit)
+async def get_all_users(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                        admin: dict = Depends(get_admin_user)):
+    """List users; pass the X-Next-Cursor header back as cursor to get the next page"""
+    try:
+        users = SimpleDatabase.get_all_users(skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor_header(response, users, limit)
     return users
 
 @app.get("/api/admin/users/pending")
@@ -797,8 +948,14 @@ async def admin_change_own_password(password_data: PasswordChange, admin: dict =
 
 # Groups routes
 @app.get("/api/groups")
-async def get_groups(skip: int = 0, limit: int = 100, user: dict = Depends(get_current_user)):
-    groups = SimpleDatabase.get_groups(skip, limit)
+async def get_groups(response: Response, skip: int = 0, limit: int = 100, summary: bool = False,
+                     cursor: Optional[str] = None, user: dict = Depends(get_current_user)):
+    """List groups; pass the X-Next-Cursor header back as cursor to get the next page"""
+    try:
+        groups = SimpleDatabase.get_groups(skip, limit, summary, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor_header(response, groups, limit)
     return groups
 
 @app.get("/api/groups/{group_id}")
@@ -833,11 +990,16 @@ async def update_group(group_id: int, group_update: GroupUpdate, user: dict = De
     )
     if not success:
         raise HTTPException(status_code=404, detail="Group not found")
+    if presentation_warmup.manifest(group_id):
+        group = SimpleDatabase.get_group_by_id(group_id)
+        if group:
+            warm_presentation(group)
     return {"message": "Group updated successfully"}
 
 @app.delete("/api/groups/{group_id}")
 async def delete_group(group_id: int, user: dict = Depends(get_current_user)):
     if SimpleDatabase.delete_group(group_id):
+        presentation_warmup.discard(group_id)
         return {"message": "Group deleted successfully"}
     raise HTTPException(status_code=404, detail="Group not found")
 
@@ -847,7 +1009,7 @@ async def upload_group_logo(group_id: int, file: UploadFile = File(...), user: d
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    file_path = save_uploaded_file(file, "groups")
+    file_path = await save_uploaded_file(file, "groups")
     SimpleDatabase.update_group_logo(group_id, file_path)
     return {"message": "Group logo uploaded successfully", "file_path": file_path}
 
@@ -857,10 +1019,174 @@ async def upload_group_flag(group_id: int, file: UploadFile = File(...), user: d
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    file_path = save_uploaded_file(file, "groups")
+    file_path = await save_uploaded_file(file, "groups")
     SimpleDatabase.update_group_flag(group_id, file_path)
     return {"message": "Group flag uploaded successfully", "file_path": file_path}
 
+def build_group_export_data(group: dict) -> dict:
+    """Group data in the shape create_group_powerpoint expects"""
+    return {
+        'id': group['id'],
+        'name': group['name'],
+        'description': group['description'],
+        'naval_units': group['naval_units'],
+        'presentation_config': {
+            'mode': 'single',
+            'interval': 5,
+            'grid_rows': 3,
+            'grid_cols': 3,
+            'auto_advance': True,
+            'page_duration': 10
+        },
+        'override_logo': False,
+        'override_flag': False,
+        'template_logo_path': None,
+        'template_flag_path': None
+    }
+
+def export_filename(name: str, fallback: str, suffix: str) -> str:
+    """Download filename built from a unit/group name, e.g. 'Vespucci_scheda.png'"""
+    safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    return f"{safe_name or fallback}_{suffix}"
+
+async def render_group_powerpoint_artifact(group_data: dict, artifact_key: str) -> str:
+    """Render a group presentation into the artifact store and return its stored path"""
+    # Create temporary file for PowerPoint in server directory
+    temp_dir = "./data/temp"
+    os.makedirs(temp_dir, exist_ok=True)
+    output_path = os.path.join(temp_dir, f"ppt_{uuid4().hex}.pptx")
+    
+    try:
+        # Generate PowerPoint presentation
+        created_path = await render_executor.run(render_group_powerpoint_job, group_data, output_path)
+        print(f"PowerPoint created successfully: {created_path}")
+    except BaseException:
+        # Clean up temp file on error
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        raise
+    
+    # Move file into the artifact store
+    final_path = artifact_store.put(artifact_key, '.pptx', created_path)
+    print(f"Export stored at: {final_path}")
+    return final_path
+
+async def render_group_cards(units: List[dict], on_card: Callable[[int, dict, str, bytes], Awaitable[None]]):
+    """Render every unit card of a group a few at a time, reusing cached and in-flight renders.
+
+    on_card(index, unit, render key, PNG bytes) is awaited as each card finishes, in completion
+    order. The first failed card cancels the renders that have not started yet.
+    """
+    semaphore = asyncio.Semaphore(max(1, GROUP_PNG_CONCURRENCY))
+    
+    async def render(index: int, unit: dict):
+        async with semaphore:
+            key = render_key(unit, 'png')
+            return index, unit, key, await render_unit_png(unit, key)
+    
+    tasks = [asyncio.ensure_future(render(index, unit)) for index, unit in enumerate(units)]
+    try:
+        for next_card in asyncio.as_completed(tasks):
+            await on_card(*await next_card)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def render_group_png_artifact(units: List[dict], format: str, columns: int, tile_width: int,
+                                    labels: bool, artifact_key: str) -> str:
+    """Render a group's cards as a ZIP or contact sheet into the artifact store and return its stored path"""
+    extension = '.zip' if format == 'zip' else '.png'
+    temp_dir = "./data/temp"
+    os.makedirs(temp_dir, exist_ok=True)
+    output_path = os.path.join(temp_dir, f"cards_{uuid4().hex}{extension}")
+    card_paths: List[Optional[str]] = [None] * len(units)
+    temp_cards: List[str] = []
+    
+    try:
+        if format == 'zip':
+            # Each card is written as soon as it is rendered, so only a few are held at a time
+            archive = open_card_zip(output_path)
+            try:
+                async def add_to_archive(index: int, unit: dict, key: str, png_bytes: bytes):
+                    await run_in_threadpool(add_card, archive, index, unit['name'], png_bytes)
+                await render_group_cards(units, add_to_archive)
+            finally:
+                archive.close()
+        else:
+            # The sheet job reads the cards from the render cache's disk tier, not from pickled bytes
+            async def keep_card_file(index: int, unit: dict, key: str, png_bytes: bytes):
+                path = await run_in_threadpool(render_cache.file_path, unit['id'], key, png_bytes)
+                if path is None:
+                    path = os.path.join(temp_dir, f"card_{uuid4().hex}.png")
+                    with open(path, 'wb') as f:
+                        f.write(png_bytes)
+                    temp_cards.append(path)
+                card_paths[index] = path
+            await render_group_cards(units, keep_card_file)
+            cards = [(unit['name'], path) for unit, path in zip(units, card_paths)]
+            await render_executor.run(render_contact_sheet_job, cards, output_path, columns, tile_width, labels)
+    except BaseException:
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        raise
+    finally:
+        for path in temp_cards:
+            os.unlink(path)
+    
+    return artifact_store.put(artifact_key, extension, output_path)
+
+@app.get("/api/groups/{group_id}/export/png")
+async def export_group_png(group_id: int, format: str = "zip", columns: int = 4, tile_width: int = 640,
+                           labels: bool = True, user: dict = Depends(get_current_user)):
+    """Export every unit card of a group as a ZIP of PNGs (format=zip) or one contact sheet (format=sheet)"""
+    if format not in ("zip", "sheet"):
+        raise HTTPException(status_code=400, detail="format must be zip or sheet")
+    if not 1 <= columns <= MAX_SHEET_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"columns must be between 1 and {MAX_SHEET_COLUMNS}")
+    if not MIN_TILE_WIDTH <= tile_width <= MAX_TILE_WIDTH:
+        raise HTTPException(status_code=400, detail=f"tile_width must be between {MIN_TILE_WIDTH} and {MAX_TILE_WIDTH}")
+    
+    try:
+        group = SimpleDatabase.get_group_by_id(group_id)
+        if not group:
+            raise HTTPException(status_code=404, detail="Group not found")
+        units = group.get('naval_units', [])
+        if not units:
+            raise HTTPException(status_code=400, detail="Group has no units")
+        
+        print(f"PNG {format} export requested for group {group['name']} with {len(units)} units")
+        
+        # Sheet options change the output, a ZIP only depends on the cards
+        kind = 'png-zip' if format == 'zip' else f"png-sheet:{columns}:{tile_width}:{int(labels)}"
+        artifact_key = group_export_key(build_group_export_data(group), kind)
+        extension = '.zip' if format == 'zip' else '.png'
+        final_path = artifact_store.get(artifact_key, extension)
+        if final_path:
+            print(f"Reusing stored export: {final_path}")
+        else:
+            final_path, _ = await export_flights.run(
+                f"group-{kind}:{artifact_key}",
+                lambda: render_group_png_artifact(units, format, columns, tile_width, labels, artifact_key)
+            )
+        
+        suffix = "cards.zip" if format == 'zip' else "contact_sheet.png"
+        return FileResponse(
+            path=final_path,
+            filename=export_filename(group['name'], f"group_{group_id}", suffix),
+            media_type="application/zip" if format == 'zip' else "image/png"
+        )
+    
+    except (HTTPException, RenderQueueFull, RenderTimeout):
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Group PNG export error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error creating group PNG export: {str(e)}")
+
 @app.get("/api/groups/{group_id}/export/powerpoint")
 async def export_group_powerpoint(group_id: int, user: dict = Depends(get_current_user)):
     """Export a group's naval units to PowerPoint presentation"""
@@ -877,59 +1203,22 @@ async def export_group_powerpoint(group_id: int, user: dict = Depends(get_curren
         print(f"Group found: {group['name']} with {len(group.get('naval_units', []))} units")
         
         # Prepare group data for PowerPoint export
-        group_data = {
-            'id': group['id'],
-            'name': group['name'],
-            'description': group['description'],
-            'naval_units': group['naval_units'],
-            'presentation_config': {
-                'mode': 'single',
-                'interval': 5,
-                'grid_rows': 3,
-                'grid_cols': 3,
-                'auto_advance': True,
-                'page_duration': 10
-            },
-            'override_logo': False,
-            'override_flag': False,
-            'template_logo_path': None,
-            'template_flag_path': None
-        }
+        group_data = build_group_export_data(group)
         
         print(f"Group data prepared for export")
         
-        # Create temporary file for PowerPoint in server directory
-        temp_dir = "./data/temp"
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Generate unique filename
-        import uuid
-        temp_filename = f"ppt_{uuid.uuid4().hex}.pptx"
-        output_path = os.path.join(temp_dir, temp_filename)
-        
-        print(f"Temporary file created: {output_path}")
-        
-        # Generate PowerPoint presentation
-        created_path = create_group_powerpoint(group_data, output_path)
-        print(f"PowerPoint created successfully: {created_path}")
+        final_filename = export_filename(group['name'], f"group_{group_id}", "presentation.pptx")
         
-        # Create exports directory if it doesn't exist
-        exports_dir = "./data/exports"
-        os.makedirs(exports_dir, exist_ok=True)
-        print(f"Exports directory ensured: {exports_dir}")
-        
-        # Create final filename with better handling
-        safe_name = "".join(c for c in group['name'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        if not safe_name:  # Fallback if name becomes empty
-            safe_name = f"group_{group_id}"
-        final_filename = f"{safe_name}_presentation.pptx"
-        final_path = os.path.join(exports_dir, final_filename)
-        
-        print(f"Final path: {final_path}")
-        
-        # Move file to exports directory
-        shutil.move(created_path, final_path)
-        print(f"File moved to final location")
+        # Serve the stored artifact when nothing in the group changed since the last export
+        artifact_key = group_export_key(group_data, 'pptx')
+        final_path = artifact_store.get(artifact_key, '.pptx')
+        if final_path:
+            print(f"Reusing stored export: {final_path}")
+        else:
+            # Identical concurrent exports share one render
+            final_path, _ = await export_flights.run(
+                f"group-pptx:{artifact_key}", lambda: render_group_powerpoint_artifact(group_data, artifact_key)
+            )
         
         # Return file response
         return FileResponse(
@@ -938,19 +1227,130 @@ async def export_group_powerpoint(group_id: int, user: dict = Depends(get_curren
             media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation"
         )
         
+    except (HTTPException, RenderQueueFull, RenderTimeout):
+        raise
     except Exception as e:
         print(f"PowerPoint export error: {str(e)}")
         import traceback
         traceback.print_exc()
         
-        # Clean up temp file on error
-        if 'output_path' in locals() and os.path.exists(output_path):
-            os.unlink(output_path)
         raise HTTPException(
             status_code=500, 
             detail=f"Error creating PowerPoint presentation: {str(e)}"
         )
 
+# Export jobs: long exports run in the background; clients poll status and download the result
+def _run_group_powerpoint_job(job: dict) -> tuple:
+    group = SimpleDatabase.get_group_by_id(job['target_id'])
+    if not group:
+        raise ValueError("Group not found")
+    group_data = build_group_export_data(group)
+    artifact_key = group_export_key(group_data, 'pptx')
+    output_path = export_job_queue.result_path(job['id'], '.pptx')
+    stored_path = artifact_store.get(artifact_key, '.pptx')
+    if stored_path:
+        shutil.copyfile(stored_path, output_path)
+    else:
+        render_executor.run_sync(run_group_powerpoint_export, job['id'], group_data, output_path,
+                                 timeout=EXPORT_JOB_TIMEOUT)
+        artifact_store.put(artifact_key, '.pptx', output_path, keep_source=True)
+    return output_path, export_filename(group['name'], f"group_{group['id']}", "presentation.pptx")
+
+def _run_unit_powerpoint_job(job: dict) -> tuple:
+    unit = SimpleDatabase.get_naval_unit_by_id(job['target_id'])
+    if not unit:
+        raise ValueError("Naval unit not found")
+    artifact = render_executor.run_sync(render_unit_powerpoint_job, unit, job['params'].get('template_config'),
+                                        timeout=EXPORT_JOB_TIMEOUT)
+    output_path = artifact.save(export_job_queue.result_path(job['id'], '.pptx'))
+    return output_path, export_filename(unit['name'], f"unit_{unit['id']}", "scheda.pptx")
+
+def _run_unit_png_job(job: dict) -> tuple:
+    unit = SimpleDatabase.get_naval_unit_by_id(job['target_id'])
+    if not unit:
+        raise ValueError("Naval unit not found")
+    key = render_key(unit, 'png')
+    png_bytes = render_cache.get(unit['id'], key)
+    if png_bytes is None:
+        png_bytes = render_executor.run_sync(render_unit_png_job, unit, timeout=EXPORT_JOB_TIMEOUT)
+        render_cache.put(unit['id'], key, png_bytes)
+    output_path = export_job_queue.result_path(job['id'], '.png')
+    with open(output_path, 'wb') as f:
+        f.write(png_bytes)
+    return output_path, export_filename(unit['name'], f"unit_{unit['id']}", "scheda.png")
+
+export_job_queue.register('group_powerpoint', _run_group_powerpoint_job)
+export_job_queue.register('unit_powerpoint', _run_unit_powerpoint_job)
+export_job_queue.register('unit_png', _run_unit_png_job)
+
+EXPORT_JOB_MEDIA_TYPES = {
+    '.pptx': "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    '.png': "image/png",
+}
+
+def get_export_job_for_user(job_id: str, user: dict) -> dict:
+    """Load a job visible to the user (its creator or an admin)"""
+    job = SimpleDatabase.get_export_job(job_id)
+    if not job or (job['created_by'] != user['id'] and not user['is_admin']):
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+def export_job_status(job: dict) -> dict:
+    """Public view of a job (no server paths)"""
+    status = {key: job[key] for key in ('id', 'kind', 'target_id', 'status', 'progress', 'message', 'error',
+                                        'created_at', 'started_at', 'finished_at')}
+    status['result_url'] = f"/api/jobs/{job['id']}/result" if job['status'] == 'completed' else None
+    return status
+
+@app.post("/api/groups/{group_id}/export/jobs", status_code=202)
+async def enqueue_group_export(group_id: int, user: dict = Depends(get_current_user)):
+    """Queue a group PowerPoint export; poll GET /api/jobs/{id} for progress"""
+    if not SimpleDatabase.group_exists(group_id):
+        raise HTTPException(status_code=404, detail="Group not found")
+    job = export_job_queue.enqueue('group_powerpoint', group_id, created_by=user['id'])
+    return export_job_status(job)
+
+@app.post("/api/units/{unit_id}/export/jobs", status_code=202)
+async def enqueue_unit_export(unit_id: int, options: dict = None, user: dict = Depends(get_current_user)):
+    """Queue a unit export; options: {"format": "powerpoint" | "png", "template_config": {...}}"""
+    options = options or {}
+    export_format = options.get('format', 'powerpoint')
+    if export_format not in ('powerpoint', 'png'):
+        raise HTTPException(status_code=400, detail="format must be 'powerpoint' or 'png'")
+    if not SimpleDatabase.get_naval_unit_by_id(unit_id):
+        raise HTTPException(status_code=404, detail="Naval unit not found")
+    params = {'template_config': options.get('template_config')} if export_format == 'powerpoint' else {}
+    job = export_job_queue.enqueue(f"unit_{export_format}", unit_id, params, created_by=user['id'])
+    return export_job_status(job)
+
+@app.get("/api/jobs/{job_id}")
+async def get_export_job(job_id: str, user: dict = Depends(get_current_user)):
+    """Export job status and percent progress"""
+    return export_job_status(get_export_job_for_user(job_id, user))
+
+@app.get("/api/jobs/{job_id}/result")
+async def download_export_job_result(job_id: str, user: dict = Depends(get_current_user)):
+    """Download the file produced by a completed export job"""
+    job = get_export_job_for_user(job_id, user)
+    if job['status'] != 'completed':
+        raise HTTPException(status_code=409, detail=f"Export job is {job['status']}")
+    if not job['result_path'] or not os.path.exists(job['result_path']):
+        raise HTTPException(status_code=410, detail="Export result has expired")
+    extension = os.path.splitext(job['result_path'])[1]
+    return FileResponse(
+        path=job['result_path'],
+        filename=job['result_filename'],
+        media_type=EXPORT_JOB_MEDIA_TYPES.get(extension, "application/octet-stream")
+    )
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_export_job(job_id: str, user: dict = Depends(get_current_user)):
+    """Cancel a queued or running export job"""
+    job = get_export_job_for_user(job_id, user)
+    if not export_job_queue.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Export job is already {job['status']}")
+    return {"message": "Export job cancelled"}
+
 # Template state endpoints
 @app.post("/api/units/{unit_id}/template-states/{template_id}")
 async def save_template_state(unit_id: int, template_id: str, state_data: dict, user: dict = Depends(get_current_user)):
@@ -1049,12 +1449,14 @@ async def update_template(template_id: str, template_data: dict, user: dict = De
                 
                 # Update the unit in database
                 SimpleDatabase.update_naval_unit(unit['id'], layout_config=updated_layout)
+                render_cache.invalidate_unit(unit['id'])
                 updated_units.append(unit['id'])
                 print(f"✅ Updated unit {unit['id']} ({unit['name']})")
                 
             except Exception as unit_error:
                 print(f"❌ Error updating unit {unit['id']}: {unit_error}")
         
+        refresh_presentations(updated_units)
         return {
             "message": "Template updated successfully", 
             "units_updated": len(updated_units),
@@ -1083,6 +1485,68 @@ async def delete_template(template_id: str, user: dict = Depends(get_current_use
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting template: {str(e)}")
 
+@app.get("/api/admin/database/pool-stats")
+async def database_pool_stats(admin: dict = Depends(get_admin_user)):
+    """Get SQLite connection pool metrics (admin only)"""
+    return get_db_pool_stats()
+
+@app.get("/api/admin/render-executor/stats")
+async def render_executor_stats(admin: dict = Depends(get_admin_user)):
+    """Get render worker queue, job and request coalescing metrics (admin only)"""
+    stats = render_executor.stats()
+    stats['single_flight'] = export_flights.stats()
+    return stats
+
+@app.get("/api/admin/render-cache/stats")
+async def render_cache_stats(admin: dict = Depends(get_admin_user)):
+    """Get card render cache metrics (admin only)"""
+    return render_cache.stats()
+
+@app.post("/api/admin/render-cache/clear")
+async def clear_render_cache(admin: dict = Depends(get_admin_user)):
+    """Drop every cached card render (admin only)"""
+    render_cache.clear()
+    presentation_warmup.clear()  # manifests would report slides as warm
+    return {"message": "Render cache cleared"}
+
+@app.get("/api/admin/presentations/stats")
+async def presentation_warmup_stats(admin: dict = Depends(get_admin_user)):
+    """Get presentation warm-up metrics (admin only)"""
+    return presentation_warmup.stats()
+
+@app.get("/api/admin/export-artifacts/stats")
+async def export_artifact_stats(admin: dict = Depends(get_admin_user)):
+    """Get export artifact store metrics (admin only)"""
+    return artifact_store.stats()
+
+@app.post("/api/admin/export-artifacts/clear")
+async def clear_export_artifacts(admin: dict = Depends(get_admin_user)):
+    """Delete every stored export artifact (admin only)"""
+    artifact_store.clear()
+    return {"message": "Export artifacts cleared"}
+
+@app.get("/api/admin/remote-assets/stats")
+async def remote_asset_stats(admin: dict = Depends(get_admin_user)):
+    """Get remote image cache metrics for this process (admin only)"""
+    return await run_in_threadpool(remote_assets.stats)
+
+@app.post("/api/admin/remote-assets/clear")
+async def clear_remote_assets(admin: dict = Depends(get_admin_user)):
+    """Delete every cached remote image and failure record (admin only)"""
+    remote_assets.clear()
+    return {"message": "Remote image cache cleared"}
+
+@app.get("/api/admin/blobs/stats")
+async def blob_store_stats(admin: dict = Depends(get_admin_user)):
+    """Get content-addressed upload store metrics (admin only)"""
+    return await run_in_threadpool(blob_store.stats)
+
+@app.post("/api/admin/blobs/gc")
+async def collect_blob_garbage(dry_run: bool = False, grace_hours: float = GC_GRACE_HOURS,
+                               admin: dict = Depends(get_admin_user)):
+    """Delete uploaded blobs no unit, group, gallery or template references (admin only)"""
+    return await run_in_threadpool(blob_store.collect_garbage, grace_hours, dry_run)
+
 @app.post("/api/admin/cleanup-temp-files")
 async def manual_cleanup_temp_files(user: dict = Depends(get_current_user)):
     """Manually trigger temp files cleanup (admin only)"""
@@ -1133,6 +1597,9 @@ async def download_database_backup(user: dict = Depends(get_current_user)):
         # Ensure temp directory exists
         os.makedirs("./data/temp", exist_ok=True)
 
+        # Make sure recent writes still in the WAL file are part of the backup
+        db_pool.checkpoint()
+
         # Create ZIP file
         with zipfile.ZipFile(temp_zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
             # Add database file
@@ -1180,6 +1647,24 @@ async def upload_database_restore(
         backup_path = f"./data/naval_units_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
         uploads_backup_path = f"./data/uploads_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
+        # Stream the upload to a temp file first; nothing is touched if it is the wrong type or too large
+        is_zip = file.filename.endswith('.zip')
+        try:
+            await file.seek(0)
+            stored = await run_in_threadpool(
+                store_upload, file.file, "./data/temp", ('zip',) if is_zip else ('sqlite',), MAX_RESTORE_SIZE,
+                f"restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            )
+        except UploadRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+
+        # Flush the WAL and drop pooled connections before the file is replaced
+        db_pool.checkpoint()
+        db_pool.close_all()
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
         # Create backup of current database
         if os.path.exists(db_path):
             shutil.copy2(db_path, backup_path)
@@ -1190,16 +1675,9 @@ async def upload_database_restore(
             shutil.copytree("./data/uploads", uploads_backup_path)
             print(f"✅ Created uploads backup: {uploads_backup_path}")
 
-        content = await file.read()
-
-        if file.filename.endswith('.zip'):
+        if is_zip:
             # Handle ZIP file (database + images)
-            temp_zip_path = f"./data/temp/restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-            os.makedirs("./data/temp", exist_ok=True)
-
-            # Save ZIP temporarily
-            with open(temp_zip_path, "wb") as f:
-                f.write(content)
+            temp_zip_path = stored.path
 
             # Extract ZIP
             with zipfile.ZipFile(temp_zip_path, 'r') as zipf:
@@ -1207,6 +1685,10 @@ async def upload_database_restore(
                 if 'naval_units.db' in zipf.namelist():
                     zipf.extract('naval_units.db', './data/temp')
                     shutil.move('./data/temp/naval_units.db', db_path)
+                    db_pool.close_all()
+                    init_database()  # bring indexes and search triggers up to date
+                    render_cache.clear()
+                    presentation_warmup.clear()
                     print(f"✅ Database restored from ZIP")
 
                 # Extract uploads folder
@@ -1228,13 +1710,16 @@ async def upload_database_restore(
                 "backup_created": backup_path,
                 "uploads_backup_created": uploads_backup_path if os.path.exists(uploads_backup_path) else None,
                 "uploaded_file": file.filename,
-                "size_bytes": len(content),
+                "size_bytes": stored.size,
                 "images_restored": len(uploads_files)
             }
         else:
             # Handle plain .db file (legacy support)
-            with open(db_path, "wb") as f:
-                f.write(content)
+            shutil.move(stored.path, db_path)
+            db_pool.close_all()
+            init_database()  # bring indexes and search triggers up to date
+            render_cache.clear()
+            presentation_warmup.clear()
 
             print(f"✅ Database restored from: {file.filename}")
 
@@ -1242,7 +1727,7 @@ async def upload_database_restore(
                 "message": "Database restored successfully (no images)",
                 "backup_created": backup_path,
                 "uploaded_file": file.filename,
-                "size_bytes": len(content)
+                "size_bytes": stored.size
             }
     except HTTPException:
         raise
@@ -1250,6 +1735,7 @@ async def upload_database_restore(
         # If restore fails, try to restore from backup
         if os.path.exists(backup_path):
             shutil.copy2(backup_path, db_path)
+            db_pool.close_all()
             print(f"⚠️ Restored database from backup due to error")
         if os.path.exists(uploads_backup_path):
             if os.path.exists('./data/uploads'):
@@ -1519,23 +2005,35 @@ def start_cleanup_scheduler():
         # Initial cleanup at startup
         print("🧹 Running initial temp file cleanup...")
         cleanup_temp_files(max_age_hours=2)
+        export_job_queue.cleanup_expired()
+        artifact_store.evict()
+        blob_store.collect_garbage()
         
         while True:
             # Clean every 2 hours
             time.sleep(2 * 60 * 60)  # Wait 2 hours
             cleanup_temp_files(max_age_hours=2)
+            export_job_queue.cleanup_expired()
+            artifact_store.evict()
+            blob_store.collect_garbage()
     
     cleanup_thread = threading.Thread(target=cleanup_loop, daemon=True)
     cleanup_thread.start()
     print("Started temp file cleanup scheduler (runs every 2 hours)")
 
-if __name__ == "__main__":
-    # Initialize database
-    init_database()
+def serve():
+    """Start the server (see server.py, the entry point to run)"""
+    # Index installed fonts once, before the first card render
+    scan_fonts()
     
+    # Start the warm render worker processes
+    render_executor.start()
     
     # Start cleanup scheduler
     start_cleanup_scheduler()
     
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8001)
+
+if __name__ == "__main__":
+    serve()
\ No newline at end of file
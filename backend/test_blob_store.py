@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Blob store garbage collection against a throwaway database (run with pytest or directly)"""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import app.simple_database as simple_database
+from app.db_pool import SQLiteConnectionPool
+from app.simple_database import SimpleDatabase, init_database
+from utils.blob_store import BlobStore
+from utils.derivatives import derivative_path
+from utils.uploads import IMAGE_TYPES
+
+DAY = 24 * 3600
+
+def png(marker: str) -> io.BytesIO:
+    """PNG-signed content, distinct per marker so each is its own blob"""
+    return io.BytesIO(b'\x89PNG\r\n\x1a\n' + marker.encode() * 256)
+
+def backdate(path: str, seconds: float):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+def run_with_store(check):
+    """Run check(store) on an empty database and uploads directory"""
+    data_dir = tempfile.mkdtemp(prefix='blob_gc_')
+    original_pool = simple_database.db_pool
+    simple_database.db_pool = SQLiteConnectionPool(os.path.join(data_dir, 'naval_units.db'))
+    try:
+        init_database()
+        check(BlobStore(upload_dir=os.path.join(data_dir, 'uploads')))
+    finally:
+        simple_database.db_pool.close_all()
+        simple_database.db_pool = original_pool
+        shutil.rmtree(data_dir)
+
+def test_layout_config_reference_survives():
+    def check(store):
+        relative_path, stored, _ = store.save(png('layout'), IMAGE_TYPES)
+        SimpleDatabase.create_naval_unit('Layout Unit', 'Class', 1, layout_config={
+            'elements': [{'id': 'silhouette', 'type': 'silhouette', 'image': f'/api/images/{relative_path}'}]})
+        backdate(stored.path, 2 * DAY)
+        result = store.collect_garbage(grace_hours=0)
+        assert result['removed'] == 0 and os.path.exists(stored.path)
+    run_with_store(check)
+
+def test_template_elements_reference_survives():
+    def check(store):
+        relative_path, stored, _ = store.save(png('template'), IMAGE_TYPES)
+        SimpleDatabase.save_template({'id': 'gc_template', 'name': 'GC', 'elements': [
+            {'id': 'logo', 'type': 'logo', 'image': relative_path}]}, 1)
+        backdate(stored.path, 2 * DAY)
+        assert store.collect_garbage(grace_hours=0)['removed'] == 0
+        assert os.path.exists(stored.path)
+    run_with_store(check)
+
+def test_orphan_removed_with_derivatives():
+    def check(store):
+        relative_path, stored, _ = store.save(png('orphan'), IMAGE_TYPES)
+        derivatives = [derivative_path(stored.path, 128, 'webp'), derivative_path(stored.path, 512, 'png')]
+        for derivative in derivatives:
+            with open(derivative, 'wb') as f:
+                f.write(b'derived')
+        backdate(stored.path, 2 * DAY)
+        dry_run = store.collect_garbage(dry_run=True)
+        assert dry_run['paths'] == [relative_path] and os.path.exists(stored.path)
+        result = store.collect_garbage()
+        assert result['paths'] == [relative_path] and result['bytes_freed'] == stored.size
+        assert not any(os.path.exists(path) for path in [stored.path] + derivatives)
+    run_with_store(check)
+
+def test_orphan_within_grace_is_kept():
+    def check(store):
+        _, stored, _ = store.save(png('recent'), IMAGE_TYPES)
+        result = store.collect_garbage()
+        assert result['removed'] == 0 and result['kept_within_grace'] == 1
+        assert os.path.exists(stored.path)
+    run_with_store(check)
+
+def test_dedup_restarts_grace_period():
+    def check(store):
+        relative_path, stored, existed = store.save(png('dedup'), IMAGE_TYPES)
+        assert not existed
+        backdate(stored.path, 2 * DAY)
+        again_path, again, existed = store.save(png('dedup'), IMAGE_TYPES)
+        assert existed and again_path == relative_path and again.path == stored.path
+        assert time.time() - os.path.getmtime(stored.path) < 60
+        result = store.collect_garbage()
+        assert result['removed'] == 0 and result['kept_within_grace'] == 1
+        assert os.listdir(os.path.join(store.blob_dir, 'incoming')) == []
+    run_with_store(check)
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Keyset pagination of the list endpoints against a throwaway database (run with pytest or directly)"""
+
+import os
+import shutil
+import tempfile
+
+from fastapi.testclient import TestClient
+
+import app.simple_database as simple_database
+from app.db_pool import SQLiteConnectionPool
+from app.simple_database import SimpleDatabase, encode_cursor, get_db_connection, init_database
+from simple_main import app
+
+SHARED_CREATED_AT = '2026-01-01 12:00:00'
+
+def run_with_client(check):
+    """Run check(client, headers) on an empty database, logged in as the default admin"""
+    data_dir = tempfile.mkdtemp(prefix='pagination_')
+    original_pool = simple_database.db_pool
+    simple_database.db_pool = SQLiteConnectionPool(os.path.join(data_dir, 'naval_units.db'))
+    try:
+        init_database()
+        client = TestClient(app)
+        login = client.post('/api/auth/login', json={'email': 'admin@example.com', 'password': 'admin123'})
+        check(client, {'Authorization': f"Bearer {login.json()['access_token']}"})
+    finally:
+        simple_database.db_pool.close_all()
+        simple_database.db_pool = original_pool
+        shutil.rmtree(data_dir)
+
+def set_created_at(table: str, ids, created_at: str):
+    with get_db_connection() as conn:
+        conn.execute(f"UPDATE {table} SET created_at = ? WHERE id IN ({','.join('?' * len(ids))})",
+                     [created_at] + list(ids))
+        conn.commit()
+
+def walk(client, headers, url: str, limit: int):
+    """Follow X-Next-Cursor from the first page to the last; returns the pages' ids"""
+    pages, cursor = [], None
+    while True:
+        params = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append([row['id'] for row in response.json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return pages
+        assert len(pages) < 20, "cursor does not advance"
+
+def test_units_walk_across_shared_created_at():
+    def check(client, headers):
+        ids = [SimpleDatabase.create_naval_unit(f'Unit {i}', 'Class', 1) for i in range(8)]
+        # Most units share one timestamp, so pages must split ties on id; the last two are newer
+        set_created_at('naval_units', ids[:6], SHARED_CREATED_AT)
+        set_created_at('naval_units', ids[6:], '2026-02-01 08:00:00')
+        pages = walk(client, headers, '/api/units', limit=3)
+        walked = [unit_id for page in pages for unit_id in page]
+        assert walked == ids[6:][::-1] + ids[:6][::-1]
+        assert [len(page) for page in pages] == [3, 3, 2]
+    run_with_client(check)
+
+def test_groups_walk_across_shared_created_at():
+    def check(client, headers):
+        ids = [SimpleDatabase.create_group(f'Group {i}', '', 1, []) for i in range(5)]
+        set_created_at('groups', ids, SHARED_CREATED_AT)
+        pages = walk(client, headers, '/api/groups', limit=2)
+        assert [group_id for page in pages for group_id in page] == ids[::-1]
+        # A full last page is followed by one empty page, never by a repeat
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert walk(client, headers, '/api/groups', limit=5) == [ids[::-1], []]
+    run_with_client(check)
+
+def test_malformed_cursor_is_rejected():
+    def check(client, headers):
+        for cursor in ('not a cursor', encode_cursor(SHARED_CREATED_AT, 1)[:-3], encode_cursor(SHARED_CREATED_AT, 'x')):
+            for url in ('/api/units', '/api/groups'):
+                response = client.get(url, params={'cursor': cursor}, headers=headers)
+                assert response.status_code == 400, (url, cursor, response.status_code)
+    run_with_client(check)
+
+def test_unknown_fields_are_rejected():
+    def check(client, headers):
+        SimpleDatabase.create_naval_unit('Projected', 'Class', 1, nation='Italia')
+        response = client.get('/api/units', params={'fields': 'name,password_hash'}, headers=headers)
+        assert response.status_code == 400 and 'password_hash' in response.json()['detail']
+        response = client.get('/api/units', params={'fields': 'name,nation'}, headers=headers)
+        assert response.status_code == 200
+        assert set(response.json()[0]) == {'id', 'created_at', 'name', 'nation'}
+    run_with_client(check)
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Remote image cache against a local HTTP stand-in (run with pytest or directly)"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.remote_assets import RemoteAssetCache
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + b'\0' * 1024
+ETAG = '"v1"'
+
+class StandIn(BaseHTTPRequestHandler):
+    """/image.png (ETag aware), /slow.png (trickles its body), anything else is 404"""
+    requests_seen = []
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        StandIn.requests_seen.append((path, self.headers.get('If-None-Match')))
+        if path == '/image.png':
+            if self.headers.get('If-None-Match') == ETAG:
+                self.send_response(304)
+                self.send_header('ETag', ETAG)
+                self.end_headers()
+                return
+            self._send_image()
+        elif path == '/slow.png':
+            self._send_image(delay=0.2)
+        else:
+            self.send_error(404)
+
+    def _send_image(self, delay: float = 0.0):
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(IMAGE) * 4))
+        self.send_header('ETag', ETAG)
+        self.end_headers()
+        for _ in range(4):
+            time.sleep(delay)
+            self.wfile.write(IMAGE)
+            self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+def make_cache(**options) -> RemoteAssetCache:
+    return RemoteAssetCache(cache_dir=tempfile.mkdtemp(prefix='remote_cache_'), **options)
+
+def run_against_server(check):
+    server, base_url = start_server()
+    StandIn.requests_seen = []
+    try:
+        check(base_url)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_fresh_hit():
+    def check(base_url):
+        cache = make_cache()
+        path = cache.fetch(f'{base_url}/image.png')
+        assert path and open(path, 'rb').read() == IMAGE * 4
+        assert cache.fetch(f'{base_url}/image.png') == path
+        assert len(StandIn.requests_seen) == 1
+        assert cache.stats()['downloads'] == 1 and cache.stats()['hits'] == 1
+        shutil.rmtree(cache.cache_dir)
+    run_against_server(check)
+
+def test_revalidation():
+    def check(base_url):
+        cache = make_cache(fresh_seconds=0)
+        path = cache.fetch(f'{base_url}/image.png')
+        assert cache.fetch(f'{base_url}/image.png') == path
+        assert StandIn.requests_seen[-1] == ('/image.png', ETAG)
+        assert cache.stats()['revalidated'] == 1
+        shutil.rmtree(cache.cache_dir)
+    run_against_server(check)
+
+def test_negative_cache():
+    def check(base_url):
+        cache = make_cache()
+        assert cache.fetch(f'{base_url}/missing.png') is None
+        assert cache.fetch(f'{base_url}/missing.png') is None
+        assert len(StandIn.requests_seen) == 1
+        assert cache.stats()['failures'] == 1 and cache.stats()['negative_hits'] == 1
+        shutil.rmtree(cache.cache_dir)
+    run_against_server(check)
+
+def test_deadline_is_not_a_failure():
+    def check(base_url):
+        cache = make_cache()
+        assert cache.fetch(f'{base_url}/slow.png', deadline=time.monotonic() + 0.3) is None
+        assert cache.stats()['deadline_misses'] == 1 and cache.stats()['failures'] == 0
+        # The next export, with time to spare, still downloads it
+        assert cache.fetch(f'{base_url}/slow.png') is not None
+        assert cache.stats()['negative_hits'] == 0 and cache.stats()['downloads'] == 1
+        shutil.rmtree(cache.cache_dir)
+    run_against_server(check)
+
+def test_eviction_keeps_recently_used():
+    def check(base_url):
+        cache = make_cache(max_bytes=len(IMAGE) * 4 * 2)
+        first = cache.fetch(f'{base_url}/image.png')
+        second = cache.fetch(f'{base_url}/image.png?b')
+        past = time.time() - 60
+        os.utime(first, (past - 10, past - 10))
+        os.utime(second, (past, past))
+        cache.fetch(f'{base_url}/image.png')  # hit: first becomes the most recently used
+        cache.fetch(f'{base_url}/image.png?c')
+        assert os.path.exists(first) and not os.path.exists(second)
+        shutil.rmtree(cache.cache_dir)
+    run_against_server(check)
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
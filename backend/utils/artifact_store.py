@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Optional
+from utils.render_cache import RENDER_VERSION, image_fingerprint, render_key
+from utils.pptx_skeleton import PPTX_TEMPLATE_PATH
+
+ARTIFACT_DIR = "./data/exports/artifacts"
+MAX_ARTIFACT_BYTES = int(os.getenv("EXPORT_ARTIFACT_MAX_BYTES", str(1024 * 1024 * 1024)))  # 1 GB
+ARTIFACT_TTL_HOURS = int(os.getenv("EXPORT_ARTIFACT_TTL_HOURS", str(14 * 24)))  # unused for two weeks
+
+# Group fields that change the exported presentation (units are hashed separately)
+GROUP_EXPORT_FIELDS = ('name', 'presentation_config', 'override_logo', 'override_flag',
+                       'template_logo_path', 'template_flag_path')
+
+def group_export_key(group_data: Dict[str, Any], kind: str = 'pptx') -> str:
+    """Content hash of a group export: group options, every unit's render key and the images used"""
+    digest = hashlib.sha256()
+    digest.update(f'group-{kind}:{RENDER_VERSION}'.encode())
+    digest.update(json.dumps({field: group_data.get(field) for field in GROUP_EXPORT_FIELDS},
+                             sort_keys=True, default=str).encode())
+    for unit in group_data.get('naval_units', []):
+        digest.update(render_key(unit, kind).encode())
+    for field in ('template_logo_path', 'template_flag_path'):
+        if group_data.get(field):
+            digest.update(image_fingerprint(group_data[field]))
+    if kind == 'pptx':
+        # An operator-supplied master changes every presentation
+        try:
+            stat = os.stat(PPTX_TEMPLATE_PATH)
+            digest.update(f'template:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+        except OSError:
+            pass
+    return digest.hexdigest()
+
+class ArtifactStore:
+    """Rendered exports on disk, keyed by content hash, with TTL and LRU size-quota eviction.
+
+    A file's mtime records its last use: hits touch it, eviction removes the least
+    recently used files once the store is over quota or unused for ttl_hours.
+    """
+
+    def __init__(self, artifact_dir: str = ARTIFACT_DIR, max_bytes: int = MAX_ARTIFACT_BYTES,
+                 ttl_hours: int = ARTIFACT_TTL_HOURS):
+        self.artifact_dir = artifact_dir
+        self.max_bytes = max_bytes
+        self.ttl_hours = ttl_hours
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def path_for(self, key: str, extension: str) -> str:
+        return os.path.join(self.artifact_dir, key[:2], f'{key}{extension}')
+
+    def get(self, key: str, extension: str) -> Optional[str]:
+        """Path of a stored artifact, or None; a hit marks it as recently used"""
+        path = self.path_for(key, extension)
+        try:
+            if time.time() - os.stat(path).st_mtime > self.ttl_hours * 3600:
+                raise FileNotFoundError(path)
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+        with self._lock:
+            self._stats['hits'] += 1
+        return path
+
+    def put(self, key: str, extension: str, source_path: str, keep_source: bool = False) -> str:
+        """Move (or copy) a rendered file into the store and return its stored path"""
+        path = self.path_for(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        if keep_source:
+            shutil.copyfile(source_path, temp_path)
+        else:
+            shutil.move(source_path, temp_path)
+        os.replace(temp_path, path)  # readers never see partial files
+        with self._lock:
+            self._stats['stores'] += 1
+        self.evict()
+        return path
+
+    def _files(self):
+        if not os.path.isdir(self.artifact_dir):
+            return []
+        files = []
+        for root, _, names in os.walk(self.artifact_dir):
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def evict(self) -> int:
+        """Delete expired artifacts, then the least recently used ones until under quota"""
+        files = sorted(self._files())
+        cutoff = time.time() - self.ttl_hours * 3600
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            with self._lock:
+                self._stats['evictions'] += removed
+        return removed
+
+    def clear(self):
+        """Delete every stored artifact"""
+        shutil.rmtree(self.artifact_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and disk usage"""
+        with self._lock:
+            stats = dict(self._stats)
+        files = self._files()
+        stats['artifacts'] = len(files)
+        stats['bytes'] = sum(size for _, size, _ in files)
+        stats['max_bytes'] = self.max_bytes
+        stats['ttl_hours'] = self.ttl_hours
+        return stats
+
+artifact_store = ArtifactStore()
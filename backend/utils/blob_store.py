@@ -0,0 +1,134 @@
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, BinaryIO, Dict, Iterable, NamedTuple, Tuple
+from app.simple_database import SimpleDatabase
+from utils.uploads import StoredUpload, TYPE_EXTENSIONS, MAX_FILE_SIZE, store_upload
+from utils.derivatives import derivatives_of, is_derivative
+
+UPLOAD_DIR = "./data/uploads"
+BLOB_SUBFOLDER = "blobs"
+# Unreferenced blobs younger than this are kept: an upload is stored before the unit referencing it is saved
+GC_GRACE_HOURS = 24
+
+# Blob references inside any stored path or JSON document
+BLOB_REFERENCE = re.compile(r'blobs/[0-9a-f]{2}/([0-9a-f]{64})\.[a-z]+')
+
+class Blob(NamedTuple):
+    sha256: str
+    path: str
+    size: int
+    mtime: float
+
+class BlobStore:
+    """Content-addressed uploads: files are named by their SHA-256 under blobs/<2 hex>/,
+    so identical images are stored once however many units, groups or galleries use them.
+
+    Reference counts are derived from the database (see IMAGE_REFERENCE_COLUMNS) when
+    needed, so no counter can drift from the rows that actually point at a blob.
+    """
+
+    def __init__(self, upload_dir: str = UPLOAD_DIR):
+        self.upload_dir = upload_dir
+        self.blob_dir = os.path.join(upload_dir, BLOB_SUBFOLDER)
+
+    @staticmethod
+    def relative_path(sha256: str, extension: str) -> str:
+        """Path stored in the database (relative to the uploads directory)"""
+        return f"{BLOB_SUBFOLDER}/{sha256[:2]}/{sha256}{extension}"
+
+    def save(self, source: BinaryIO, allowed_types: Iterable[str],
+             max_size: int = MAX_FILE_SIZE) -> Tuple[str, StoredUpload, bool]:
+        """Store an upload; returns (relative path, upload info, True if the content already existed)"""
+        # Stream into the blob tree first so the final rename stays on one filesystem
+        stored = store_upload(source, os.path.join(self.blob_dir, 'incoming'), allowed_types, max_size)
+        relative_path = self.relative_path(stored.sha256, TYPE_EXTENSIONS[stored.content_type])
+        final_path = os.path.join(self.upload_dir, relative_path)
+        if os.path.exists(final_path):
+            os.remove(stored.path)
+            os.utime(final_path)  # restart the GC grace period for the new reference
+            return relative_path, stored._replace(path=final_path), True
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(stored.path, final_path)
+        return relative_path, stored._replace(path=final_path), False
+
+    def blobs(self):
+        """Yield every stored blob (derived sizes stored beside a blob are not blobs themselves)"""
+        if not os.path.isdir(self.blob_dir):
+            return
+        for shard in sorted(os.listdir(self.blob_dir)):
+            shard_dir = os.path.join(self.blob_dir, shard)
+            if len(shard) != 2 or not os.path.isdir(shard_dir):
+                continue  # skips incoming/
+            for name in os.listdir(shard_dir):
+                if is_derivative(name) or name.endswith('.tmp'):
+                    continue
+                path = os.path.join(shard_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield Blob(os.path.splitext(name)[0], path, stat.st_size, stat.st_mtime)
+
+    @staticmethod
+    def reference_counts() -> Counter:
+        """Number of stored values (unit, group, gallery, template rows) referencing each blob"""
+        counts = Counter()
+        for text in SimpleDatabase.iter_image_reference_texts():
+            if isinstance(text, str) and BLOB_SUBFOLDER in text:
+                counts.update(set(BLOB_REFERENCE.findall(text)))
+        return counts
+
+    def collect_garbage(self, grace_hours: float = GC_GRACE_HOURS, dry_run: bool = False) -> Dict[str, Any]:
+        """Delete blobs no row references any more, once they are older than grace_hours"""
+        counts = self.reference_counts()
+        cutoff = time.time() - grace_hours * 3600
+        removed, freed, kept_recent = [], 0, 0
+        for blob in self.blobs():
+            if counts.get(blob.sha256):
+                continue
+            if blob.mtime > cutoff:
+                kept_recent += 1
+                continue
+            if not dry_run:
+                try:
+                    os.remove(blob.path)
+                except OSError:
+                    continue
+                for derivative in derivatives_of(blob.path):
+                    try:
+                        os.remove(derivative)
+                    except OSError:
+                        pass
+            removed.append(os.path.relpath(blob.path, self.upload_dir))
+            freed += blob.size
+        # Temp files left behind by uploads interrupted mid-copy
+        incoming_dir = os.path.join(self.blob_dir, 'incoming')
+        if not dry_run and os.path.isdir(incoming_dir):
+            for name in os.listdir(incoming_dir):
+                path = os.path.join(incoming_dir, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+        if removed:
+            print(f"Blob GC {'would remove' if dry_run else 'removed'} {len(removed)} orphaned blobs ({freed} bytes)")
+        return {'removed': len(removed), 'bytes_freed': freed, 'kept_within_grace': kept_recent,
+                'dry_run': dry_run, 'paths': removed}
+
+    def stats(self) -> Dict[str, Any]:
+        """Return blob counts, sizes and how many are referenced"""
+        counts = self.reference_counts()
+        blobs = list(self.blobs())
+        referenced = [blob for blob in blobs if counts.get(blob.sha256)]
+        return {
+            'blobs': len(blobs),
+            'bytes': sum(blob.size for blob in blobs),
+            'referenced': len(referenced),
+            'orphaned': len(blobs) - len(referenced),
+            'references': sum(counts[blob.sha256] for blob in referenced),
+        }
+
+blob_store = BlobStore()
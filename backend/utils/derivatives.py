@@ -0,0 +1,146 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from PIL import Image
+
+UPLOAD_DIR = "./data/uploads"
+# Longest edge, in pixels, of each derived size; a size is skipped when the original is not larger
+DERIVATIVE_SIZES = (128, 512, 1280)
+DERIVATIVE_FORMATS = ('webp', 'png')
+DERIVATIVE_WORKERS = int(os.getenv("DERIVATIVE_WORKERS", "2"))
+WEBP_QUALITY = 85
+
+# "<original stem>.w<size>.<format>", stored next to the original
+DERIVATIVE_NAME = re.compile(r'\.w(\d+)\.(webp|png)$')
+
+def derivative_path(path: str, size: int, fmt: str) -> str:
+    """Path of one derived size of an original image"""
+    return f"{os.path.splitext(path)[0]}.w{size}.{fmt}"
+
+def is_derivative(path: str) -> bool:
+    return DERIVATIVE_NAME.search(path) is not None
+
+def _derivable(path: str) -> bool:
+    """Only raster originals inside the uploads directory get derivatives"""
+    if is_derivative(path) or os.path.splitext(path)[1].lower() not in ('.png', '.jpg', '.jpeg'):
+        return False
+    upload_root = os.path.realpath(UPLOAD_DIR)
+    return os.path.commonpath([upload_root, os.path.realpath(path)]) == upload_root
+
+def _ladder(original_size) -> List[int]:
+    return [size for size in DERIVATIVE_SIZES if size < max(original_size)]
+
+def _write(image: Image.Image, target: str, fmt: str):
+    temp_path = f"{target}.{threading.get_ident()}.tmp"
+    try:
+        if fmt == 'webp':
+            image.save(temp_path, 'WEBP', quality=WEBP_QUALITY, method=4)
+        else:
+            image.save(temp_path, 'PNG', optimize=True)
+        os.replace(temp_path, target)  # readers never see partial files
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def generate_derivatives(path: str, sizes=None, formats=DERIVATIVE_FORMATS) -> List[str]:
+    """Write the missing derived sizes of an image; returns the paths written"""
+    if not _derivable(path):
+        return []
+    with Image.open(path) as source:
+        ladder = [size for size in _ladder(source.size) if sizes is None or size in sizes]
+        wanted = [(size, fmt) for size in ladder for fmt in formats
+                  if not os.path.exists(derivative_path(path, size, fmt))]
+        if not wanted:
+            return []
+        image = source.convert('RGBA' if source.mode in ('RGBA', 'LA', 'P', 'PA') else 'RGB')
+
+    written = []
+    # Largest first, each size resampled from the original so quality does not compound
+    for size in sorted({size for size, _ in wanted}, reverse=True):
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            if (size, fmt) in wanted:
+                target = derivative_path(path, size, fmt)
+                _write(resized, target, fmt)
+                written.append(target)
+    return written
+
+def derivatives_of(path: str) -> List[str]:
+    """Existing derived files of an original"""
+    return [derivative_path(path, size, fmt) for size in DERIVATIVE_SIZES for fmt in DERIVATIVE_FORMATS
+            if os.path.exists(derivative_path(path, size, fmt))]
+
+def best_variant(path: str, max_edge: int, fmt: str = 'png', generate: bool = True) -> str:
+    """Smallest derived size whose longest edge covers max_edge, or the original when none does.
+
+    With generate, a missing derivative is written on the spot (uploads from before the
+    pipeline existed); otherwise only files already on disk are used.
+    """
+    if not _derivable(path):
+        return path
+    for size in DERIVATIVE_SIZES:
+        if size < max_edge:
+            continue
+        candidate = derivative_path(path, size, fmt)
+        if os.path.exists(candidate):
+            return candidate
+        if not generate:
+            continue
+        try:
+            with Image.open(path) as source:
+                if size >= max(source.size):
+                    return path  # the original is already this small
+            generate_derivatives(path, sizes=(size,), formats=(fmt,))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not derive {size}px {fmt} of {path}: {e}")
+            return path
+        return candidate if os.path.exists(candidate) else path
+    return path
+
+class DerivativeGenerator:
+    """Background generation of the derivative ladder, so uploads return before it is written"""
+
+    def __init__(self, workers: int = DERIVATIVE_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='derivatives')
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stats = {'scheduled': 0, 'generated': 0, 'failed': 0}
+
+    def schedule(self, path: str):
+        """Queue generation for an uploaded image (a no-op for SVGs and already-queued files)"""
+        if not _derivable(path):
+            return
+        with self._lock:
+            if path in self._pending:
+                return
+            self._pending.add(path)
+            self._stats['scheduled'] += 1
+        self._pool.submit(self._run, path)
+
+    def _run(self, path: str):
+        try:
+            written = generate_derivatives(path)
+            with self._lock:
+                self._stats['generated'] += len(written)
+        except Exception as e:
+            print(f"⚠️ Derivative generation failed for {path}: {e}")
+            with self._lock:
+                self._stats['failed'] += 1
+        finally:
+            with self._lock:
+                self._pending.discard(path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return generation counters and the number of queued images"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        return stats
+
+derivative_generator = DerivativeGenerator()
@@ -0,0 +1,90 @@
+import io
+import os
+import shutil
+import tempfile
+from typing import IO, Any, Callable, NamedTuple, Optional
+
+# Exports larger than this are spooled to disk instead of being held in memory
+SPOOL_MAX_MEMORY = int(os.getenv("EXPORT_SPOOL_MAX_MEMORY", str(8 * 1024 * 1024)))
+EXPORT_SPOOL_DIR = "./data/temp"  # swept by the temp file cleanup scheduler
+
+class ExportArtifact(NamedTuple):
+    """A rendered export: bytes when small, a spool file on disk otherwise (picklable either way)"""
+    size: int
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+
+    def save(self, output_path: str) -> str:
+        """Store the artifact at output_path, moving a spool file instead of copying it"""
+        if self.path:
+            shutil.move(self.path, output_path)
+        else:
+            with open(output_path, 'wb') as f:
+                f.write(self.data)
+        return output_path
+
+    def discard(self):
+        """Delete the spool file, if any"""
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+class NamedSpool:
+    """Write buffer kept in memory until it grows past max_size, then continued in a named spool file.
+
+    Unlike tempfile.SpooledTemporaryFile the file it rolls over into keeps its name, so a large
+    export is written to disk once and handed on by path instead of being copied out again.
+    """
+
+    def __init__(self, max_size: int, suffix: str = ''):
+        self.max_size = max_size
+        self.suffix = suffix
+        self.path: Optional[str] = None
+        self._file: IO[bytes] = io.BytesIO()
+
+    def write(self, data) -> int:
+        if self.path is None and self._file.tell() + len(data) > self.max_size:
+            self._rollover()
+        return self._file.write(data)
+
+    def _rollover(self):
+        position = self._file.tell()
+        spool = tempfile.NamedTemporaryFile(prefix='export_', suffix=self.suffix, dir=EXPORT_SPOOL_DIR,
+                                            delete=False)
+        spool.write(self._file.getvalue())
+        spool.seek(position)
+        self._file, self.path = spool, spool.name
+
+    def __getattr__(self, name):
+        # seek, tell, flush, read ... act on whichever buffer is current
+        return getattr(self._file, name)
+
+    def close(self):
+        self._file.close()
+
+    def discard(self):
+        """Close the buffer and delete its spool file, if any"""
+        self.close()
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+def spool_export(render: Callable[[IO[bytes]], Any], suffix: str = '') -> ExportArtifact:
+    """Run render(buffer) on a buffer that rolls over to a named spool file above SPOOL_MAX_MEMORY"""
+    os.makedirs(EXPORT_SPOOL_DIR, exist_ok=True)
+    buffer = NamedSpool(SPOOL_MAX_MEMORY, suffix)
+    try:
+        render(buffer)
+        size = buffer.seek(0, os.SEEK_END)
+        if buffer.path is None:
+            return ExportArtifact(size, data=buffer.getvalue())
+        # Large exports cross the process boundary as the spool file itself
+        buffer.close()
+        return ExportArtifact(size, path=buffer.path)
+    except BaseException:
+        buffer.discard()
+        raise
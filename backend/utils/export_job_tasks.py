@@ -0,0 +1,24 @@
+from typing import Any, Callable, Dict
+
+# Export job functions that run in the render worker processes. This module is what a
+# worker imports to unpickle them, so it stays free of the API and job-queue imports.
+
+class ExportCancelled(Exception):
+    """Raised inside a running export when its job has been cancelled"""
+
+def job_progress_reporter(job_id: str) -> Callable[[int, int], None]:
+    """Progress callback for exporters: stores percent done and aborts cancelled jobs.
+
+    Used inside render worker processes, which write progress straight to SQLite.
+    """
+    def report(done: int, total: int):
+        from app.simple_database import SimpleDatabase
+        percent = 99 if total <= 0 else min(99, done * 100 // total)  # 100 only once the file is saved
+        if not SimpleDatabase.update_export_job_progress(job_id, percent, f"{done}/{total}"):
+            raise ExportCancelled(f"Export job {job_id} was cancelled")
+    return report
+
+def run_group_powerpoint_export(job_id: str, group_data: Dict[str, Any], output_path: str) -> str:
+    """Render job: group presentation with per-slide progress"""
+    from utils.powerpoint_export import create_group_powerpoint
+    return create_group_powerpoint(group_data, output_path, job_progress_reporter(job_id))
@@ -0,0 +1,118 @@
+import glob
+import os
+import threading
+import traceback
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import uuid4
+from app.simple_database import SimpleDatabase
+from utils.export_job_tasks import ExportCancelled
+
+# Threads picking jobs from the export_jobs table (rendering itself runs in the render executor)
+EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "2"))
+# Seconds a single export job may render before it is failed
+EXPORT_JOB_TIMEOUT = float(os.getenv("EXPORT_JOB_TIMEOUT", "1800"))
+EXPORT_JOBS_DIR = "./data/exports/jobs"
+JOB_RESULT_TTL_HOURS = 24
+POLL_INTERVAL = 2.0  # seconds between queue checks when no job was signalled
+
+# Handler: job dict -> (result path, download filename)
+JobHandler = Callable[[Dict[str, Any]], Tuple[str, str]]
+
+class ExportJobQueue:
+    """SQLite-backed export job queue served by background worker threads"""
+
+    def __init__(self, workers: int = EXPORT_JOB_WORKERS, results_dir: str = EXPORT_JOBS_DIR):
+        self.workers = workers
+        self.results_dir = results_dir
+        self._handlers: Dict[str, JobHandler] = {}
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def register(self, kind: str, handler: JobHandler):
+        """Register the function that runs jobs of this kind"""
+        self._handlers[kind] = handler
+
+    def result_path(self, job_id: str, extension: str) -> str:
+        os.makedirs(self.results_dir, exist_ok=True)
+        return os.path.join(self.results_dir, f"{job_id}{extension}")
+
+    def start(self):
+        """Start the worker threads, first re-queueing jobs interrupted by a restart"""
+        if self._threads:
+            return
+        requeued = SimpleDatabase.requeue_interrupted_export_jobs()
+        if requeued:
+            print(f"Re-queued {requeued} interrupted export jobs")
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"export-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Started {self.workers} export job workers")
+
+    def stop(self):
+        """Ask the worker threads to exit after their current job"""
+        self._stopping.set()
+        self._wakeup.set()
+        self._threads = []
+
+    def enqueue(self, kind: str, target_id: int, params: Optional[Dict[str, Any]] = None,
+                created_by: Optional[int] = None) -> Dict:
+        """Add a job to the queue and return it"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown export job kind: {kind}")
+        job = SimpleDatabase.create_export_job(uuid4().hex, kind, target_id, params, created_by)
+        self._wakeup.set()
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job"""
+        return SimpleDatabase.cancel_export_job(job_id)
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            try:
+                job = SimpleDatabase.claim_next_export_job()
+            except Exception as e:
+                print(f"Export job queue error: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict[str, Any]):
+        print(f"Export job {job['id']} started: {job['kind']} #{job['target_id']}")
+        try:
+            result_path, filename = self._handlers[job['kind']](job)
+            if not SimpleDatabase.finish_export_job(job['id'], 'completed', result_path, filename):
+                # Cancelled while the last step was running
+                self._remove_results(job['id'])
+            print(f"Export job {job['id']} finished")
+        except ExportCancelled:
+            print(f"Export job {job['id']} cancelled")
+            self._remove_results(job['id'])
+        except Exception as e:
+            print(f"Export job {job['id']} failed: {e}")
+            traceback.print_exc()
+            self._remove_results(job['id'])
+            SimpleDatabase.finish_export_job(job['id'], 'failed', error=str(e) or e.__class__.__name__)
+
+    def _remove_results(self, job_id: str):
+        """Delete a job's (possibly partial) result files"""
+        for path in glob.glob(os.path.join(self.results_dir, f"{job_id}.*")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def cleanup_expired(self, max_age_hours: int = JOB_RESULT_TTL_HOURS) -> int:
+        """Delete finished jobs older than max_age_hours together with their result files"""
+        expired = SimpleDatabase.delete_expired_export_jobs(max_age_hours)
+        for job in expired:
+            self._remove_results(job['id'])
+        return len(expired)
+
+export_job_queue = ExportJobQueue()
@@ -0,0 +1,146 @@
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Union
+from PIL import ImageFont
+
+# Bundled fonts (backend/fonts) are searched before the system directories
+BUNDLED_FONT_DIR = "./fonts"
+SYSTEM_FONT_DIRS = [
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/.local/share/fonts"),
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+    os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"),
+]
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc')
+FONT_CACHE_SIZE = 256  # FreeTypeFont objects kept per (file, size)
+
+# CSS family -> installed families to try, in order (metric-compatible substitutes first)
+SANS_FAMILIES = ('arial', 'liberation sans', 'arimo', 'helvetica', 'dejavu sans')
+SERIF_FAMILIES = ('times new roman', 'liberation serif', 'tinos', 'times', 'dejavu serif')
+MONO_FAMILIES = ('courier new', 'liberation mono', 'cousine', 'courier', 'dejavu sans mono')
+FAMILY_SUBSTITUTES = {
+    'arial': SANS_FAMILIES,
+    'helvetica': SANS_FAMILIES,
+    'sans-serif': SANS_FAMILIES,
+    'system-ui': SANS_FAMILIES,
+    'times': SERIF_FAMILIES,
+    'times new roman': SERIF_FAMILIES,
+    'serif': SERIF_FAMILIES,
+    'courier': MONO_FAMILIES,
+    'courier new': MONO_FAMILIES,
+    'monospace': MONO_FAMILIES,
+    'verdana': ('verdana', 'dejavu sans') + SANS_FAMILIES,
+    'tahoma': ('tahoma', 'dejavu sans') + SANS_FAMILIES,
+    'calibri': ('calibri', 'carlito') + SANS_FAMILIES,
+}
+
+# Style names that describe a plain regular/bold/italic face (anything else, e.g. Condensed, is a last resort)
+PLAIN_STYLE_WORDS = {'regular', 'book', 'normal', 'roman', 'bold', 'italic', 'oblique'}
+
+_index: Optional[Dict[str, Dict[Tuple[bool, bool], str]]] = None
+_index_lock = threading.Lock()
+
+def _font_files():
+    for directory in [BUNDLED_FONT_DIR] + SYSTEM_FONT_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                if name.lower().endswith(FONT_EXTENSIONS):
+                    yield os.path.join(root, name)
+
+def scan_fonts() -> Dict[str, Dict[Tuple[bool, bool], str]]:
+    """Index installed fonts as family -> {(bold, italic): path}; runs once per process"""
+    global _index
+    if _index is not None:
+        return _index
+    with _index_lock:
+        if _index is not None:
+            return _index
+        index: Dict[str, Dict[Tuple[bool, bool], str]] = {}
+        fallbacks = []
+        for path in _font_files():
+            try:
+                family, style = ImageFont.truetype(path, 10).getname()
+            except Exception:
+                continue
+            if not family:
+                continue
+            words = set((style or 'regular').lower().split())
+            slot = ('bold' in words, 'italic' in words or 'oblique' in words)
+            if words <= PLAIN_STYLE_WORDS:
+                index.setdefault(family.lower(), {}).setdefault(slot, path)
+            else:
+                fallbacks.append((family.lower(), slot, path))
+        for family, slot, path in fallbacks:
+            index.setdefault(family, {}).setdefault(slot, path)
+        _index = index
+        print(f"Font index built: {len(index)} families")
+        return _index
+
+def normalize_weight(font_weight: Union[str, int, float, None]) -> bool:
+    """True when a CSS font-weight means bold"""
+    if isinstance(font_weight, (int, float)):
+        return font_weight >= 600
+    if isinstance(font_weight, str):
+        weight = font_weight.strip().lower()
+        return weight in ('bold', 'bolder') or (weight.isdigit() and int(weight) >= 600)
+    return False
+
+@lru_cache(maxsize=512)
+def resolve_font_file(font_family: str, bold: bool = False, italic: bool = False) -> Optional[str]:
+    """Map a CSS font-family list plus weight/style to an installed font file"""
+    index = scan_fonts()
+    candidates = []
+    for family in (font_family or '').split(','):
+        family = family.replace('"', '').replace("'", '').strip().lower()
+        if family:
+            candidates.append(family)
+            candidates.extend(FAMILY_SUBSTITUTES.get(family, ()))
+    candidates.extend(SANS_FAMILIES)
+
+    for wanted in ((bold, italic), (bold, False), (False, False)):
+        for family in candidates:
+            path = index.get(family, {}).get(wanted)
+            if path:
+                return path
+    # Any face of any candidate family beats the bitmap default font
+    for family in candidates:
+        faces = index.get(family)
+        if faces:
+            return next(iter(faces.values()))
+    return None
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def _load_truetype(path: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size)
+
+@lru_cache(maxsize=64)
+def _load_default(size: int):
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:  # Pillow < 10.1 has no sized default font
+        return ImageFont.load_default()
+
+def get_font(font_family: str, font_size: int, font_weight=None, font_style: Optional[str] = None):
+    """Return a (memoized) Pillow font for the given CSS family, size, weight and style"""
+    size = max(1, int(font_size))
+    path = resolve_font_file(font_family or '', normalize_weight(font_weight), font_style in ('italic', 'oblique'))
+    if path:
+        try:
+            return _load_truetype(path, size)
+        except OSError as e:
+            print(f"    Failed to load font {path}: {e}")
+    return _load_default(size)
+
+def font_cache_info() -> Dict[str, object]:
+    """Return font index and memoization metrics"""
+    return {
+        'families': len(scan_fonts()),
+        'fonts': _load_truetype.cache_info()._asdict(),
+        'resolutions': resolve_font_file.cache_info()._asdict(),
+    }
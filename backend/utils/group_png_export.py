@@ -0,0 +1,70 @@
+import os
+import zipfile
+from typing import List, Tuple
+from PIL import Image, ImageDraw
+from utils.fonts import get_font
+
+# Cards of one group export rendered at the same time (each goes through the render queue)
+GROUP_PNG_CONCURRENCY = int(os.getenv("GROUP_PNG_CONCURRENCY", "4"))
+MAX_SHEET_COLUMNS = 20
+MIN_TILE_WIDTH, MAX_TILE_WIDTH = 64, 2048
+MAX_SHEET_PIXELS = 64 * 1024 * 1024  # ~192 MB of RGB while the sheet is assembled
+SHEET_GAP = 16
+LABEL_HEIGHT = 28
+
+# (display name, PNG file) of one rendered card
+Card = Tuple[str, str]
+
+def safe_filename(name: str, fallback: str) -> str:
+    safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).strip()
+    return safe_name or fallback
+
+def open_card_zip(output_path: str) -> zipfile.ZipFile:
+    """ZIP the cards are added to as they finish rendering (PNGs are stored, not recompressed)"""
+    return zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_STORED)
+
+def add_card(archive: zipfile.ZipFile, index: int, name: str, png_bytes: bytes):
+    """Add one card, numbered by its position in the group"""
+    archive.writestr(f"{index + 1:03d}_{safe_filename(name, 'unit')}.png", png_bytes)
+
+def sheet_size(card_sizes: List[Tuple[int, int]], columns: int, tile_width: int, labels: bool) -> Tuple[int, int, int]:
+    """(sheet width, sheet height, tile height) of a contact sheet; tiles fit the tallest card"""
+    columns = max(1, min(columns, len(card_sizes)))
+    rows = -(-len(card_sizes) // columns)
+    tile_height = max(1, round(tile_width * max(height / width for width, height in card_sizes)))
+    cell_height = tile_height + (LABEL_HEIGHT if labels else 0)
+    return (columns * tile_width + (columns + 1) * SHEET_GAP,
+            rows * cell_height + (rows + 1) * SHEET_GAP, tile_height)
+
+def write_contact_sheet(cards: List[Card], output_path: str, columns: int = 4, tile_width: int = 640,
+                        labels: bool = True) -> str:
+    """One PNG with every card tiled left to right, top to bottom, optionally captioned"""
+    card_sizes = []
+    for _, card_path in cards:
+        with Image.open(card_path) as card:
+            card_sizes.append(card.size)  # header only
+    columns = max(1, min(columns, len(cards)))
+    width, height, tile_height = sheet_size(card_sizes, columns, tile_width, labels)
+    if width * height > MAX_SHEET_PIXELS:
+        raise ValueError(f"Contact sheet would be {width}x{height} pixels; use fewer columns or smaller tiles")
+
+    sheet = Image.new('RGB', (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(sheet)
+    font = get_font('Arial', 14, 'normal', 'normal')
+    cell_height = tile_height + (LABEL_HEIGHT if labels else 0)
+    for index, (name, card_path) in enumerate(cards):
+        row, col = divmod(index, columns)
+        x = SHEET_GAP + col * (tile_width + SHEET_GAP)
+        y = SHEET_GAP + row * (cell_height + SHEET_GAP)
+        with Image.open(card_path) as card:
+            card = card.convert('RGB')
+            card.thumbnail((tile_width, tile_height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+            sheet.paste(card, (x + (tile_width - card.width) // 2, y + (tile_height - card.height) // 2))
+        if labels:
+            label = name
+            while label and draw.textlength(label, font=font) > tile_width:
+                label = label[:-1]
+            draw.text((x + (tile_width - draw.textlength(label, font=font)) // 2, y + tile_height + 6),
+                      label, fill=(55, 65, 81), font=font)
+    sheet.save(output_path, 'PNG')
+    return output_path
@@ -0,0 +1,126 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from PIL import Image
+
+MAX_CACHE_BYTES = 128 * 1024 * 1024  # decoded pixels kept in memory across exports
+
+class ImageAssetCache:
+    """Process-wide LRU of decoded, pre-resized images and their intrinsic sizes.
+
+    Entries are keyed by (resolved path, mtime, size on disk, target size, background),
+    so replacing a file on disk is picked up without explicit invalidation. Cached
+    images are shared: callers must treat them as read-only (paste from them, never
+    draw on or thumbnail them).
+    """
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._images: "OrderedDict[Tuple, Image.Image]" = OrderedDict()
+        self._sizes: Dict[Tuple, Tuple[int, int]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def _file_key(path: str) -> Optional[Tuple[str, int, int]]:
+        try:
+            real_path = os.path.realpath(path)
+            stat = os.stat(real_path)
+        except OSError:
+            return None
+        return (real_path, stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _image_bytes(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def get_image(self, path: str, target_size: Optional[Tuple[int, int]] = None,
+                  background: Optional[Tuple[int, int, int]] = None) -> Optional[Image.Image]:
+        """Decoded image, flattened onto background (if transparent) and thumbnailed to target_size"""
+        file_key = self._file_key(path)
+        if file_key is None:
+            return None
+        key = file_key + (target_size, background)
+
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self._stats['hits'] += 1
+                return image
+            self._stats['misses'] += 1
+
+        image = self._prepare(path, target_size, background)
+        with self._lock:
+            self._sizes.setdefault(file_key, image.info.get('intrinsic_size', image.size))
+            previous = self._images.pop(key, None)
+            if previous is not None:
+                self._bytes -= self._image_bytes(previous)
+            self._images[key] = image
+            self._bytes += self._image_bytes(image)
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self._bytes -= self._image_bytes(evicted)
+                self._stats['evictions'] += 1
+        return image
+
+    @staticmethod
+    def _prepare(path: str, target_size: Optional[Tuple[int, int]],
+                 background: Optional[Tuple[int, int, int]]) -> Image.Image:
+        with Image.open(path) as source:
+            intrinsic_size = source.size
+            image = source.copy()
+
+        # Flatten transparent images onto the element background, as the card renderer expects
+        if image.mode in ('RGBA', 'LA', 'P'):
+            flattened = Image.new('RGB', image.size, background or (255, 255, 255))
+            if image.mode == 'P':
+                image = image.convert('RGBA')
+            if image.mode == 'RGBA':
+                flattened.paste(image, mask=image.split()[-1])
+            else:
+                flattened.paste(image)
+            image = flattened
+
+        if target_size:
+            image.thumbnail((max(1, target_size[0]), max(1, target_size[1])), Image.Resampling.LANCZOS)
+        image.info['intrinsic_size'] = intrinsic_size
+        return image
+
+    def get_size(self, path: str) -> Optional[Tuple[int, int]]:
+        """Intrinsic (width, height) of an image file, reading only its header on a miss"""
+        file_key = self._file_key(path)
+        if file_key is None:
+            return None
+        with self._lock:
+            size = self._sizes.get(file_key)
+            if size is not None:
+                self._stats['hits'] += 1
+                return size
+            self._stats['misses'] += 1
+        with Image.open(path) as source:
+            size = source.size
+        with self._lock:
+            self._sizes[file_key] = size
+        return size
+
+    def clear(self):
+        """Drop every cached image"""
+        with self._lock:
+            self._images.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and memory use"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['images'] = len(self._images)
+            stats['sizes'] = len(self._sizes)
+            stats['bytes'] = self._bytes
+            stats['max_bytes'] = self.max_bytes
+        return stats
+
+image_cache = ImageAssetCache()
@@ -0,0 +1,55 @@
+import base64
+import binascii
+import io
+import json
+import re
+from typing import Any, Dict, Tuple
+from utils.uploads import IMAGE_TYPES, UploadRejected
+from utils.blob_store import blob_store
+from utils.derivatives import derivative_generator
+
+# data: URIs the editors used to embed images straight into layouts
+INLINE_IMAGE = re.compile(r'^data:image/[\w.+-]+;base64,', re.IGNORECASE)
+
+def extract_inline_image(value: str) -> str:
+    """Store a base64 data URI in the blob store and return its path; other values are returned unchanged"""
+    if not isinstance(value, str) or not INLINE_IMAGE.match(value):
+        return value
+    try:
+        data = base64.b64decode(value.split(',', 1)[1], validate=False)
+        relative_path, stored, existed = blob_store.save(io.BytesIO(data), IMAGE_TYPES)
+    except (binascii.Error, ValueError, UploadRejected, OSError) as e:
+        print(f"⚠️ Keeping inline image ({len(value)} chars) in place: {e}")
+        return value
+    if not existed:
+        derivative_generator.schedule(stored.path)
+    return relative_path
+
+def extract_inline_images(document: Any) -> Tuple[Any, int]:
+    """Replace every inline image in a JSON-like document with a blob path; returns (document, count)"""
+    if isinstance(document, dict):
+        count = 0
+        result: Dict[str, Any] = {}
+        for key, value in document.items():
+            result[key], extracted = extract_inline_images(value)
+            count += extracted
+        return result, count
+    if isinstance(document, list):
+        items = [extract_inline_images(value) for value in document]
+        return [value for value, _ in items], sum(extracted for _, extracted in items)
+    if isinstance(document, str):
+        extracted = extract_inline_image(document)
+        return extracted, int(extracted is not document)
+    return document, 0
+
+def extract_inline_images_from_text(text: str) -> Tuple[str, int]:
+    """Same as extract_inline_images for a stored column value (a JSON document or a bare data URI)"""
+    if not text or 'data:image/' not in text:
+        return text, 0
+    try:
+        document = json.loads(text)
+    except ValueError:
+        extracted = extract_inline_image(text)
+        return extracted, int(extracted is not text)
+    document, count = extract_inline_images(document)
+    return (json.dumps(document), count) if count else (text, 0)
@@ -0,0 +1,349 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image, ImageColor, ImageDraw
+from utils.fonts import get_font
+from utils.render_cache import RENDERED_FIELDS
+
+TEXT_TYPES = ('text', 'unit_name', 'unit_class')
+IMAGE_TYPES = ('logo', 'flag', 'silhouette')
+TARGETS = ('png', 'pptx')
+# Canvas size when a layout does not set one; the card editor and the slide editor differ
+DEFAULT_CANVAS = {'png': (1280, 720), 'pptx': (1123, 794)}
+MAX_CACHED_PLANS = 512
+
+Color = Tuple[int, int, int]
+BLACK: Color = (0, 0, 0)
+WHITE: Color = (255, 255, 255)
+
+def parse_color(value: Any, default: Optional[Color] = BLACK) -> Optional[Color]:
+    """(r, g, b) of a CSS color (hex, short hex, name, rgb()); 'transparent' gives None, bad values default"""
+    if not isinstance(value, str) or not value.strip():
+        return default
+    if value.strip().lower() == 'transparent':
+        return None
+    try:
+        return ImageColor.getrgb(value.strip())[:3]
+    except ValueError:
+        return default
+
+def parse_number(value: Any, default: float) -> float:
+    """Number from a CSS-ish value: 24, "24px", "12pt", "1.5em" (the unit is dropped)"""
+    if value is None or value == '':
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().lower()
+    for unit in ('px', 'pt', 'rem', 'em', '%'):
+        if text.endswith(unit):
+            text = text[:-len(unit)]
+            break
+    try:
+        return float(text)
+    except ValueError:
+        return default
+
+@dataclass(frozen=True)
+class BoxStyle:
+    background: Optional[Color]
+    border_width: int
+    border_color: Color
+    border_radius: int
+
+@dataclass(frozen=True)
+class TextLine:
+    """One laid-out line of a PNG text element, in canvas pixels"""
+    text: str
+    x: int
+    y: int
+    width: int
+    height: int
+
+@dataclass(frozen=True)
+class TextPlan:
+    content: str  # after unit-field fallback and text-transform
+    font_family: str
+    font_size: int
+    font_weight: str
+    font_style: str
+    bold: bool
+    color: Color
+    align: str
+    decoration: str
+    letter_spacing: float
+    line_height: float
+    padding: int
+    font: Any = None                    # Pillow font handle (png target)
+    lines: Tuple[TextLine, ...] = ()    # laid-out lines (png target)
+
+@dataclass(frozen=True)
+class TablePlan:
+    rows: Tuple[Tuple[str, ...], ...]
+    column_widths: Tuple[int, ...]      # pixels, from the columnWidths percentages
+    row_height: int
+    header_background: Color
+
+@dataclass(frozen=True)
+class ElementPlan:
+    index: int
+    type: str
+    x: float
+    y: float
+    width: float
+    height: float
+    box: BoxStyle
+    text: Optional[TextPlan] = None
+    image: Optional[str] = None         # asset key: the image reference as stored
+    fallback_image: Optional[str] = None
+    table: Optional[TablePlan] = None
+
+    @property
+    def content_size(self) -> Tuple[int, int]:
+        """Size inside the border, in canvas pixels"""
+        border = self.box.border_width
+        return int(self.width - 2 * border), int(self.height - 2 * border)
+
+@dataclass(frozen=True)
+class LayoutPlan:
+    """A unit's layout_config, validated and resolved once for one output format"""
+    target: str
+    revision: str
+    canvas_width: int
+    canvas_height: int
+    has_layout: bool  # False when the unit has no layout_config of its own
+    background: Color
+    border_width: int
+    border_color: Color
+    elements: Tuple[ElementPlan, ...]
+    warnings: Tuple[str, ...] = ()
+
+def layout_revision(unit: Dict[str, Any]) -> str:
+    """Content hash of the unit fields a layout plan is compiled from"""
+    payload = {field: unit.get(field) for field in RENDERED_FIELDS}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def _layout_config(unit: Dict[str, Any]) -> Dict[str, Any]:
+    layout_config = unit.get('layout_config') or {}
+    if isinstance(layout_config, str):
+        try:
+            layout_config = json.loads(layout_config)
+        except ValueError:
+            print(f"Failed to parse layout_config JSON for unit {unit.get('name')}, using default")
+            layout_config = {}
+    return layout_config if isinstance(layout_config, dict) else {}
+
+def basic_elements(unit: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Elements for a unit whose layout has none: logo, flag, silhouette, name and class"""
+    elements = []
+    image_boxes = (('logo', 'logo_path', 20, 20, 120, 120), ('flag', 'flag_path', 983, 20, 120, 80),
+                   ('silhouette', 'silhouette_path', 20, 180, 1083, 300))
+    for element_type, field, x, y, width, height in image_boxes:
+        if unit.get(field):
+            elements.append({'id': element_type, 'type': element_type, 'x': x, 'y': y, 'width': width,
+                             'height': height, 'image': unit[field],
+                             'style': {'backgroundColor': '#ffffff', 'borderRadius': 8}})
+    elements.append({'id': 'unit_name', 'type': 'unit_name', 'x': 160, 'y': 30, 'width': 400, 'height': 40,
+                     'content': unit.get('name', ''), 'style': {'fontSize': 24, 'fontWeight': 'bold', 'color': '#000'}})
+    elements.append({'id': 'unit_class', 'type': 'unit_class', 'x': 160, 'y': 80, 'width': 400, 'height': 40,
+                     'content': unit.get('unit_class', ''), 'style': {'fontSize': 20, 'fontWeight': 'normal', 'color': '#000'}})
+    return elements
+
+def _is_bold(font_weight: Any) -> bool:
+    if isinstance(font_weight, (int, float)) or str(font_weight).isdigit():
+        return int(font_weight) >= 600
+    return str(font_weight).lower() in ('bold', 'bolder')
+
+def _compile_text(element: Dict[str, Any], unit: Dict[str, Any], style: Dict[str, Any], target: str,
+                  x: float, y: float, width: float, height: float) -> TextPlan:
+    content = element.get('content') or ''
+    if not content:
+        # Name and class elements show the unit's own fields unless overridden
+        if element['type'] == 'unit_name':
+            content = unit.get('name', '') or ''
+        elif element['type'] == 'unit_class':
+            content = unit.get('unit_class', '') or ''
+    content = str(content)
+    text_transform = style.get('textTransform', 'none')
+    if text_transform == 'uppercase':
+        content = content.upper()
+    elif text_transform == 'lowercase':
+        content = content.lower()
+    elif text_transform == 'capitalize':
+        content = content.title()
+
+    font_size = max(1, int(parse_number(style.get('fontSize'), 16)))
+    line_height_raw = style.get('lineHeight', 1.2)
+    line_height = parse_number(line_height_raw, 1.2) or 1.2
+    if isinstance(line_height_raw, str) and 'px' in line_height_raw:
+        line_height /= font_size  # px line heights become a multiplier
+    plan = TextPlan(
+        content=content,
+        font_family=style.get('fontFamily', 'Arial') or 'Arial',
+        font_size=font_size,
+        font_weight=style.get('fontWeight', 'normal'),
+        font_style=style.get('fontStyle', 'normal'),
+        bold=_is_bold(style.get('fontWeight', 'normal')),
+        color=parse_color(style.get('color'), BLACK) or BLACK,
+        align=style.get('textAlign', 'left'),
+        decoration=style.get('textDecoration', 'none'),
+        letter_spacing=parse_number(style.get('letterSpacing'), 0.0),
+        line_height=line_height,
+        padding=int(parse_number(style.get('padding'), 8)),
+    )
+    if target != 'png':
+        return plan
+
+    # Resolve the font and lay the lines out once; the renderer only draws them
+    font = get_font(plan.font_family, plan.font_size, plan.font_weight, plan.font_style)
+    measure = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+    lines = content.split('\n')
+    sizes = []
+    for line in lines:
+        bbox = measure.textbbox((0, 0), line, font=font)
+        sizes.append((bbox[2] - bbox[0], int((bbox[3] - bbox[1]) * line_height)))
+    current_y = int(y) + (int(height) - sum(line_h for _, line_h in sizes)) // 2
+    laid_out = []
+    for line, (line_width, line_h) in zip(lines, sizes):
+        if plan.align == 'center':
+            text_x = int(x) + (int(width) - line_width) // 2
+        elif plan.align == 'right':
+            text_x = int(x) + int(width) - line_width - plan.padding
+        else:
+            text_x = int(x) + plan.padding
+        laid_out.append(TextLine(line, text_x, current_y, line_width, line_h))
+        current_y += line_h
+    return replace(plan, font=font, lines=tuple(laid_out))
+
+def _compile_table(element: Dict[str, Any], style: Dict[str, Any], width: float, height: float,
+                   border_width: int) -> Optional[TablePlan]:
+    table_data = element.get('tableData') or []
+    rows = tuple(tuple(str(cell) for cell in row) for row in table_data if isinstance(row, (list, tuple)))
+    if not rows or not rows[0]:
+        return None
+    num_cols = len(rows[0])
+    percentages = [parse_number(value, 0) for value in style.get('columnWidths') or []]
+    total_percentage = sum(percentages) if percentages else 100
+    available_width = int(width) - 2 * border_width
+    column_widths = []
+    for col_index in range(num_cols):
+        if col_index < len(percentages) and total_percentage:
+            column_widths.append(int((percentages[col_index] / total_percentage) * available_width))
+        else:
+            column_widths.append(available_width // num_cols)
+    return TablePlan(rows, tuple(column_widths), (int(height) - 2 * border_width) // len(rows),
+                     parse_color(style.get('headerBackgroundColor'), (243, 244, 246)) or (243, 244, 246))
+
+def _compile_element(index: int, element: Any, unit: Dict[str, Any], target: str) -> ElementPlan:
+    if not isinstance(element, dict):
+        raise ValueError("not an object")
+    element_type = element.get('type')
+    if element_type not in TEXT_TYPES + IMAGE_TYPES + ('table',):
+        raise ValueError(f"unknown type {element_type!r}")
+    style = element.get('style') or {}
+    if not isinstance(style, dict):
+        style = {}
+    x = parse_number(element.get('x'), 0.0)
+    y = parse_number(element.get('y'), 0.0)
+    width = parse_number(element.get('width'), 100.0)
+    height = parse_number(element.get('height'), 30.0)
+    if width <= 0 or height <= 0:
+        raise ValueError(f"empty box {width}x{height}")
+    if target == 'png':
+        x, y, width, height = int(x), int(y), int(width), int(height)
+
+    is_table = element_type == 'table'
+    box = BoxStyle(
+        background=parse_color(style.get('backgroundColor'), WHITE if is_table else None),
+        border_width=max(0, int(parse_number(style.get('borderWidth'), 1 if is_table else 0))),
+        border_color=parse_color(style.get('borderColor'), BLACK) or BLACK,
+        border_radius=max(0, int(parse_number(style.get('borderRadius'), 0))),
+    )
+    if element_type in TEXT_TYPES:
+        return ElementPlan(index, element_type, x, y, width, height, box,
+                           text=_compile_text(element, unit, style, target, x, y, width, height))
+    if element_type in IMAGE_TYPES:
+        image = element.get('image') if isinstance(element.get('image'), str) else None
+        fallback = unit.get('silhouette_path') if element_type == 'silhouette' else None
+        return ElementPlan(index, element_type, x, y, width, height, box, image=image or None,
+                           fallback_image=fallback or None)
+    return ElementPlan(index, element_type, x, y, width, height, box,
+                       table=_compile_table(element, style, width, height, box.border_width))
+
+def _compile(unit: Dict[str, Any], target: str, revision: str) -> LayoutPlan:
+    layout_config = _layout_config(unit)
+    elements = layout_config.get('elements') or []
+    if not isinstance(elements, list) or not elements:
+        elements = basic_elements(unit)
+    default_width, default_height = DEFAULT_CANVAS[target]
+    compiled, warnings = [], []
+    for index, element in enumerate(elements):
+        try:
+            compiled.append(_compile_element(index, element, unit, target))
+        except (ValueError, TypeError) as e:
+            warnings.append(f"element {index + 1}: {e}")
+    if warnings:
+        print(f"Layout of unit {unit.get('name', 'Unknown')}: skipped {'; '.join(warnings)}")
+    return LayoutPlan(
+        target=target,
+        revision=revision,
+        canvas_width=max(1, int(parse_number(layout_config.get('canvasWidth'), default_width))),
+        canvas_height=max(1, int(parse_number(layout_config.get('canvasHeight'), default_height))),
+        has_layout=bool(layout_config),
+        background=parse_color(layout_config.get('canvasBackground'), WHITE) or WHITE,
+        border_width=max(0, int(parse_number(layout_config.get('canvasBorderWidth'), 0))),
+        border_color=parse_color(layout_config.get('canvasBorderColor'), BLACK) or BLACK,
+        elements=tuple(compiled),
+        warnings=tuple(warnings),
+    )
+
+class LayoutPlanCache:
+    """LRU of compiled layout plans keyed by (layout revision, target format).
+
+    Plans are immutable, so one plan is shared by every render of the same unit content.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_PLANS):
+        self.max_entries = max_entries
+        self._plans: "OrderedDict[Tuple[str, str], LayoutPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def get(self, unit: Dict[str, Any], target: str) -> LayoutPlan:
+        """Compiled plan of a unit's layout for 'png' or 'pptx'"""
+        if target not in TARGETS:
+            raise ValueError(f"Unknown render target: {target}")
+        key = (layout_revision(unit), target)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self._stats['hits'] += 1
+                return plan
+            self._stats['misses'] += 1
+        plan = _compile(unit, target, key[0])
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+        return plan
+
+    def clear(self):
+        """Drop every compiled plan"""
+        with self._lock:
+            self._plans.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of cached plans"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['plans'] = len(self._plans)
+        return stats
+
+layout_plans = LayoutPlanCache()
+
+def compile_layout(unit: Dict[str, Any], target: str) -> LayoutPlan:
+    """Compiled render plan of a unit's layout_config (cached)"""
+    return layout_plans.get(unit, target)
@@ -2,16 +2,50 @@ from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
-from PIL import Image as PILImage
+from utils.image_cache import image_cache
+from utils.pptx_skeleton import skeleton_cache, blank_layout, title_layout
+from utils.remote_assets import remote_assets, export_deadline, is_remote
+from utils.layout_compiler import Color, ElementPlan, compile_layout
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 import os
 import io
+import json
 import base64
-import requests
 import tempfile
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, NamedTuple, Tuple
 
-# Global scale factor for canvas to PowerPoint conversion
-CANVAS_TO_PPT_SCALE = 1.0
+# Canvas pixels per slide inch
+PIXELS_PER_INCH = 120.0
+
+# Threads resolving slide images (downloads, base64 decoding, file reads) ahead of slide assembly;
+# they overlap waiting on I/O, the slides themselves are still built on one core
+SLIDE_PLAN_WORKERS = int(os.getenv("SLIDE_PLAN_WORKERS", "4"))
+# Units planned ahead of the slide being assembled; bounds how many units' images are in memory
+SLIDE_PLAN_LOOKAHEAD = max(1, SLIDE_PLAN_WORKERS) * 2
+
+class SlideImage(NamedTuple):
+    """An image resolved and read before its slide is assembled"""
+    path: str
+    data: bytes
+    size: Optional[Tuple[int, int]]
+
+# Slide plan: image reference -> resolved image (None when it could not be found)
+SlidePlan = Dict[str, Optional[SlideImage]]
+
+@dataclass
+class RenderContext:
+    """Per-export state: canvas scale, slide size (inches), the images resolved so far and
+    the deadline after which remote images are no longer waited for.
+
+    Each export builds its own context, so concurrent exports never share geometry.
+    """
+    scale: float = 1.0
+    slide_width: float = 13.33
+    slide_height: float = 7.5
+    images: SlidePlan = field(default_factory=dict)
+    deadline: float = field(default_factory=export_deadline)
 
 def create_unit_powerpoint(unit_data: Dict[str, Any], output_path: str, template_config: Optional[Dict[str, Any]] = None) -> str:
     """
@@ -29,74 +63,17 @@ def create_unit_powerpoint(unit_data: Dict[str, Any], output_path: str, template
     try:
         print(f"Creating PowerPoint for unit: {unit_data.get('name', 'Unknown')}")
         
-        # Create new presentation
-        prs = Presentation()
-        
         # Apply template configuration if provided
-        print(f"🔍 Template config received: {template_config}")
+        context = _unit_render_context(unit_data, template_config)
         
-        if template_config:
-            canvas_width = template_config.get('canvasWidth', 1123)
-            canvas_height = template_config.get('canvasHeight', 794)
-            
-            print(f"📏 Canvas dimensions from template: {canvas_width} x {canvas_height}")
-            
-            # Convert canvas dimensions to PowerPoint slide dimensions
-            # Use 120 DPI for better scaling instead of 96 DPI
-            pixels_per_inch = 120.0  # Better scaling factor
-            slide_width_inches = canvas_width / pixels_per_inch
-            slide_height_inches = canvas_height / pixels_per_inch
-            
-            # Ensure minimum reasonable size for PowerPoint
-            min_width_inches = 8.0  # Minimum 8 inches width
-            min_height_inches = 6.0  # Minimum 6 inches height
-            
-            if slide_width_inches < min_width_inches:
-                scale_factor = min_width_inches / slide_width_inches
-                slide_width_inches = min_width_inches
-                slide_height_inches *= scale_factor
-            
-            if slide_height_inches < min_height_inches:
-                scale_factor = min_height_inches / slide_height_inches
-                slide_height_inches = min_height_inches
-                slide_width_inches *= scale_factor
-            
-            print(f"📏 Calculated slide dimensions: {slide_width_inches:.2f}\" x {slide_height_inches:.2f}\"")
-            
-            prs.slide_width = Inches(slide_width_inches)
-            prs.slide_height = Inches(slide_height_inches)
-            
-            print(f"✅ Applied template dimensions: {slide_width_inches:.2f}\" x {slide_height_inches:.2f}\"")
-        else:
-            print("⚠️ No template config provided, using default")
-            # Try to get canvas config from unit data
-            unit_layout = unit_data.get('layout_config', {})
-            if unit_layout:
-                canvas_width = unit_layout.get('canvasWidth', 1123)
-                canvas_height = unit_layout.get('canvasHeight', 794)
-                
-                print(f"📏 Using unit layout dimensions: {canvas_width} x {canvas_height}")
-                
-                pixels_per_inch = 120.0  # Better scaling factor
-                slide_width_inches = canvas_width / pixels_per_inch
-                slide_height_inches = canvas_height / pixels_per_inch
-                
-                # Also update element positioning scale
-                global CANVAS_TO_PPT_SCALE
-                CANVAS_TO_PPT_SCALE = 1.0  # 1:1 mapping
-                
-                prs.slide_width = Inches(slide_width_inches)
-                prs.slide_height = Inches(slide_height_inches)
-                
-                print(f"✅ Applied unit layout dimensions: {slide_width_inches:.2f}\" x {slide_height_inches:.2f}\"")
-            else:
-                # Default to 16:9 widescreen
-                prs.slide_width = Inches(13.33)
-                prs.slide_height = Inches(7.5)
-                print(f"⚠️ Using default widescreen dimensions: 13.33\" x 7.5\"")
+        # Create new presentation from the cached skeleton for this slide size
+        prs = skeleton_cache.new_presentation(context.slide_width, context.slide_height)
+        
+        # Resolve the slide's images first, fetching remote ones in parallel
+        context.images.update(_plan_unit_slide(unit_data, {}, context.deadline))
         
         # Create the unit slide
-        slide = _create_unit_slide(prs, unit_data, {})
+        slide = _create_unit_slide(prs, unit_data, {}, context)
         
         # Save presentation
         print(f"Saving presentation to: {output_path}")
@@ -124,74 +101,17 @@ def create_unit_powerpoint_to_buffer(unit_data: Dict[str, Any], output_buffer, t
     try:
         print(f"Creating PowerPoint for unit: {unit_data.get('name', 'Unknown')}")
         
-        # Create new presentation
-        prs = Presentation()
-        
         # Apply template configuration if provided
-        print(f"🔍 Template config received: {template_config}")
+        context = _unit_render_context(unit_data, template_config)
         
-        if template_config:
-            canvas_width = template_config.get('canvasWidth', 1123)
-            canvas_height = template_config.get('canvasHeight', 794)
-            
-            print(f"📏 Canvas dimensions from template: {canvas_width} x {canvas_height}")
-            
-            # Convert canvas dimensions to PowerPoint slide dimensions
-            # Use 120 DPI for better scaling instead of 96 DPI
-            pixels_per_inch = 120.0  # Better scaling factor
-            slide_width_inches = canvas_width / pixels_per_inch
-            slide_height_inches = canvas_height / pixels_per_inch
-            
-            # Ensure minimum reasonable size for PowerPoint
-            min_width_inches = 8.0  # Minimum 8 inches width
-            min_height_inches = 6.0  # Minimum 6 inches height
-            
-            if slide_width_inches < min_width_inches:
-                scale_factor = min_width_inches / slide_width_inches
-                slide_width_inches = min_width_inches
-                slide_height_inches *= scale_factor
-            
-            if slide_height_inches < min_height_inches:
-                scale_factor = min_height_inches / slide_height_inches
-                slide_height_inches = min_height_inches
-                slide_width_inches *= scale_factor
-            
-            print(f"📏 Calculated slide dimensions: {slide_width_inches:.2f}\" x {slide_height_inches:.2f}\"")
-            
-            prs.slide_width = Inches(slide_width_inches)
-            prs.slide_height = Inches(slide_height_inches)
-            
-            print(f"✅ Applied template dimensions: {slide_width_inches:.2f}\" x {slide_height_inches:.2f}\"")
-        else:
-            print("⚠️ No template config provided, using default")
-            # Try to get canvas config from unit data
-            unit_layout = unit_data.get('layout_config', {})
-            if unit_layout:
-                canvas_width = unit_layout.get('canvasWidth', 1123)
-                canvas_height = unit_layout.get('canvasHeight', 794)
-                
-                print(f"📏 Using unit layout dimensions: {canvas_width} x {canvas_height}")
-                
-                pixels_per_inch = 120.0  # Better scaling factor
-                slide_width_inches = canvas_width / pixels_per_inch
-                slide_height_inches = canvas_height / pixels_per_inch
-                
-                # Also update element positioning scale
-                global CANVAS_TO_PPT_SCALE
-                CANVAS_TO_PPT_SCALE = 1.0  # 1:1 mapping
-                
-                prs.slide_width = Inches(slide_width_inches)
-                prs.slide_height = Inches(slide_height_inches)
-                
-                print(f"✅ Applied unit layout dimensions: {slide_width_inches:.2f}\" x {slide_height_inches:.2f}\"")
-            else:
-                # Default to 16:9 widescreen
-                prs.slide_width = Inches(13.33)
-                prs.slide_height = Inches(7.5)
-                print(f"⚠️ Using default widescreen dimensions: 13.33\" x 7.5\"")
+        # Create new presentation from the cached skeleton for this slide size
+        prs = skeleton_cache.new_presentation(context.slide_width, context.slide_height)
+        
+        # Resolve the slide's images first, fetching remote ones in parallel
+        context.images.update(_plan_unit_slide(unit_data, {}, context.deadline))
         
         # Create the unit slide
-        slide = _create_unit_slide(prs, unit_data, {})
+        slide = _create_unit_slide(prs, unit_data, {}, context)
         
         # Save presentation to buffer
         print(f"Saving presentation to buffer")
@@ -204,13 +124,66 @@ def create_unit_powerpoint_to_buffer(unit_data: Dict[str, Any], output_buffer, t
         traceback.print_exc()
         raise
 
-def create_group_powerpoint(group_data: Dict[str, Any], output_path: str) -> str:
+def _unit_render_context(unit_data: Dict[str, Any], template_config: Optional[Dict[str, Any]] = None) -> RenderContext:
+    """Slide size for a single-unit presentation, from the template or the unit's own canvas"""
+    print(f"🔍 Template config received: {template_config}")
+    
+    if template_config:
+        canvas_width = template_config.get('canvasWidth', 1123)
+        canvas_height = template_config.get('canvasHeight', 794)
+        
+        print(f"📏 Canvas dimensions from template: {canvas_width} x {canvas_height}")
+        
+        # Convert canvas dimensions to PowerPoint slide dimensions
+        slide_width_inches = canvas_width / PIXELS_PER_INCH
+        slide_height_inches = canvas_height / PIXELS_PER_INCH
+        
+        # Ensure minimum reasonable size for PowerPoint
+        min_width_inches = 8.0  # Minimum 8 inches width
+        min_height_inches = 6.0  # Minimum 6 inches height
+        
+        if slide_width_inches < min_width_inches:
+            scale_factor = min_width_inches / slide_width_inches
+            slide_width_inches = min_width_inches
+            slide_height_inches *= scale_factor
+        
+        if slide_height_inches < min_height_inches:
+            scale_factor = min_height_inches / slide_height_inches
+            slide_height_inches = min_height_inches
+            slide_width_inches *= scale_factor
+        
+        print(f"✅ Applied template dimensions: {slide_width_inches:.2f}\" x {slide_height_inches:.2f}\"")
+        return RenderContext(slide_width=slide_width_inches, slide_height=slide_height_inches)
+    
+    print("⚠️ No template config provided, using default")
+    # Try to get canvas config from unit data
+    plan = compile_layout(unit_data, 'pptx')
+    if plan.has_layout:
+        canvas_width = plan.canvas_width
+        canvas_height = plan.canvas_height
+        
+        print(f"📏 Using unit layout dimensions: {canvas_width} x {canvas_height}")
+        
+        # Element positions map 1:1 onto the slide
+        context = RenderContext(scale=1.0, slide_width=canvas_width / PIXELS_PER_INCH,
+                                slide_height=canvas_height / PIXELS_PER_INCH)
+        print(f"✅ Applied unit layout dimensions: {context.slide_width:.2f}\" x {context.slide_height:.2f}\"")
+        return context
+    
+    # Default to 16:9 widescreen
+    print(f"⚠️ Using default widescreen dimensions: 13.33\" x 7.5\"")
+    return RenderContext()
+
+def create_group_powerpoint(group_data: Dict[str, Any], output_path: str,
+                            progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
     """
     Create a PowerPoint presentation from a group's naval units
     
     Args:
         group_data: Group data including naval units and presentation config
         output_path: Path where to save the PowerPoint file
+        progress_callback: Optional callable(done, total) invoked after each slide;
+            it may raise to abort the export
     
     Returns:
         Path to the created PowerPoint file
@@ -219,17 +192,14 @@ def create_group_powerpoint(group_data: Dict[str, Any], output_path: str) -> str
     try:
         print(f"Creating PowerPoint for group: {group_data.get('name', 'Unknown')}")
         
-        # Create new presentation
-        prs = Presentation()
-        
-        # Set slide dimensions to 16:9 widescreen
-        prs.slide_width = Inches(13.33)
-        prs.slide_height = Inches(7.5)
+        # Create new presentation with 16:9 widescreen slides
+        context = RenderContext()
+        prs = skeleton_cache.new_presentation(context.slide_width, context.slide_height)
         
         print(f"Presentation created with widescreen dimensions")
         
         # Create title slide
-        title_slide_layout = prs.slide_layouts[0]  # Title slide layout
+        title_slide_layout = title_layout(prs)
         title_slide = prs.slides.add_slide(title_slide_layout)
         
         title = title_slide.shapes.title
@@ -250,15 +220,33 @@ def create_group_powerpoint(group_data: Dict[str, Any], output_path: str) -> str
         print(f"Presentation mode: {mode}")
         
         if mode == 'single':
-            # Create one slide per unit
-            for i, unit in enumerate(naval_units):
-                print(f"Creating slide {i+1}/{len(naval_units)} for unit: {unit.get('name', 'Unknown')}")
-                try:
-                    slide = _create_unit_slide(prs, unit, group_data)
-                except Exception as unit_error:
-                    print(f"Failed to create slide for unit {unit.get('name', 'Unknown')}: {unit_error}")
-                    # Continue with other units
-                    continue
+            # Phase one prefetches the images of the next few units on I/O threads; phase two
+            # builds the slides in order, on this thread, as soon as each unit's images are ready
+            pool = ThreadPoolExecutor(max_workers=max(1, SLIDE_PLAN_WORKERS), thread_name_prefix='slide-plan')
+            try:
+                plans = deque(pool.submit(_plan_unit_slide, unit, group_data, context.deadline)
+                              for unit in naval_units[:SLIDE_PLAN_LOOKAHEAD])
+                # Create one slide per unit
+                for i, unit in enumerate(naval_units):
+                    plan = plans.popleft().result()
+                    if i + SLIDE_PLAN_LOOKAHEAD < len(naval_units):
+                        plans.append(pool.submit(_plan_unit_slide, naval_units[i + SLIDE_PLAN_LOOKAHEAD],
+                                                 group_data, context.deadline))
+                    print(f"Creating slide {i+1}/{len(naval_units)} for unit: {unit.get('name', 'Unknown')}")
+                    context.images = plan
+                    try:
+                        slide = _create_unit_slide(prs, unit, group_data, context)
+                    except Exception as unit_error:
+                        print(f"Failed to create slide for unit {unit.get('name', 'Unknown')}: {unit_error}")
+                        # Continue with other units
+                    finally:
+                        # The presentation holds its own copy of the pictures
+                        context.images = {}
+                    if progress_callback:
+                        progress_callback(i + 1, len(naval_units))
+            finally:
+                # An aborted export must not keep resolving images for the remaining units
+                pool.shutdown(wait=False, cancel_futures=True)
         else:
             # Create grid slides
             grid_rows = presentation_config.get('grid_rows', 3)
@@ -266,6 +254,8 @@ def create_group_powerpoint(group_data: Dict[str, Any], output_path: str) -> str
             units_per_slide = grid_rows * grid_cols
             
             print(f"Creating grid slides: {grid_rows}x{grid_cols} ({units_per_slide} units per slide)")
+            remote_assets.fetch_all([reference for unit in naval_units
+                                     for reference in _slide_image_references(unit, group_data)], context.deadline)
             
             # Split units into pages
             for i in range(0, len(naval_units), units_per_slide):
@@ -273,10 +263,13 @@ def create_group_powerpoint(group_data: Dict[str, Any], output_path: str) -> str
                 page_num = i // units_per_slide + 1
                 print(f"Creating grid slide {page_num} with {len(page_units)} units")
                 try:
-                    slide = _create_grid_slide(prs, page_units, group_data, grid_rows, grid_cols, page_num)
+                    slide = _create_grid_slide(prs, page_units, group_data, grid_rows, grid_cols, page_num, context)
                 except Exception as grid_error:
                     print(f"Failed to create grid slide {page_num}: {grid_error}")
-                    continue
+                finally:
+                    context.images = {}
+                if progress_callback:
+                    progress_callback(i + len(page_units), len(naval_units))
         
         # Save presentation
         print(f"Saving presentation to: {output_path}")
@@ -291,70 +284,110 @@ def create_group_powerpoint(group_data: Dict[str, Any], output_path: str) -> str
         traceback.print_exc()
         raise
 
-def _create_unit_slide(prs: Presentation, unit: Dict[str, Any], group_data: Dict[str, Any]) -> Any:
+def _element_image_path(element: ElementPlan, group_data: Dict[str, Any]) -> Optional[str]:
+    """Image reference of an image element, after group template overrides"""
+    if element.type == 'logo' and group_data.get('override_logo') and group_data.get('template_logo_path'):
+        return group_data.get('template_logo_path')
+    if element.type == 'flag' and group_data.get('override_flag') and group_data.get('template_flag_path'):
+        return group_data.get('template_flag_path')
+    return element.image
+
+def _load_slide_image(image_path: str, deadline: Optional[float] = None) -> Optional[SlideImage]:
+    """Resolve an image reference and read it into memory"""
+    actual_image_path = _get_image_path(image_path, deadline)
+    if not actual_image_path:
+        return None
+    with open(actual_image_path, 'rb') as f:
+        data = f.read()
+    try:
+        size = image_cache.get_size(actual_image_path)
+    except Exception as size_error:
+        print(f"Could not read image size of {actual_image_path}: {size_error}")
+        size = None
+    return SlideImage(actual_image_path, data, size)
+
+def _slide_image_references(unit: Dict[str, Any], group_data: Dict[str, Any]) -> List[str]:
+    """Every image reference a unit's slide may use"""
+    references = []
+    for element in compile_layout(unit, 'pptx').elements:
+        if element.image:
+            references.append(_element_image_path(element, group_data))
+            if element.fallback_image:
+                references.append(element.fallback_image)  # fallback for a missing silhouette
+    return [reference for reference in references if reference]
+
+def _plan_unit_slide(unit: Dict[str, Any], group_data: Dict[str, Any],
+                     deadline: Optional[float] = None) -> SlidePlan:
+    """Phase one of an export: resolve and read every image a unit's slide uses (I/O only, no layout)"""
+    plan: SlidePlan = {}
+    try:
+        references = _slide_image_references(unit, group_data)
+        remote_assets.fetch_all(references, deadline)
+        for image_path in references:
+            if image_path not in plan:
+                plan[image_path] = _load_slide_image(image_path, deadline)
+    except Exception as e:
+        # Whatever is missing from the plan is resolved again while the slide is assembled
+        print(f"Failed to plan slide for unit {unit.get('name', 'Unknown')}: {e}")
+    return plan
+
+def _context_image(context: RenderContext, image_path: str) -> Optional[SlideImage]:
+    """Image already resolved for this export, or resolved now and remembered"""
+    if image_path not in context.images:
+        context.images[image_path] = _load_slide_image(image_path, context.deadline)
+    return context.images[image_path]
+
+def _create_unit_slide(prs: Presentation, unit: Dict[str, Any], group_data: Dict[str, Any],
+                       context: RenderContext) -> Any:
     """Create a single slide for one naval unit"""
     
     try:
         print(f"Creating slide for unit: {unit.get('name', 'Unknown')}")
         
         # Use blank slide layout
-        blank_slide_layout = prs.slide_layouts[6]
+        blank_slide_layout = blank_layout(prs)
         slide = prs.slides.add_slide(blank_slide_layout)
         
-        # Get unit layout config with safe parsing
-        layout_config = unit.get('layout_config', {})
-        
-        # Handle case where layout_config might be a JSON string
-        if isinstance(layout_config, str):
-            try:
-                import json
-                layout_config = json.loads(layout_config)
-            except (json.JSONDecodeError, TypeError):
-                print(f"Failed to parse layout_config JSON for unit {unit.get('name')}, using default")
-                layout_config = {}
-        
-        elements = layout_config.get('elements', [])
-        canvas_background = layout_config.get('canvasBackground', '#ffffff')
+        # Parsed geometry, colors and text come from the cached plan
+        plan = compile_layout(unit, 'pptx')
+        elements = plan.elements
         
-        print(f"Unit has {len(elements)} elements, background: {canvas_background}")
+        print(f"Unit has {len(elements)} elements, background: {plan.background}")
         
         # Set slide background color
         try:
             background = slide.background
             fill = background.fill
             fill.solid()
-            fill.fore_color.rgb = _hex_to_rgb(canvas_background)
+            fill.fore_color.rgb = _rgb(plan.background)
         except Exception as bg_error:
             print(f"Failed to set background color: {bg_error}")
         
         # Add canvas border if specified
-        canvas_border_width = layout_config.get('canvasBorderWidth', 0)
-        canvas_border_color = layout_config.get('canvasBorderColor', '#000000')
-        
-        if canvas_border_width > 0:
+        if plan.border_width > 0:
             try:
                 # Add border as a rectangle shape
                 border_shape = slide.shapes.add_shape(
                     1,  # Rectangle auto shape
                     Inches(0), Inches(0),
-                    _pixels_to_inches(layout_config.get('canvasWidth', 1123)),
-                    _pixels_to_inches(layout_config.get('canvasHeight', 794))
+                    _pixels_to_inches(plan.canvas_width, context),
+                    _pixels_to_inches(plan.canvas_height, context)
                 )
                 
                 # Configure border
                 border_shape.fill.background()  # No fill, just border
-                border_shape.line.color.rgb = _hex_to_rgb(canvas_border_color)
-                border_shape.line.width = Pt(canvas_border_width)
+                border_shape.line.color.rgb = _rgb(plan.border_color)
+                border_shape.line.width = Pt(plan.border_width)
                 
-                print(f"Added canvas border: {canvas_border_width}pt, color: {canvas_border_color}")
+                print(f"Added canvas border: {plan.border_width}pt")
             except Exception as border_error:
                 print(f"Failed to add canvas border: {border_error}")
         
         # Process each element from the canvas
         for i, element in enumerate(elements):
             try:
-                print(f"Processing element {i+1}/{len(elements)}: {element.get('type', 'unknown')}")
-                _add_element_to_slide(slide, element, unit, group_data)
+                print(f"Processing element {i+1}/{len(elements)}: {element.type}")
+                _add_element_to_slide(slide, element, unit, group_data, context)
             except Exception as element_error:
                 print(f"Error processing element {i+1}: {element_error}")
                 continue  # Skip problematic elements but continue with others
@@ -365,7 +398,7 @@ def _create_unit_slide(prs: Presentation, unit: Dict[str, Any], group_data: Dict
     except Exception as e:
         print(f"Error creating slide for unit {unit.get('name', 'Unknown')}: {e}")
         # Create a minimal slide with just the unit name as fallback
-        blank_slide_layout = prs.slide_layouts[6]
+        blank_slide_layout = blank_layout(prs)
         slide = prs.slides.add_slide(blank_slide_layout)
         
         # Add unit name as fallback
@@ -376,14 +409,14 @@ def _create_unit_slide(prs: Presentation, unit: Dict[str, Any], group_data: Dict
         return slide
 
 def _create_grid_slide(prs: Presentation, units: List[Dict[str, Any]], group_data: Dict[str, Any], 
-                      rows: int, cols: int, page_num: int) -> Any:
+                      rows: int, cols: int, page_num: int, context: RenderContext) -> Any:
     """Create a grid slide with multiple units"""
     
-    blank_slide_layout = prs.slide_layouts[6]
+    blank_slide_layout = blank_layout(prs)
     slide = prs.slides.add_slide(blank_slide_layout)
     
     # Add page title
-    title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.2), Inches(12), Inches(0.8))
+    title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.2), Inches(context.slide_width - 1.33), Inches(0.8))
     title_frame = title_box.text_frame
     title_frame.text = f"{group_data.get('name', 'Gruppo')} - Pagina {page_num}"
     title_para = title_frame.paragraphs[0]
@@ -392,8 +425,8 @@ def _create_grid_slide(prs: Presentation, units: List[Dict[str, Any]], group_dat
     title_para.font.bold = True
     
     # Calculate grid dimensions
-    slide_width = Inches(12.5)  # Leave margins
-    slide_height = Inches(6)    # Leave space for title
+    slide_width = Inches(context.slide_width - 0.83)   # Leave margins
+    slide_height = Inches(context.slide_height - 1.5)  # Leave space for title
     cell_width = slide_width / cols
     cell_height = slide_height / rows
     
@@ -405,12 +438,12 @@ def _create_grid_slide(prs: Presentation, units: List[Dict[str, Any]], group_dat
         x = Inches(0.5) + col * cell_width
         y = Inches(1) + row * cell_height
         
-        _add_unit_to_grid_cell(slide, unit, group_data, x, y, cell_width, cell_height)
+        _add_unit_to_grid_cell(slide, unit, group_data, x, y, cell_width, cell_height, context)
     
     return slide
 
 def _add_unit_to_grid_cell(slide: Any, unit: Dict[str, Any], group_data: Dict[str, Any], 
-                          x: Inches, y: Inches, width: Inches, height: Inches):
+                          x: Inches, y: Inches, width: Inches, height: Inches, context: RenderContext):
     """Add a unit summary to a grid cell"""
     
     # Add cell border
@@ -436,11 +469,10 @@ def _add_unit_to_grid_cell(slide: Any, unit: Dict[str, Any], group_data: Dict[st
     class_para.font.size = Pt(10)
     
     # Try to add silhouette if available
-    layout_config = unit.get('layout_config', {})
-    elements = layout_config.get('elements', [])
-    silhouette_element = next((el for el in elements if el.get('type') == 'silhouette' and el.get('image')), None)
+    elements = compile_layout(unit, 'pptx').elements
+    silhouette_element = next((el for el in elements if el.type == 'silhouette' and el.image), None)
     
-    if silhouette_element and silhouette_element.get('image'):
+    if silhouette_element:
         try:
             # Add silhouette image (simplified - would need proper image handling)
             img_y = y + Inches(0.8)
@@ -449,127 +481,110 @@ def _add_unit_to_grid_cell(slide: Any, unit: Dict[str, Any], group_data: Dict[st
         except Exception:
             pass
 
-def _add_element_to_slide(slide: Any, element: Dict[str, Any], unit: Dict[str, Any], group_data: Dict[str, Any]):
-    """Add a canvas element to the slide"""
+def _add_element_to_slide(slide: Any, element: ElementPlan, unit: Dict[str, Any], group_data: Dict[str, Any],
+                          context: RenderContext):
+    """Add a compiled canvas element to the slide"""
     
-    element_type = element.get('type')
-    x = _pixels_to_inches(element.get('x', 0))
-    y = _pixels_to_inches(element.get('y', 0))
-    width = _pixels_to_inches(element.get('width', 100))
-    height = _pixels_to_inches(element.get('height', 30))
+    element_type = element.type
+    x = _pixels_to_inches(element.x, context)
+    y = _pixels_to_inches(element.y, context)
+    width = _pixels_to_inches(element.width, context)
+    height = _pixels_to_inches(element.height, context)
+    box = element.box
     
-    if element_type in ['text', 'unit_name', 'unit_class']:
+    if element.text:
         # Add text element
         text_box = slide.shapes.add_textbox(x, y, width, height)
         text_frame = text_box.text_frame
-        text_frame.text = element.get('content', '')
+        text_frame.text = element.text.content
         
         # Apply styling
         paragraph = text_frame.paragraphs[0]
         font = paragraph.font
-        
-        style = element.get('style', {})
-        font.size = Pt(style.get('fontSize', 16))
-        font.bold = style.get('fontWeight') == 'bold'
-        
-        # Text color
-        color = style.get('color', '#000000')
-        font.color.rgb = _hex_to_rgb(color)
+        font.size = Pt(element.text.font_size)
+        font.bold = element.text.bold
+        font.color.rgb = _rgb(element.text.color)
         
         # Text alignment
-        text_align = style.get('textAlign', 'left')
-        if text_align == 'center':
+        if element.text.align == 'center':
             paragraph.alignment = PP_ALIGN.CENTER
-        elif text_align == 'right':
+        elif element.text.align == 'right':
             paragraph.alignment = PP_ALIGN.RIGHT
         
         # Apply background color and borders
-        if style.get('backgroundColor'):
+        if box.background:
             text_box.fill.solid()
-            text_box.fill.fore_color.rgb = _hex_to_rgb(style.get('backgroundColor'))
+            text_box.fill.fore_color.rgb = _rgb(box.background)
         
-        # Apply borders
-        border_width = style.get('borderWidth', 0)
-        if border_width > 0:
-            text_box.line.color.rgb = _hex_to_rgb(style.get('borderColor', '#000000'))
-            text_box.line.width = Pt(border_width)
-            border_style = style.get('borderStyle', 'solid')
-            # PowerPoint supports different line styles, but solid is most compatible
+        # Apply borders (PowerPoint supports other line styles, but solid is most compatible)
+        if box.border_width > 0:
+            text_box.line.color.rgb = _rgb(box.border_color)
+            text_box.line.width = Pt(box.border_width)
         
         # Apply border radius (limited support in PowerPoint)
-        border_radius = style.get('borderRadius', 0)
-        if border_radius > 0:
+        if box.border_radius > 0:
             # PowerPoint has limited border radius support, this is approximate
             try:
-                text_box.adjustments[0] = border_radius / 100.0  # Approximate conversion
+                text_box.adjustments[0] = box.border_radius / 100.0  # Approximate conversion
             except:
                 pass  # Ignore if adjustments not available
     
     elif element_type in ['logo', 'flag', 'silhouette']:
         # Handle images - with remote URL support
-        image_path = element.get('image')
+        image_path = element.image
         if image_path:
-            temp_files_to_cleanup = []
             try:
                 # Apply group template overrides
-                if element_type == 'logo' and group_data.get('override_logo') and group_data.get('template_logo_path'):
-                    image_path = group_data.get('template_logo_path')
-                elif element_type == 'flag' and group_data.get('override_flag') and group_data.get('template_flag_path'):
-                    image_path = group_data.get('template_flag_path')
+                image_path = _element_image_path(element, group_data)
                 
                 print(f"Processing {element_type} image: {image_path}")
                 
-                # Get the actual image path (download if remote)
-                actual_image_path = _get_image_path(image_path)
+                # Use the image already resolved for this export, otherwise resolve it now (download if remote)
+                slide_image = _context_image(context, image_path)
                 
-                if actual_image_path:
-                    # If it was downloaded, mark for cleanup
-                    if image_path.startswith('http'):
-                        temp_files_to_cleanup.append(actual_image_path)
-                    
+                if slide_image:
                     try:
-                        print(f"Adding {element_type} image to slide: {actual_image_path}")
+                        print(f"Adding {element_type} image to slide: {slide_image.path}")
                         print(f"Target dimensions: {width} x {height} at position ({x}, {y})")
                         
-                        # Get image dimensions first using PIL to calculate proper aspect ratio
+                        # Use the image dimensions to calculate proper aspect ratio
                         try:
-                            with PILImage.open(actual_image_path) as img:
-                                img_width, img_height = img.size
-                                print(f"Original image size: {img_width} x {img_height}")
-                                
-                                # Calculate aspect ratios
-                                img_aspect = img_width / img_height
-                                target_aspect = width / height
-                                
-                                print(f"Image aspect: {img_aspect:.3f}, Target aspect: {target_aspect:.3f}")
-                                
-                                # Calculate final dimensions maintaining aspect ratio
-                                if img_aspect > target_aspect:
-                                    # Image is wider than target - fit to width
-                                    final_width = width
-                                    final_height = width / img_aspect
-                                else:
-                                    # Image is taller than target - fit to height
-                                    final_height = height
-                                    final_width = height * img_aspect
-                                
-                                # Center the image
-                                final_x = x + (width - final_width) / 2
-                                final_y = y + (height - final_height) / 2
-                                
-                                print(f"Final dimensions: {final_width} x {final_height} at ({final_x}, {final_y})")
-                                
-                                # Add image with calculated dimensions
-                                picture = slide.shapes.add_picture(actual_image_path, final_x, final_y, final_width, final_height)
-                                print(f"Successfully added {element_type} image with proper aspect ratio")
-                                
+                            if slide_image.size is None:
+                                raise ValueError(f"unknown image size for {slide_image.path}")
+                            img_width, img_height = slide_image.size
+                            print(f"Original image size: {img_width} x {img_height}")
+                            
+                            # Calculate aspect ratios
+                            img_aspect = img_width / img_height
+                            target_aspect = width / height
+                            
+                            print(f"Image aspect: {img_aspect:.3f}, Target aspect: {target_aspect:.3f}")
+                            
+                            # Calculate final dimensions maintaining aspect ratio
+                            if img_aspect > target_aspect:
+                                # Image is wider than target - fit to width
+                                final_width = width
+                                final_height = width / img_aspect
+                            else:
+                                # Image is taller than target - fit to height
+                                final_height = height
+                                final_width = height * img_aspect
+                            
+                            # Center the image
+                            final_x = x + (width - final_width) / 2
+                            final_y = y + (height - final_height) / 2
+                            
+                            print(f"Final dimensions: {final_width} x {final_height} at ({final_x}, {final_y})")
+                            
+                            # Add image with calculated dimensions
+                            picture = slide.shapes.add_picture(io.BytesIO(slide_image.data), final_x, final_y, final_width, final_height)
+                            print(f"Successfully added {element_type} image with proper aspect ratio")
+                            
                         except Exception as pil_error:
                             print(f"PIL processing failed: {pil_error}, using fallback method")
-                            import traceback
-                            traceback.print_exc()
                             # Fallback: add image at original size and position
                             try:
-                                picture = slide.shapes.add_picture(actual_image_path, x, y, width, height)
+                                picture = slide.shapes.add_picture(io.BytesIO(slide_image.data), x, y, width, height)
                                 print(f"Added {element_type} image with fallback method")
                             except Exception as fallback_error:
                                 print(f"Fallback also failed: {fallback_error}")
@@ -579,22 +594,8 @@ def _add_element_to_slide(slide: Any, element: Dict[str, Any], unit: Dict[str, A
                                 text_frame.text = f"[{element_type.upper()}]"
                                 print(f"Created text placeholder for {element_type}")
                         
-                        # Clean up temporary files
-                        for temp_file in temp_files_to_cleanup:
-                            try:
-                                os.unlink(temp_file)
-                                print(f"Cleaned up temporary file: {temp_file}")
-                            except:
-                                pass
-                        
                     except Exception as img_error:
-                        print(f"Error adding image {actual_image_path}: {img_error}")
-                        # Clean up temporary files on error
-                        for temp_file in temp_files_to_cleanup:
-                            try:
-                                os.unlink(temp_file)
-                            except:
-                                pass
+                        print(f"Error adding image {slide_image.path}: {img_error}")
                         # Add placeholder text if image fails
                         text_box = slide.shapes.add_textbox(x, y, width, height)
                         text_frame = text_box.text_frame
@@ -605,13 +606,13 @@ def _add_element_to_slide(slide: Any, element: Dict[str, Any], unit: Dict[str, A
                     # For silhouettes, try to find in unit data
                     if element_type == 'silhouette' and unit:
                         # Try unit.silhouette_path
-                        unit_silhouette = unit.get('silhouette_path')
+                        unit_silhouette = element.fallback_image
                         if unit_silhouette:
                             print(f"🔍 Trying unit silhouette_path: {unit_silhouette}")
-                            actual_image_path_alt = _get_image_path(unit_silhouette)
-                            if actual_image_path_alt:
+                            alt_image = _context_image(context, unit_silhouette)
+                            if alt_image:
                                 try:
-                                    picture = slide.shapes.add_picture(actual_image_path_alt, x, y, width, height)
+                                    picture = slide.shapes.add_picture(io.BytesIO(alt_image.data), x, y, width, height)
                                     print(f"✅ Added silhouette from unit.silhouette_path")
                                     return  # Success, exit function
                                 except Exception as alt_error:
@@ -644,20 +645,14 @@ def _add_element_to_slide(slide: Any, element: Dict[str, Any], unit: Dict[str, A
                     print(f"Created styled placeholder for {element_type} - image file missing: {image_path}")
             except Exception as e:
                 print(f"Exception processing {element_type} image: {e}")
-                # Clean up temporary files on error
-                for temp_file in temp_files_to_cleanup:
-                    try:
-                        os.unlink(temp_file)
-                    except:
-                        pass
                 # If image fails, add placeholder text
                 text_box = slide.shapes.add_textbox(x, y, width, height)
                 text_frame = text_box.text_frame
                 text_frame.text = f"[{element_type.upper()}]"
     
-    elif element_type == 'table':
+    elif element.table:
         # Add table data as a real PowerPoint table
-        table_data = element.get('tableData', [])
+        table_data = element.table.rows if element.table else []
         if table_data and len(table_data) > 0:
             try:
                 rows = len(table_data)
@@ -714,51 +709,18 @@ def _add_element_to_slide(slide: Any, element: Dict[str, Any], unit: Dict[str, A
                 font = paragraph.font
                 font.size = Pt(10)
 
-def _pixels_to_inches(pixels: float) -> Inches:
-    """Convert pixels to inches using current scale"""
-    global CANVAS_TO_PPT_SCALE
-    scaled_pixels = pixels * CANVAS_TO_PPT_SCALE
-    return Inches(scaled_pixels / 120.0)  # Updated to match new DPI
+def _pixels_to_inches(pixels: float, context: RenderContext) -> Inches:
+    """Convert pixels to inches using the export's scale"""
+    return Inches(pixels * context.scale / PIXELS_PER_INCH)
 
-def _download_image(image_url: str) -> Optional[str]:
-    """Download image from URL and return temporary file path"""
-    try:
-        print(f"Downloading image from: {image_url}")
-        
-        # Set headers to mimic a browser request
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(image_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # Get file extension from URL or default to .png
-        file_ext = '.png'
-        if '.' in image_url.split('/')[-1]:
-            file_ext = '.' + image_url.split('.')[-1].split('?')[0]  # Remove query params
-        
-        # Create temporary file in server directory
-        temp_dir = "./data/temp"
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Generate unique filename
-        import uuid
-        temp_filename = f"download_{uuid.uuid4().hex}{file_ext}"
-        temp_path = os.path.join(temp_dir, temp_filename)
-        
-        # Write downloaded content
-        with open(temp_path, 'wb') as f:
-            f.write(response.content)
-        
-        print(f"Image downloaded successfully to: {temp_path}")
-        return temp_path
-        
-    except Exception as e:
-        print(f"Error downloading image {image_url}: {e}")
-        return None
+def _download_image(image_url: str, deadline: Optional[float] = None) -> Optional[str]:
+    """Local copy of a remote image (owned by the remote asset cache, never deleted here)"""
+    local_path = remote_assets.fetch(image_url, deadline)
+    if local_path:
+        print(f"Remote image available at: {local_path}")
+    return local_path
 
-def _get_image_path(image_path: str) -> Optional[str]:
+def _get_image_path(image_path: str, deadline: Optional[float] = None) -> Optional[str]:
     """Get the correct image path, downloading remote images if needed"""
     print(f"🔍 _get_image_path called with: {image_path}")
     
@@ -772,9 +734,9 @@ def _get_image_path(image_path: str) -> Optional[str]:
         return _convert_base64_to_temp_file(image_path)
     
     # If it's an HTTP URL, download it
-    if image_path.startswith('http://') or image_path.startswith('https://'):
-        print(f"📥 Downloading remote image: {image_path}")
-        return _download_image(image_path)
+    if is_remote(image_path):
+        print(f"📥 Fetching remote image: {image_path}")
+        return _download_image(image_path, deadline)
     
     # Handle local file paths
     if image_path.startswith('/api/static/'):
@@ -856,11 +818,6 @@ def _convert_base64_to_temp_file(base64_data: str) -> Optional[str]:
         print(f"❌ Failed to convert base64 to temp file: {e}")
         return None
 
-def _hex_to_rgb(hex_color: str):
-    """Convert hex color to RGB"""
-    hex_color = hex_color.lstrip('#')
-    return RGBColor(
-        int(hex_color[0:2], 16),
-        int(hex_color[2:4], 16),
-        int(hex_color[4:6], 16)
-    )
\ No newline at end of file
+def _rgb(color: Color) -> RGBColor:
+    """python-pptx color from a compiled (r, g, b) color"""
+    return RGBColor(*color)
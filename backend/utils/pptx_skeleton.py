@@ -0,0 +1,123 @@
+import copy
+import io
+import os
+import threading
+import zipfile
+from typing import Any, Dict, Optional, Tuple
+from pptx import Presentation
+from pptx.util import Inches
+
+# Optional operator-supplied master (.potx or .pptx); the python-pptx default template otherwise
+PPTX_TEMPLATE_PATH = os.getenv("PPTX_TEMPLATE_PATH", "./data/templates/master.potx")
+
+TEMPLATE_CONTENT_TYPE = b'application/vnd.openxmlformats-officedocument.presentationml.template.main+xml'
+PRESENTATION_CONTENT_TYPE = b'application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml'
+
+def _open_template(path: str) -> Presentation:
+    """Open a .pptx, or a .potx after relabelling its main part as a presentation"""
+    if not path.lower().endswith('.potx'):
+        return Presentation(path)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename == '[Content_Types].xml':
+                data = data.replace(TEMPLATE_CONTENT_TYPE, PRESENTATION_CONTENT_TYPE)
+            target.writestr(item, data)
+    buffer.seek(0)
+    return Presentation(buffer)
+
+def _remove_slides(prs: Presentation):
+    """Drop any slides a template ships with, keeping its masters and layouts"""
+    slide_ids = prs.slides._sldIdLst
+    for slide_id in list(slide_ids):
+        prs.part.drop_rel(slide_id.rId)
+        slide_ids.remove(slide_id)
+
+def blank_layout(prs: Presentation) -> Any:
+    """The layout without placeholders ('Blank'), falling back to the default template's index"""
+    layouts = prs.slide_layouts
+    for layout in layouts:
+        if layout.name.lower() == 'blank':
+            return layout
+    for layout in layouts:
+        if len(layout.placeholders) == 0:
+            return layout
+    return layouts[6] if len(layouts) > 6 else layouts[len(layouts) - 1]
+
+def title_layout(prs: Presentation) -> Any:
+    """The title slide layout (first layout of the master)"""
+    return prs.slide_layouts[0]
+
+class SkeletonCache:
+    """Parsed empty presentations per slide size, deep-copied for each export.
+
+    Parsing the template package dominates small exports; copying the parsed tree is
+    about twice as fast. Skeletons are rebuilt when the template file changes and are
+    only ever deep-copied, never used directly.
+    """
+
+    def __init__(self, template_path: str = PPTX_TEMPLATE_PATH):
+        self.template_path = template_path
+        self._skeletons: Dict[Tuple, Presentation] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def _template_key(self) -> Optional[Tuple[str, int]]:
+        try:
+            return (self.template_path, os.stat(self.template_path).st_mtime_ns)
+        except OSError:
+            return None
+
+    def _build(self, template_key: Optional[Tuple[str, int]], width: int, height: int) -> Presentation:
+        prs = None
+        if template_key is not None:
+            try:
+                prs = _open_template(self.template_path)
+                _remove_slides(prs)
+            except Exception as e:
+                print(f"Failed to load PowerPoint template {self.template_path}: {e}, using default")
+                prs = None
+        if prs is None:
+            prs = Presentation()
+        prs.slide_width = width
+        prs.slide_height = height
+        # Re-parse the result: python-pptx caches proxies around lxml sub-elements, which
+        # deepcopy would detach from the copied tree, so skeletons are never accessed again
+        buffer = io.BytesIO()
+        prs.save(buffer)
+        buffer.seek(0)
+        return Presentation(buffer)
+
+    def new_presentation(self, slide_width: float, slide_height: float) -> Presentation:
+        """Empty presentation with the given slide size in inches"""
+        width, height = int(Inches(slide_width)), int(Inches(slide_height))
+        template_key = self._template_key()
+        key = (width, height, template_key)
+        with self._lock:
+            skeleton = self._skeletons.get(key)
+            if skeleton is None:
+                self._stats['misses'] += 1
+                # Skeletons of a replaced template are never requested again
+                for stale in [k for k in self._skeletons if k[2] != template_key]:
+                    del self._skeletons[stale]
+                skeleton = self._build(template_key, width, height)
+                self._skeletons[key] = skeleton
+            else:
+                self._stats['hits'] += 1
+            return copy.deepcopy(skeleton)
+
+    def clear(self):
+        """Drop every skeleton (e.g. after replacing the template)"""
+        with self._lock:
+            self._skeletons.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and cached variants"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['skeletons'] = len(self._skeletons)
+        stats['template'] = self.template_path if self._template_key() else None
+        return stats
+
+skeleton_cache = SkeletonCache()
@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from utils.render_cache import render_key
+
+# Slides of one presentation rendered at the same time while it warms up
+WARMUP_CONCURRENCY = int(os.getenv("PRESENTATION_WARMUP_CONCURRENCY", "2"))
+# Presentations whose manifest is kept (and re-warmed on changes); the least recently used is dropped
+MAX_WARM_PRESENTATIONS = int(os.getenv("MAX_WARM_PRESENTATIONS", "32"))
+
+# (unit, render key) -> PNG bytes, stored in the render cache on the way
+SlideRenderer = Callable[[Dict[str, Any], str], Awaitable[bytes]]
+
+def slide_etag(key: str) -> str:
+    """Strong ETag of a slide: its render key, so it changes exactly when the rendered card does"""
+    return f'"{key[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value covers this ETag"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+class PresentationWarmup:
+    """Background rendering of every slide of a group into the render cache.
+
+    warm() publishes a manifest of the group's slides with their ETags and starts
+    rendering them; a manifest whose revision is unchanged is reused, so repeated
+    warm-ups cost one group load. Used from the event loop only, so no locking is needed.
+    """
+
+    def __init__(self, concurrency: int = WARMUP_CONCURRENCY, max_presentations: int = MAX_WARM_PRESENTATIONS):
+        self.concurrency = max(1, concurrency)
+        self.max_presentations = max(1, max_presentations)
+        self._manifests: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._stats = {'warmups': 0, 'reused': 0, 'slides_warmed': 0, 'slides_failed': 0}
+
+    def manifest(self, group_id: int) -> Optional[Dict[str, Any]]:
+        return self._manifests.get(group_id)
+
+    def warm(self, group: Dict[str, Any], render: SlideRenderer) -> Dict[str, Any]:
+        """Return the slide manifest of a group, rendering any slide not yet warm in the background"""
+        group_id = group['id']
+        units = group.get('naval_units', [])
+        keys = [render_key(unit, 'png') for unit in units]
+        revision = hashlib.sha256('\0'.join(f"{unit['id']}:{key}" for unit, key in zip(units, keys))
+                                  .encode()).hexdigest()[:32]
+
+        current = self._manifests.get(group_id)
+        if current is not None and current['revision'] == revision:
+            self._manifests.move_to_end(group_id)
+            self._stats['reused'] += 1
+            return current
+
+        manifest = {
+            'group_id': group_id,
+            'name': group.get('name'),
+            'revision': revision,
+            'etag': f'"{revision}"',
+            'status': 'warming' if units else 'ready',
+            'total': len(units),
+            'rendered': 0,
+            'failed': 0,
+            'created_at': time.time(),
+            'slides': [{
+                'unit_id': unit['id'],
+                'name': unit.get('name'),
+                'etag': slide_etag(key),
+                'url': f"/api/groups/{group_id}/presentation/slide/{unit['id']}",
+                'ready': False,
+            } for unit, key in zip(units, keys)],
+        }
+        self.discard(group_id)
+        self._manifests[group_id] = manifest
+        while len(self._manifests) > self.max_presentations:
+            self.discard(next(iter(self._manifests)))
+        if units:
+            self._tasks[group_id] = asyncio.ensure_future(self._render_slides(manifest, units, keys, render))
+        self._stats['warmups'] += 1
+        return manifest
+
+    async def _render_slides(self, manifest: Dict[str, Any], units: List[Dict[str, Any]], keys: List[str],
+                             render: SlideRenderer):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def render_slide(slide: Dict[str, Any], unit: Dict[str, Any], key: str):
+            async with semaphore:
+                try:
+                    await render(unit, key)
+                except Exception as e:
+                    # The slide endpoint renders it on demand instead
+                    print(f"⚠️ Presentation warm-up could not render unit {unit['id']}: {e}")
+                    slide['error'] = str(e) or type(e).__name__
+                    manifest['failed'] += 1
+                    self._stats['slides_failed'] += 1
+                    return
+            slide['ready'] = True
+            manifest['rendered'] += 1
+            self._stats['slides_warmed'] += 1
+
+        try:
+            await asyncio.gather(*(render_slide(slide, unit, key)
+                                   for slide, unit, key in zip(manifest['slides'], units, keys)))
+            manifest['status'] = 'ready' if not manifest['failed'] else 'partial'
+        finally:
+            if self._tasks.get(manifest['group_id']) is asyncio.current_task():
+                del self._tasks[manifest['group_id']]
+
+    def groups_showing(self, unit_ids: Iterable[int]) -> List[int]:
+        """Groups with a kept manifest that contains any of these units"""
+        unit_ids = set(unit_ids)
+        return [group_id for group_id, manifest in self._manifests.items()
+                if any(slide['unit_id'] in unit_ids for slide in manifest['slides'])]
+
+    def discard(self, group_id: int):
+        """Forget a group's manifest and stop its warm-up"""
+        self._manifests.pop(group_id, None)
+        task = self._tasks.pop(group_id, None)
+        if task is not None:
+            task.cancel()
+
+    def clear(self):
+        for group_id in list(self._manifests):
+            self.discard(group_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return warm-up counters and the presentations currently kept"""
+        stats = dict(self._stats)
+        stats['presentations'] = len(self._manifests)
+        stats['warming'] = len(self._tasks)
+        return stats
+
+presentation_warmup = PresentationWarmup()
@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from utils.uploads import MAX_FILE_SIZE
+
+REMOTE_CACHE_DIR = "./data/remote_cache"
+REMOTE_FETCH_TIMEOUT = float(os.getenv("REMOTE_FETCH_TIMEOUT", "10"))     # per request
+REMOTE_FETCH_DEADLINE = float(os.getenv("REMOTE_FETCH_DEADLINE", "20"))   # per export, all images together
+REMOTE_FRESH_SECONDS = int(os.getenv("REMOTE_FRESH_SECONDS", "3600"))     # served without revalidating
+REMOTE_NEGATIVE_TTL = int(os.getenv("REMOTE_NEGATIVE_TTL", "300"))        # failures are not retried before this
+REMOTE_FETCH_WORKERS = int(os.getenv("REMOTE_FETCH_WORKERS", "4"))
+MAX_REMOTE_CACHE_BYTES = int(os.getenv("REMOTE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+# Some image hosts refuse requests without a browser user agent
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp')
+
+class DeadlineExceeded(Exception):
+    """The export stopped waiting for this image; not a failure of the host"""
+
+def is_remote(reference: Optional[str]) -> bool:
+    return isinstance(reference, str) and reference.startswith(('http://', 'https://'))
+
+def export_deadline() -> float:
+    """Monotonic time by which an export starting now stops waiting for remote images"""
+    return time.monotonic() + REMOTE_FETCH_DEADLINE
+
+class RemoteAssetCache:
+    """Remote images kept on disk by URL and revalidated with ETag / Last-Modified.
+
+    One pooled HTTP session is shared by every export in the process. A body younger
+    than fresh_seconds is used without a request; an older one is revalidated and, if
+    the host cannot be reached, still used. Failed URLs with nothing cached are not
+    requested again for negative_ttl seconds. Cached files are owned by the cache:
+    callers read them and must not delete them.
+    """
+
+    def __init__(self, cache_dir: str = REMOTE_CACHE_DIR, fresh_seconds: int = REMOTE_FRESH_SECONDS,
+                 negative_ttl: int = REMOTE_NEGATIVE_TTL, timeout: float = REMOTE_FETCH_TIMEOUT,
+                 max_bytes: int = MAX_REMOTE_CACHE_BYTES, workers: int = REMOTE_FETCH_WORKERS):
+        self.cache_dir = cache_dir
+        self.fresh_seconds = fresh_seconds
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.workers = max(1, workers)
+        self._session: Optional[requests.Session] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._url_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'revalidated': 0, 'downloads': 0, 'failures': 0,
+                       'negative_hits': 0, 'stale_served': 0, 'deadline_misses': 0}
+
+    @property
+    def session(self) -> requests.Session:
+        """Process-wide session; created lazily so render worker processes get their own"""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers * 2)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = USER_AGENT
+                self._session = session
+            return self._session
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def paths(self, url: str):
+        """(body path, metadata path) of a URL in the cache"""
+        key = hashlib.sha256(url.encode()).hexdigest()
+        extension = os.path.splitext(urlparse(url).path)[1].lower()
+        if extension not in IMAGE_EXTENSIONS:
+            extension = ''
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + (extension or '.bin'), base + '.json'
+
+    @staticmethod
+    def _read_meta(meta_path: str) -> Dict[str, Any]:
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_meta(meta_path: str, meta: Dict[str, Any]):
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        temp_path = f'{meta_path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, meta_path)
+
+    @staticmethod
+    def _touch(path: str) -> str:
+        """Mark a cached body as used, so eviction drops the least recently used images first"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def fetch(self, url: str, deadline: Optional[float] = None) -> Optional[str]:
+        """Local path of a remote image, or None if it is unavailable.
+
+        deadline is a time.monotonic() value; past it, only what is already cached is returned.
+        """
+        body_path, meta_path = self.paths(url)
+        meta = self._read_meta(meta_path)
+        cached = body_path if os.path.exists(body_path) else None
+        now = time.time()
+        if cached and now - meta.get('fetched_at', 0) < self.fresh_seconds:
+            self._count('hits')
+            return self._touch(cached)
+        if now - meta.get('failed_at', 0) < self.negative_ttl:
+            self._count('negative_hits' if not cached else 'stale_served')
+            return cached and self._touch(cached)
+
+        remaining = self.timeout if deadline is None else min(self.timeout, deadline - time.monotonic())
+        lock = self._url_lock(url)
+        if remaining <= 0 or not lock.acquire(timeout=remaining):
+            self._count('deadline_misses')
+            return cached
+        try:
+            # Another thread may have fetched it while this one waited
+            meta = self._read_meta(meta_path)
+            cached = body_path if os.path.exists(body_path) else None
+            if cached and time.time() - meta.get('fetched_at', 0) < self.fresh_seconds:
+                self._count('hits')
+                return self._touch(cached)
+            return self._download(url, body_path, meta_path, meta, cached, deadline)
+        finally:
+            lock.release()
+
+    def _download(self, url: str, body_path: str, meta_path: str, meta: Dict[str, Any],
+                  cached: Optional[str], deadline: Optional[float]) -> Optional[str]:
+        headers = {}
+        if cached and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if cached and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        timeout = self.timeout if deadline is None else max(0.1, min(self.timeout, deadline - time.monotonic()))
+        temp_path = f'{body_path}.{threading.get_ident()}.tmp'
+        try:
+            with self.session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                if response.status_code == 304 and cached:
+                    meta.pop('failed_at', None)
+                    meta.pop('error', None)
+                    meta['fetched_at'] = time.time()
+                    self._write_meta(meta_path, meta)
+                    os.utime(cached)
+                    self._count('revalidated')
+                    return cached
+                response.raise_for_status()
+                os.makedirs(os.path.dirname(body_path), exist_ok=True)
+                size = 0
+                with open(temp_path, 'wb') as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > MAX_FILE_SIZE:
+                            raise ValueError(f"larger than {MAX_FILE_SIZE} bytes")
+                        if deadline is not None and time.monotonic() > deadline:
+                            raise DeadlineExceeded("export fetch deadline passed")
+                        f.write(chunk)
+                os.replace(temp_path, body_path)
+                self._write_meta(meta_path, {
+                    'url': url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'content_type': response.headers.get('Content-Type'),
+                    'size': size,
+                    'fetched_at': time.time(),
+                })
+        except (requests.RequestException, OSError, ValueError, DeadlineExceeded) as e:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            # Running out of the export's time says nothing about the host: no failure is recorded
+            if isinstance(e, DeadlineExceeded) or (isinstance(e, requests.Timeout) and timeout < self.timeout):
+                print(f"Stopped fetching remote image {url} at the export deadline")
+                self._count('deadline_misses')
+                return cached
+            print(f"Failed to fetch remote image {url}: {e}")
+            meta.update({'url': url, 'failed_at': time.time(), 'error': str(e)})
+            try:
+                self._write_meta(meta_path, meta)
+            except OSError:
+                pass
+            self._count('failures')
+            # A stale copy beats a placeholder
+            return cached
+        self._count('downloads')
+        self.evict()
+        return body_path
+
+    def fetch_all(self, urls: Iterable[str], deadline: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """Fetch several URLs in parallel; URLs still in flight at the deadline map to their cached copy or None"""
+        urls = list(dict.fromkeys(url for url in urls if is_remote(url)))
+        if not urls:
+            return {}
+        if len(urls) == 1:
+            return {urls[0]: self.fetch(urls[0], deadline)}
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='remote-assets')
+            pool = self._pool
+        futures = {url: pool.submit(self.fetch, url, deadline) for url in urls}
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        wait(futures.values(), timeout=timeout)
+        results = {}
+        for url, future in futures.items():
+            if future.done() and not future.exception():
+                results[url] = future.result()
+            else:
+                body_path = self.paths(url)[0]
+                results[url] = body_path if os.path.exists(body_path) else None
+        return results
+
+    def _files(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(('.json', '.tmp')):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def evict(self) -> int:
+        """Delete the least recently used images until the cache is under max_bytes"""
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                os.remove(os.path.splitext(path)[0] + '.json')
+            except OSError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """Delete every cached remote image and failure record"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/revalidation/failure counters and disk usage"""
+        with self._lock:
+            stats = dict(self._stats)
+        files = self._files()
+        stats['images'] = len(files)
+        stats['bytes'] = sum(size for _, size, _ in files)
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+remote_assets = RemoteAssetCache()
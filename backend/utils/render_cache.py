@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# Bump when the renderer output changes so old entries are never served
+RENDER_VERSION = 3
+
+RENDER_CACHE_DIR = "./data/render_cache"
+MAX_MEMORY_BYTES = 64 * 1024 * 1024    # 64 MB of rendered images in memory
+MAX_DISK_BYTES = 512 * 1024 * 1024     # 512 MB spilled to disk
+
+# Unit fields the card renderers read (see layout_compiler)
+RENDERED_FIELDS = ('name', 'unit_class', 'nation', 'logo_path', 'silhouette_path', 'flag_path', 'layout_config')
+
+def _local_image_path(image_path: str) -> Optional[str]:
+    """Map a stored image reference to its file under data/uploads, if it is a local file"""
+    if image_path.startswith(('data:image/', 'http://', 'https://')):
+        return None
+    for prefix in ('/uploads/', '/api/static/', '../data/uploads/'):
+        if image_path.startswith(prefix):
+            return './data/uploads/' + image_path[len(prefix):]
+    if image_path.startswith('./data/uploads/'):
+        return image_path
+    return f'./data/uploads/{image_path}'
+
+def _image_references(unit: Dict[str, Any]):
+    """Yield every image reference a render of this unit may load"""
+    for field in ('logo_path', 'silhouette_path', 'flag_path'):
+        if unit.get(field):
+            yield unit[field]
+    layout_config = unit.get('layout_config') or {}
+    if isinstance(layout_config, dict):
+        for element in layout_config.get('elements', []) or []:
+            if isinstance(element, dict) and element.get('image'):
+                yield element['image']
+
+def render_key(unit: Dict[str, Any], kind: str = 'png', options: Optional[Dict[str, Any]] = None) -> str:
+    """Content hash of everything that affects a rendered card: unit fields, layout and image files"""
+    digest = hashlib.sha256()
+    digest.update(f'{kind}:{RENDER_VERSION}'.encode())
+    payload = {field: unit.get(field) for field in RENDERED_FIELDS}
+    digest.update(json.dumps(payload, sort_keys=True, default=str).encode())
+    if options:
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+
+    for reference in sorted(set(_image_references(unit))):
+        digest.update(b'\0')
+        digest.update(image_fingerprint(reference))
+    return digest.hexdigest()
+
+def image_fingerprint(reference: str) -> bytes:
+    """Identity of an image reference; local files contribute their size and mtime,
+    so replacing a file changes it"""
+    local_path = _local_image_path(reference)
+    if local_path is None:
+        return hashlib.sha256(reference.encode()).digest()
+    try:
+        stat = os.stat(local_path)
+        return f'{local_path}:{stat.st_size}:{stat.st_mtime_ns}'.encode()
+    except OSError:
+        return f'{local_path}:missing'.encode()
+
+class RenderCache:
+    """LRU cache of rendered cards in memory, spilling evicted entries to disk"""
+
+    def __init__(self, cache_dir: str = RENDER_CACHE_DIR, max_memory_bytes: int = MAX_MEMORY_BYTES,
+                 max_disk_bytes: int = MAX_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[Tuple[int, str], bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'spills': 0, 'invalidations': 0}
+
+    def _disk_path(self, unit_id: int, key: str) -> str:
+        return os.path.join(self.cache_dir, str(unit_id), f'{key}.bin')
+
+    def get(self, unit_id: int, key: str) -> Optional[bytes]:
+        """Return cached bytes for (unit, key), promoting disk entries back into memory"""
+        with self._lock:
+            data = self._entries.get((unit_id, key))
+            if data is not None:
+                self._entries.move_to_end((unit_id, key))
+                self._stats['memory_hits'] += 1
+                return data
+
+        try:
+            with open(self._disk_path(unit_id, key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+
+        with self._lock:
+            self._stats['disk_hits'] += 1
+        self.put(unit_id, key, data)
+        return data
+
+    def put(self, unit_id: int, key: str, data: bytes):
+        """Store rendered bytes; least recently used entries spill to disk"""
+        if len(data) > self.max_memory_bytes:
+            self._spill(unit_id, key, data)
+            return
+
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop((unit_id, key), None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._entries[(unit_id, key)] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes:
+                (old_unit_id, old_key), old_data = self._entries.popitem(last=False)
+                self._memory_bytes -= len(old_data)
+                evicted.append((old_unit_id, old_key, old_data))
+
+        for old_unit_id, old_key, old_data in evicted:
+            self._spill(old_unit_id, old_key, old_data)
+
+    def file_path(self, unit_id: int, key: str, data: bytes) -> Optional[str]:
+        """Path of an entry's disk copy, writing it first if only memory has it (None if that fails)"""
+        path = self._disk_path(unit_id, key)
+        if not os.path.exists(path):
+            self._spill(unit_id, key, data)
+        return path if os.path.exists(path) else None
+
+    def _spill(self, unit_id: int, key: str, data: bytes):
+        """Write an entry to the disk tier (atomic rename so readers never see partial files)"""
+        path = self._disk_path(unit_id, key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            with self._lock:
+                self._stats['spills'] += 1
+            self._prune_disk()
+        except OSError as e:
+            print(f"Render cache spill failed for unit {unit_id}: {e}")
+
+    def _disk_files(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith('.bin'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _prune_disk(self):
+        """Delete the oldest spilled entries once the disk tier is over budget"""
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def invalidate_unit(self, unit_id: int):
+        """Drop every cached render of a unit (memory and disk)"""
+        with self._lock:
+            for entry in [entry for entry in self._entries if entry[0] == unit_id]:
+                self._memory_bytes -= len(self._entries.pop(entry))
+            self._stats['invalidations'] += 1
+        shutil.rmtree(os.path.join(self.cache_dir, str(unit_id)), ignore_errors=True)
+
+    def clear(self):
+        """Drop every cached render"""
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+            self._stats['invalidations'] += 1
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._entries)
+            stats['memory_bytes'] = self._memory_bytes
+        files = self._disk_files()
+        stats['disk_entries'] = len(files)
+        stats['disk_bytes'] = sum(size for _, size, _ in files)
+        return stats
+
+render_cache = RenderCache()
@@ -0,0 +1,203 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils.export_buffer import ExportArtifact, spool_export
+
+# Worker processes rendering exports; 0 renders in a thread of the API process instead
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Jobs allowed to wait for a free worker before new ones are rejected
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", "16"))
+# Seconds a caller waits for a render before giving up
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "120"))
+
+class RenderQueueFull(Exception):
+    """Raised when the render queue is at capacity (callers answer 503)"""
+
+class RenderTimeout(Exception):
+    """Raised when a render does not finish within its timeout (callers answer 504)"""
+
+# Jobs run in the worker processes. They are top-level functions so they can be pickled,
+# take plain dicts and return bytes, an ExportArtifact or a path so nothing unpicklable
+# crosses the boundary.
+
+def _warm_worker():
+    """Worker initializer: import the exporters, index fonts and parse the default PPTX skeleton"""
+    import utils.png_export  # noqa: F401
+    from utils.powerpoint_export import RenderContext
+    from utils.pptx_skeleton import skeleton_cache
+    from utils.fonts import scan_fonts
+    scan_fonts()
+    default = RenderContext()
+    skeleton_cache.new_presentation(default.slide_width, default.slide_height)
+
+def render_unit_png_job(unit: Dict[str, Any]) -> bytes:
+    """Render a unit card to PNG bytes"""
+    from utils.png_export import create_unit_png_to_buffer
+    buffer = io.BytesIO()
+    create_unit_png_to_buffer(unit, buffer)
+    return buffer.getvalue()
+
+def render_unit_powerpoint_job(unit: Dict[str, Any], template_config: Optional[Dict[str, Any]] = None) -> ExportArtifact:
+    """Render a unit to a single-slide PowerPoint, spooled to disk when it is large"""
+    from utils.powerpoint_export import create_unit_powerpoint_to_buffer
+    return spool_export(lambda buffer: create_unit_powerpoint_to_buffer(unit, buffer, template_config), '.pptx')
+
+def render_group_powerpoint_job(group_data: Dict[str, Any], output_path: str) -> str:
+    """Render a group presentation to output_path and return the path"""
+    from utils.powerpoint_export import create_group_powerpoint
+    return create_group_powerpoint(group_data, output_path)
+
+def render_contact_sheet_job(cards: List[Tuple[str, str]], output_path: str, columns: int,
+                             tile_width: int, labels: bool) -> str:
+    """Tile rendered cards, given as (name, PNG path), into one contact-sheet PNG at output_path"""
+    from utils.group_png_export import write_contact_sheet
+    return write_contact_sheet(cards, output_path, columns, tile_width, labels)
+
+class RenderExecutor:
+    """Bounded pool of warm render processes with queue backpressure and per-job timeouts"""
+
+    def __init__(self, workers: int = RENDER_WORKERS, queue_size: int = RENDER_QUEUE_SIZE,
+                 timeout: float = RENDER_TIMEOUT):
+        self.workers = workers
+        self.capacity = max(1, workers) + queue_size
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'timed_out': 0,
+                       'pool_restarts': 0, 'render_time_ms_total': 0.0}
+
+    def start(self):
+        """Start the worker processes (otherwise they start on the first job)"""
+        if self.workers > 0:
+            self._get_pool()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: workers never inherit the API process's threads, sockets or SQLite handles
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_warm_worker,
+                )
+                print(f"Render executor started with {self.workers} worker processes")
+            return self._pool
+
+    def _restart_pool(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is broken:
+                self._pool = None
+                self._stats['pool_restarts'] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _job_finished(self, start: float, failed: bool):
+        with self._lock:
+            self._pending -= 1
+            self._stats['failed' if failed else 'completed'] += 1
+            self._stats['render_time_ms_total'] += (time.perf_counter() - start) * 1000
+
+    async def run(self, job: Callable, *args, timeout: Optional[float] = None):
+        """Run a render job off the event loop; raises RenderQueueFull or RenderTimeout"""
+        with self._lock:
+            if self._pending >= self.capacity:
+                self._stats['rejected'] += 1
+                raise RenderQueueFull(f"Render queue is full ({self._pending} jobs pending)")
+            self._pending += 1
+            self._stats['submitted'] += 1
+
+        start = time.perf_counter()
+        try:
+            if self.workers > 0:
+                pool = self._get_pool()
+                future = pool.submit(job, *args)
+            else:
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(None, job, *args)
+        except BaseException:
+            self._job_finished(start, failed=True)
+            raise
+
+        # The slot is released when the job really ends, not when the caller stops waiting,
+        # so timed-out jobs still count against capacity while they occupy a worker
+        future.add_done_callback(
+            lambda f: self._job_finished(start, failed=f.cancelled() or f.exception() is not None)
+        )
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats['timed_out'] += 1
+            raise RenderTimeout(f"Render did not finish within {timeout or self.timeout:g}s")
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            raise
+
+    def run_sync(self, job: Callable, *args, timeout: Optional[float] = None):
+        """Run a render job from a background thread and wait for it.
+
+        Background jobs are already queued elsewhere, so they are never rejected here;
+        they still count as pending, so interactive requests see the extra load.
+        """
+        with self._lock:
+            self._pending += 1
+            self._stats['submitted'] += 1
+
+        start = time.perf_counter()
+        if self.workers <= 0:
+            try:
+                result = job(*args)
+            except BaseException:
+                self._job_finished(start, failed=True)
+                raise
+            self._job_finished(start, failed=False)
+            return result
+
+        try:
+            pool = self._get_pool()
+            future = pool.submit(job, *args)
+        except BaseException:
+            self._job_finished(start, failed=True)
+            raise
+        future.add_done_callback(
+            lambda f: self._job_finished(start, failed=f.cancelled() or f.exception() is not None)
+        )
+        try:
+            return future.result(timeout or self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats['timed_out'] += 1
+            raise RenderTimeout(f"Render did not finish within {timeout or self.timeout:g}s")
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            raise
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue and job metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = self._pending
+            stats['capacity'] = self.capacity
+            stats['workers'] = self.workers
+            stats['running'] = self._pool is not None
+        finished = stats['completed'] + stats['failed']
+        stats['render_time_ms_avg'] = round(stats['render_time_ms_total'] / finished, 1) if finished else 0.0
+        stats['render_time_ms_total'] = round(stats['render_time_ms_total'], 1)
+        return stats
+
+render_executor = RenderExecutor()
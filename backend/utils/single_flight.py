@@ -0,0 +1,44 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+class SingleFlight:
+    """Coalesces identical concurrent async calls: while a call for a key is in flight,
+    later callers await the same result instead of starting their own.
+
+    The shared call runs as its own task, so a caller that disconnects does not cancel
+    it for the others. Used from the event loop only, so no locking is needed.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Tuple[asyncio.Task, list]] = {}
+        self._stats = {'calls': 0, 'coalesced': 0}
+
+    async def run(self, key: str, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, int]:
+        """Run call() once per key at a time; returns (result, number of callers that shared it)"""
+        entry = self._calls.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(call())
+            entry = self._calls[key] = (task, [0])
+            task.add_done_callback(lambda finished: self._finished(key, entry, finished))
+            self._stats['calls'] += 1
+        else:
+            self._stats['coalesced'] += 1
+        task, callers = entry
+        callers[0] += 1
+        result = await asyncio.shield(task)
+        # Every sharing caller joined before the task finished, so the count is final here
+        return result, callers[0]
+
+    def _finished(self, key: str, entry: Tuple[asyncio.Task, list], task: asyncio.Task):
+        if self._calls.get(key) is entry:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call counters and the number of calls in flight"""
+        stats = dict(self._stats)
+        stats['in_flight'] = len(self._calls)
+        return stats
+
+export_flights = SingleFlight()
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Iterable, NamedTuple, Optional
+from uuid import uuid4
+
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", str(50 * 1024 * 1024)))          # images
+MAX_RESTORE_SIZE = int(os.getenv("MAX_RESTORE_SIZE", str(2 * 1024 * 1024 * 1024)))  # backup archives
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+SNIFF_BYTES = 8192  # enough to find an <svg> root after an XML prolog and DOCTYPE
+
+# Detected content type -> extension the file is stored with
+TYPE_EXTENSIONS = {'png': '.png', 'jpeg': '.jpg', 'svg': '.svg', 'zip': '.zip', 'sqlite': '.db'}
+IMAGE_TYPES = ('png', 'jpeg', 'svg')
+
+class UploadRejected(Exception):
+    """Raised when an upload is empty, too large or not of an accepted type"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+class StoredUpload(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+    content_type: str
+
+def detect_type(head: bytes) -> Optional[str]:
+    """Content type from a file's first bytes (magic numbers), or None if unrecognised"""
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith((b'PK\x03\x04', b'PK\x05\x06')):
+        return 'zip'
+    if head.startswith(b'SQLite format 3\x00'):
+        return 'sqlite'
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if text.startswith((b'<?xml', b'<svg', b'<!--', b'<!doctype svg')) and b'<svg' in text:
+        return 'svg'
+    return None
+
+def store_upload(source: BinaryIO, directory: str, allowed_types: Iterable[str],
+                 max_size: int = MAX_FILE_SIZE, name: Optional[str] = None) -> StoredUpload:
+    """Copy an upload into directory in fixed-size chunks, then rename it into place.
+
+    The content type is checked on the first chunk and the size limit while copying, so
+    bad uploads are rejected without reading them whole; the SHA-256 is computed on the way.
+    The file is named name (or a random stem) plus the extension of the detected type.
+    """
+    allowed_types = tuple(allowed_types)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.upload_', suffix='.tmp', dir=directory)
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+    try:
+        with os.fdopen(fd, 'wb') as target:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if content_type is None:
+                    content_type = detect_type(chunk[:SNIFF_BYTES])
+                    if content_type not in allowed_types:
+                        accepted = ', '.join(TYPE_EXTENSIONS[t] for t in allowed_types)
+                        raise UploadRejected(f"Invalid file type. Allowed: {accepted}")
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadRejected(f"File too large (limit {max_size / (1024 * 1024):.3g} MB)", 413)
+                digest.update(chunk)
+                target.write(chunk)
+        if size == 0:
+            raise UploadRejected("Empty file")
+        path = os.path.join(directory, (name or str(uuid4())) + TYPE_EXTENSIONS[content_type])
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return StoredUpload(path, size, digest.hexdigest(), content_type)
@@ -20,7 +20,7 @@ export default function GroupModal({ group, onClose, onSave }: GroupModalProps)
   const [draggedIndex, setDraggedIndex] = useState<number | null>(null);
 
   const { data: availableUnits } = useQuery({
-    queryKey: ['navalUnits'],
+    queryKey: ['navalUnits', 'summary'],
     queryFn: () => navalUnitsApi.getAll(),
   });
 
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Play, Pause, SkipForward, SkipBack, X, Grid, Clock, Settings } from 'lucide-react';
 import type { Group, NavalUnit, PresentationConfig } from '../types/index.ts';
+import { groupsApi } from '../services/api';
 
 interface PresentationModeProps {
   group: Group;
@@ -157,6 +158,13 @@ export default function PresentationMode({ group, isOpen, onClose }: Presentatio
     };
   }, []);
 
+  // Ask the server to pre-render every slide when the presentation starts
+  useEffect(() => {
+    if (!isOpen || units.length === 0) return;
+    groupsApi.warmupPresentation(group.id)
+      .catch(error => console.error('Error warming up presentation:', error));
+  }, [isOpen, group.id, units.length]);
+
   // Auto-enter fullscreen when presentation starts
   useEffect(() => {
     if (isOpen && !isFullscreen) {
@@ -21,7 +21,7 @@ export default function Groups() {
   });
 
   const { data: navalUnits } = useQuery({
-    queryKey: ['navalUnits'],
+    queryKey: ['navalUnits', 'summary'],
     queryFn: () => navalUnitsApi.getAll(),
   });
 
@@ -26,8 +26,9 @@ export default function NavalUnits() {
   const { success, error: showError } = useToast();
 
   const { data: navalUnits, isLoading, error } = useQuery({
-    queryKey: ['navalUnits'],
-    queryFn: () => navalUnitsApi.getAll(),
+    queryKey: ['navalUnits', 'full'],
+    // Cards and editors work on the full unit (layout_config, notes)
+    queryFn: () => navalUnitsApi.getAll(0, 100, 'full'),
   });
 
   // Filter units based on search term
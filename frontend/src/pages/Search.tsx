@@ -20,7 +20,7 @@ export default function Search() {
 
   const { data: searchResults, isLoading, error } = useQuery({
     queryKey: ['search', debouncedQuery, searchType],
-    queryFn: () => navalUnitsApi.search(debouncedQuery, searchType),
+    queryFn: () => navalUnitsApi.search(debouncedQuery, searchType, 'id,name,unit_class,nation,silhouette_path,layout_config'),
     enabled: debouncedQuery.length >= 2,
   });
 
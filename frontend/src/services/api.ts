@@ -83,8 +83,9 @@ export const authApi = {
 
 // Naval Units API
 export const navalUnitsApi = {
-  getAll: async (skip = 0, limit = 100): Promise<NavalUnit[]> => {
-    const response = await api.get(`/api/units?skip=${skip}&limit=${limit}`);
+  // fields: 'summary' (id, name, class, nation, image paths), 'full', or a comma-separated column list
+  getAll: async (skip = 0, limit = 100, fields = 'summary'): Promise<NavalUnit[]> => {
+    const response = await api.get(`/api/units?skip=${skip}&limit=${limit}&fields=${fields}`);
     return Array.isArray(response.data) ? response.data : [];
   },
 
@@ -128,8 +129,8 @@ export const navalUnitsApi = {
     return response.data;
   },
 
-  search: async (query: string, searchType = 'all'): Promise<SearchResponse> => {
-    const response = await api.get(`/api/units/search/?q=${encodeURIComponent(query)}&search_type=${searchType}`);
+  search: async (query: string, searchType = 'all', fields = 'summary'): Promise<SearchResponse> => {
+    const response = await api.get(`/api/units/search/?q=${encodeURIComponent(query)}&search_type=${searchType}&fields=${fields}`);
     return response.data;
   },
 
@@ -209,7 +210,7 @@ export const navalUnitsApi = {
 // Groups API
 export const groupsApi = {
   getAll: async (skip = 0, limit = 100): Promise<Group[]> => {
-    const response = await api.get(`/api/groups?skip=${skip}&limit=${limit}`);
+    const response = await api.get(`/api/groups?skip=${skip}&limit=${limit}&summary=true`);
     return Array.isArray(response.data) ? response.data : [];
   },
 
@@ -252,6 +253,9 @@ export const groupsApi = {
     });
     return response.data;
   },
+  warmupPresentation: async (id: number): Promise<void> => {
+    await api.post(`/api/groups/${id}/presentation/warmup`);
+  },
 };
 
 // Admin API
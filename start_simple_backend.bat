@@ -6,5 +6,5 @@ echo Default admin user: admin@example.com / admin123
 echo.
 call venv\Scripts\activate
 cd backend
-python simple_main.py
+python server.py
 pause
\ No newline at end of file